@@ -0,0 +1,54 @@
+from typing import Dict, Optional
+from utils.validator import SamplingConfig
+
+class AdaptiveSampler:
+    """
+    Chooses the delay before the next sample of a relay. Sampling runs at `min_interval`
+    while readings change quickly or sit close to a rule threshold, and backs off
+    geometrically towards `max_interval` while readings are flat.
+    """
+
+    def __init__(self, config: SamplingConfig, backoff: float = 1.5):
+        """
+        Args:
+            config (SamplingConfig): Per-relay floor/ceiling intervals and activity thresholds.
+            backoff (float): Factor the interval grows by after each quiet sample.
+        """
+        self.min_interval = config.min_interval
+        self.max_interval = config.max_interval
+        self.change_threshold = config.change_threshold
+        self.proximity_threshold = config.proximity_threshold
+        self.backoff = backoff
+        self.interval = self.min_interval
+        self.previous: Optional[Dict[str, float]] = None
+
+    def is_active(self, data: Dict[str, float], proximity: Optional[float]) -> bool:
+        """
+        Args:
+            data (Dict[str, float]): The latest sample.
+            proximity (Optional[float]): Relative distance to the nearest rule threshold, if any.
+
+        Returns:
+            bool: True if the sample changed quickly or is near a threshold.
+        """
+        if proximity is not None and proximity <= self.proximity_threshold:
+            return True
+        if self.previous is None:
+            return True
+        for field, value in data.items():
+            previous = self.previous.get(field)
+            if not isinstance(value, (int, float)) or not isinstance(previous, (int, float)):
+                continue
+            # Scale by at least 1.0 so readings near zero don't look like large relative swings
+            if abs(value - previous) / max(abs(previous), 1.0) > self.change_threshold:
+                return True
+        return False
+
+    def next_interval(self, data: Dict[str, float], proximity: Optional[float] = None) -> float:
+        """Update the controller with the latest sample and return the seconds until the next one."""
+        if self.is_active(data, proximity):
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        self.previous = data
+        return self.interval
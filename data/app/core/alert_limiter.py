@@ -0,0 +1,118 @@
+import asyncio
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timezone
+from typing import Optional
+from utils.logging_setup import local_logger as logger
+from utils.config import settings
+from aws.client import publish as aws_publish
+
+class AlertLimiter:
+    """
+    Rate limits alert messages per rule and per device (relay or stream) over a sliding window.
+    Alerts over either limit are not published; they are counted and, in digest mode, rolled
+    into one summary message per digest interval on the regular alert topic. Clears follow
+    their start: a published start always gets its clear, a suppressed one never does.
+
+    One limiter is shared by every RulesEngine in the process so the per-device limit covers
+    all rules of that device.
+    """
+
+    def __init__(self, rule_limit: int, device_limit: int, window: float, digest_interval: float):
+        """
+        Args:
+            rule_limit (int): Alerts allowed per rule within the window.
+            device_limit (int): Alerts allowed per device within the window, across its rules.
+            window (float): Sliding window length in seconds.
+            digest_interval (float): Seconds between digests of suppressed alerts; 0 disables the digest.
+        """
+        self.rule_limit = rule_limit
+        self.device_limit = device_limit
+        self.window = window
+        self.digest_interval = digest_interval
+        self.publish = aws_publish
+        self.rule_events = defaultdict(deque)
+        self.device_events = defaultdict(deque)
+        self.suppressed = defaultdict(Counter)
+        self.suppressed_starts = set()
+        self.period_start = time.time()
+
+    def allow(self, device: str, rule_id: str, alert_state: str) -> bool:
+        """
+        Record an alert transition and decide whether it may be published.
+
+        Args:
+            device (str): The relay or stream the rule belongs to.
+            rule_id (str): The rule identifier.
+            alert_state (str): 'start' or 'clear'.
+
+        Returns:
+            bool: True if the alert is within the limits, False if it is suppressed.
+        """
+        key = (device, rule_id)
+        now = time.monotonic()
+        rule_events = self.rule_events[key]
+        device_events = self.device_events[device]
+        for events in (rule_events, device_events):
+            while events and now - events[0] >= self.window:
+                events.popleft()
+        if alert_state == 'clear':
+            allowed = key not in self.suppressed_starts
+            self.suppressed_starts.discard(key)
+        else:
+            allowed = len(rule_events) < self.rule_limit and len(device_events) < self.device_limit
+            if not allowed:
+                self.suppressed_starts.add(key)
+        if not allowed:
+            self.suppressed[key][alert_state] += 1
+            logger.debug(f"Suppressed {alert_state} alert for rule {rule_id} on {device}")
+            return False
+        rule_events.append(now)
+        device_events.append(now)
+        return True
+
+    def digest(self) -> Optional[dict]:
+        """
+        Build the summary of alerts suppressed since the last digest and reset the counts.
+
+        Returns:
+            Optional[dict]: The digest payload, or None if nothing was suppressed.
+        """
+        period_end = time.time()
+        suppressed, self.suppressed = self.suppressed, defaultdict(Counter)
+        period_start, self.period_start = self.period_start, period_end
+        if not suppressed:
+            return None
+        alerts = [
+            {"relay_id": device, "rule_id": rule_id, "start": counts["start"], "clear": counts["clear"]}
+            for (device, rule_id), counts in sorted(suppressed.items())
+        ]
+        return {
+            "alert_type": "digest",
+            "period_start": datetime.fromtimestamp(period_start, tz=timezone.utc).isoformat(),
+            "period_end": datetime.fromtimestamp(period_end, tz=timezone.utc).isoformat(),
+            "suppressed": sum(alert["start"] + alert["clear"] for alert in alerts),
+            "alerts": alerts,
+        }
+
+    async def run(self):
+        """Publish a digest of suppressed alerts every digest interval."""
+        if not self.digest_interval:
+            return
+        while True:
+            await asyncio.sleep(self.digest_interval)
+            payload = self.digest()
+            if not payload:
+                continue
+            try:
+                await self.publish('alerts/data', payload)
+                logger.info(f"Published alert digest: {payload['suppressed']} suppressed alerts")
+            except Exception as e:
+                logger.error(f"Failed to publish alert digest: {e}")
+
+alert_limiter = AlertLimiter(
+    rule_limit=settings.ALERT_RULE_LIMIT,
+    device_limit=settings.ALERT_DEVICE_LIMIT,
+    window=settings.ALERT_WINDOW,
+    digest_interval=settings.ALERT_DIGEST_INTERVAL,
+)
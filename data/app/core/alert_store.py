@@ -0,0 +1,119 @@
+import asyncio
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from utils.logging_setup import local_logger as logger
+from utils.config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    level TEXT NOT NULL,
+    rule_id TEXT,
+    state TEXT,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alerts_time ON alerts (timestamp, id);
+CREATE INDEX IF NOT EXISTS alerts_source_time ON alerts (source, timestamp, id);
+CREATE INDEX IF NOT EXISTS alerts_level_time ON alerts (level, timestamp, id);
+CREATE VIRTUAL TABLE IF NOT EXISTS alerts_fts USING fts5 (message, content='alerts', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS alerts_fts_insert AFTER INSERT ON alerts BEGIN
+    INSERT INTO alerts_fts (rowid, message) VALUES (new.id, new.message);
+END;
+CREATE TRIGGER IF NOT EXISTS alerts_fts_delete AFTER DELETE ON alerts BEGIN
+    INSERT INTO alerts_fts (alerts_fts, rowid, message) VALUES ('delete', old.id, old.message);
+END;
+"""
+
+class AlertStore:
+    """
+    Local alert history in SQLite (WAL mode), read by the web app's alert pages.
+
+    Every rule transition is recorded here, including those the AlertLimiter keeps from AWS,
+    so the local history is complete. Rows are indexed on time, source and level, and messages
+    are full-text indexed (FTS5). WAL lets the web app read while alerts are being written.
+
+    All database access runs on one dedicated thread, which owns the connection, so inserts
+    never block the event loop. Rows older than `retention_days`, and the oldest rows beyond
+    `max_rows`, are deleted at most every `prune_interval` seconds, after an insert.
+    """
+
+    def __init__(self, path: str, retention_days: float = 0, max_rows: int = 0, prune_interval: float = 3600):
+        """
+        Args:
+            path (str): The database file, created on first use.
+            retention_days (float): Age after which alerts are deleted, 0 = keep them.
+            max_rows (int): Alerts kept at most, 0 = no limit.
+            prune_interval (float): Seconds between retention passes.
+        """
+        self.path = path
+        self.retention_days = retention_days
+        self.max_rows = max_rows
+        self.prune_interval = prune_interval
+        self.pruned = 0.0
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='alert_store')
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # With WAL, NORMAL only risks the last transactions on power loss, never corruption
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self.connection = connection
+        return self.connection
+
+    def _insert(self, row: tuple):
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                'INSERT INTO alerts (timestamp, source, level, rule_id, state, message) VALUES (?, ?, ?, ?, ?, ?)',
+                row
+            )
+        if time.monotonic() - self.pruned >= self.prune_interval:
+            self._prune()
+
+    def _prune(self):
+        self.pruned = time.monotonic()
+        connection = self._connect()
+        deleted = 0
+        # The delete trigger removes the rows from the full-text index as well
+        with connection:
+            if self.retention_days:
+                cutoff_ms = int((time.time() - self.retention_days * 86400) * 1000)
+                deleted += connection.execute('DELETE FROM alerts WHERE timestamp < ?', (cutoff_ms,)).rowcount
+            if self.max_rows:
+                deleted += connection.execute(
+                    'DELETE FROM alerts WHERE id <= (SELECT id FROM alerts ORDER BY id DESC LIMIT 1 OFFSET ?)',
+                    (self.max_rows,)
+                ).rowcount
+        if deleted:
+            logger.info(f"Deleted {deleted} alerts past retention from {self.path}")
+
+    async def record(self, source: str, level: str, message: str, rule_id: Optional[str] = None,
+                     state: Optional[str] = None, timestamp_ms: Optional[int] = None):
+        """
+        Add an alert to the history.
+
+        Args:
+            source (str): Where the alert came from, e.g. the relay name ("Router").
+            level (str): "Error", "Warning" or "Info".
+            message (str): Human readable description, searchable with full-text search.
+            rule_id (Optional[str]): The rule that raised the alert.
+            state (Optional[str]): 'start' or 'clear' for rule transitions.
+            timestamp_ms (Optional[int]): Alert time in epoch milliseconds; defaults to now.
+        """
+        row = (timestamp_ms or int(time.time() * 1000), source, level, rule_id, state, message)
+        try:
+            await asyncio.get_event_loop().run_in_executor(self.executor, self._insert, row)
+        except Exception as e:
+            logger.error(f"Error recording alert in {self.path}: {e}")
+
+alert_store = AlertStore(settings.ALERT_DB_PATH, retention_days=settings.ALERT_RETENTION_DAYS,
+                         max_rows=settings.ALERT_MAX_ROWS, prune_interval=settings.ALERT_PRUNE_INTERVAL)
@@ -1,9 +1,9 @@
-from datetime import datetime, timezone
 import asyncio
-import aiosnmp 
 from utils.logging_setup import local_logger as logger
 from utils.config import settings
 from utils.singleton import RedisClient
+from utils.stream_writer import add_sample
+from core.snmp_poller import SnmpPoller
 
 # This script needs very strong error handling. It shouldnt cause a failure if the router is down/bad
 # It also shouldnt fail if there is no SIM card or No ACTIVE SIM card.
@@ -13,37 +13,28 @@ from utils.singleton import RedisClient
 # Maybe we use 0 as a null value. 
 
 class CellularData:
-    def __init__(self):
+    def __init__(self, snmp_poller: SnmpPoller = None):
         self.host = settings.SNMP_TARGET
         self.null = settings.NULL
         self.collection_interval = settings.COLLECTION_INTERVAL
         self.oid_mappings = settings.OIDS
+        self.device = 'router'
+        self.snmp_poller = snmp_poller or SnmpPoller()
+        if self.device not in self.snmp_poller.devices:
+            self.snmp_poller.register(self.device, self.host, self.oid_mappings)
         
         
     async def async_init(self):
         self.redis = await RedisClient.get_instance()
     
-    # This function needs better error handling. Basically if it fails here at any point instead of breaking or shutting down it should just pass and try again.
-    # This may cause infinate failures but it will ensure that no router related issues will cause failures and that as soon as data is avaliable it will start to run 
-    async def fetch_snmp_data(self, host, community, oid_mappings):
-        """Fetch SNMP data asynchronously using aiosnmp"""
-        oids = [oid for oid in oid_mappings.values()]
-        results = {}
-        async with aiosnmp.Snmp(host=host, community=community, port=161, timeout=5, retries=3, max_repetitions=10) as snmp:
-            response = await snmp.get(oids)
-            for varbind in response:
-                for key, oid in oid_mappings.items():
-                    if varbind.oid == oid:
-                        results[key] = varbind.value
-        return results
-    
     async def process_data(self):
         try:
-            data = await self.fetch_snmp_data(self.host, 'public', self.oid_mappings)
+            # The poller keeps the session open and backs off while the router is unreachable
+            data = await self.snmp_poller.poll(self.device)
             if data:
-                sinr = await self.ensure_float(data.get('sinr_oid'))
-                rsrp = await self.ensure_float(data.get('rsrp_oid'))
-                rsrq = await self.ensure_float(data.get('rsrq_oid'))
+                sinr = await self.ensure_float(data.get('sinr'))
+                rsrp = await self.ensure_float(data.get('rsrp'))
+                rsrq = await self.ensure_float(data.get('rsrq'))
                 await self.stream_data(sinr, rsrp, rsrq)
             else:
                 logger.warning("No data returned from SNMP request.")
@@ -51,14 +42,12 @@ class CellularData:
             logger.error(f"Error processing data: {e}")
         
     async def stream_data(self, sinr, rsrp, rsrq):
-        timestamp = datetime.now(timezone.utc).astimezone().isoformat()
         data = {
-            "timestamp": timestamp,
             "sinr": sinr,
             "rsrp": rsrp,
             "rsrq": rsrq
         }
-        await self.redis.xadd('cellular', data)
+        await add_sample(self.redis, 'cellular', data)
         
         
     async def ensure_float(self, value):
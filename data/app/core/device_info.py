@@ -0,0 +1,79 @@
+import asyncio
+import json
+import time
+from typing import Dict
+from utils.logging_setup import local_logger as logger
+from utils.config import settings
+from utils.singleton import RedisClient
+from core.snmp_poller import SnmpPoller
+
+class DeviceInfoCache:
+    """
+    Keeps the router and camera identity (model, serial, firmware, ...) and uptime in Redis
+    so the web app never has to wait on SNMP. Each device is refreshed in the background
+    through the shared SnmpPoller and stored as a JSON string under `device_info:<device>`
+    with a TTL, so a device that stops answering ages out instead of showing stale data forever.
+    """
+
+    def __init__(self, snmp_poller: SnmpPoller):
+        self.snmp_poller = snmp_poller
+        self.refresh_interval = settings.DEVICE_INFO_INTERVAL
+        self.ttl = settings.DEVICE_INFO_TTL
+        self.devices = {
+            'router': ('router_info', settings.SNMP_TARGET, settings.ROUTER_INFO_OIDS),
+            'camera': ('camera_info', settings.CAMERA_TARGET, settings.CAMERA_INFO_OIDS),
+        }
+        for poller_name, host, oids in self.devices.values():
+            if poller_name not in self.snmp_poller.devices:
+                self.snmp_poller.register(poller_name, host, oids)
+        self.redis = None
+
+    async def async_init(self):
+        self.redis = await RedisClient.get_instance()
+
+    def normalize(self, device: str, raw: Dict[str, object]) -> Dict[str, object]:
+        """
+        Convert raw SNMP values into the display strings used by the web pages.
+
+        Args:
+            device (str): 'router' or 'camera'.
+            raw (Dict[str, object]): Values returned by the poller.
+
+        Returns:
+            Dict[str, object]: Decoded values, with uptime converted from ticks to seconds.
+        """
+        info = {}
+        for name, value in raw.items():
+            if name == 'uptime':
+                info[name] = int(value) // 100 if value is not None else None
+            elif device == 'camera' and name == 'serial' and isinstance(value, bytes):
+                info[name] = value.hex().upper()
+            elif isinstance(value, bytes):
+                value = value.decode('utf-8', errors='replace')
+                if device == 'camera' and name == 'model':
+                    parts = value.split(';')
+                    value = parts[1].strip() if len(parts) > 1 else value
+                info[name] = value
+            else:
+                info[name] = value
+        info['updated'] = int(time.time())
+        return info
+
+    async def refresh(self):
+        """Poll all devices concurrently and write whatever answered to Redis."""
+        names = list(self.devices)
+        results = await asyncio.gather(*(self.snmp_poller.poll(self.devices[name][0]) for name in names))
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for name, raw in zip(names, results):
+                if raw:
+                    pipe.set(settings.DEVICE_INFO_KEY.format(name), json.dumps(self.normalize(name, raw)), ex=self.ttl)
+            await pipe.execute()
+
+    async def run(self):
+        await self.async_init()
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing device info cache: {e}")
+            await asyncio.sleep(self.refresh_interval)
@@ -1,67 +1,175 @@
 import asyncio
+import statistics
 import smbus2
-from datetime import datetime, timezone
 import time
 from utils.logging_setup import local_logger as logger
 from utils.config import settings
 from utils.singleton import RedisClient
+from utils.stream_writer import add_sample
+
+# AHT status byte flags
+STATUS_BUSY = 0x80
+STATUS_CALIBRATED = 0x08
+
+# Time the AHT needs to finish a conversion after the trigger command
+CONVERSION_TIME = 0.08
+
+# Initialization command per sensor variant, and whether its frames end with a CRC-8 byte
+# (AHT2x: AHT20/21/25). The AHT10 only sends the 6 status and data bytes.
+VARIANTS = {
+    "AHT10": (0xE1, False),
+    "AHT20": (0xBE, True),
+}
 
 class EnvironmentalData:
-    def __init__(self, i2c_bus=1, address=0x38):
+    def __init__(self, i2c_bus=1, address=0x38, open_bus=True, variant=settings.ENV_SENSOR):
+        """
+        Args:
+            i2c_bus (int): I2C bus number of the AHT sensor.
+            address (int): I2C address of the AHT sensor.
+            open_bus (bool): Open the sensor. Disabled when the sampling process owns the sensor
+                             and this instance only streams the samples it produces.
+            variant (str): Sensor variant, a key of VARIANTS ("AHT10" or "AHT20" for the AHT2x family).
+        """
+        if variant not in VARIANTS:
+            raise ValueError(f"Unknown AHT sensor variant {variant}, expected one of {', '.join(VARIANTS)}")
+        self.init_command, self.has_crc = VARIANTS[variant]
         self.null = settings.NULL
         self.collection_interval = settings.COLLECTION_INTERVAL
-        try:
-            self.bus = smbus2.SMBus(i2c_bus)
-        except Exception as e:
-            self.bus = None
+        self.oversampling = max(1, settings.ENV_OVERSAMPLING)
+        self.outlier_limit = settings.ENV_OUTLIER_LIMIT
+        self.bus = None
+        if open_bus:
+            try:
+                self.bus = smbus2.SMBus(i2c_bus)
+            except Exception as e:
+                self.bus = None
         self.address = address
         if self.bus:
             self.init_sensor()
 
     async def async_init(self):
         self.redis = await RedisClient.get_instance()
-    
+
     def init_sensor(self):
         if self.bus:
-            self.bus.write_i2c_block_data(self.address, 0xE1, [0x08, 0x00])
+            self.bus.write_i2c_block_data(self.address, self.init_command, [0x08, 0x00])
             time.sleep(0.01)
-    
-    async def read_humidity(self):
-        data = await self._read_raw_data()
-        if data:
-            return round(((data[1] << 12) | (data[2] << 4) | (data[3] >> 4)) * 100 / 1048576, 1)
-        return None
 
-    async def read_temperature(self):
+    async def read_measurement(self):
+        """
+        Trigger a single conversion and decode both values from the same frame.
+
+        Returns:
+            Optional[Tuple[float, float]]: (temperature in °F, relative humidity in %), or None if the frame is invalid.
+        """
         data = await self._read_raw_data()
-        if data:
-            temperature_c = (((data[3] & 0x0F) << 16) | (data[4] << 8) | data[5]) * 200 / 1048576 - 50
-            return round(temperature_c * 9 / 5 + 32, 1)
-        return None
+        if data and not data[0] & STATUS_CALIBRATED:
+            logger.warning("AHT sensor reports it is not calibrated, re-initializing.")
+            await asyncio.to_thread(self.init_sensor)
+            return None
+        return self.decode_frame(data)
+
+    def trigger_measurement(self):
+        """Start a conversion; the frame can be read CONVERSION_TIME seconds later."""
+        self.bus.write_i2c_block_data(self.address, 0xAC, [0x33, 0x00])
+
+    def read_frame(self):
+        """Read the status/data frame of the last conversion, with the CRC byte on sensors that send one."""
+        return self.bus.read_i2c_block_data(self.address, 0x00, 7 if self.has_crc else 6)
+
+    def decode_frame(self, data):
+        """
+        Validate a raw frame (status bits, and the CRC on sensors that send one) and decode it.
+
+        Returns:
+            Optional[Tuple[float, float]]: (temperature in °F, relative humidity in %), or None if the frame is invalid.
+        """
+        if not data:
+            return None
+        status = data[0]
+        if status & STATUS_BUSY:
+            logger.warning("AHT sensor still busy after conversion wait, discarding frame.")
+            return None
+        if not status & STATUS_CALIBRATED:
+            logger.warning("AHT sensor reports it is not calibrated, discarding frame.")
+            return None
+        if self.has_crc and self._crc8(data[:6]) != data[6]:
+            logger.warning(f"AHT CRC mismatch on frame {list(data)}, discarding.")
+            return None
+        humidity = ((data[1] << 12) | (data[2] << 4) | (data[3] >> 4)) * 100 / 1048576
+        temperature_c = (((data[3] & 0x0F) << 16) | (data[4] << 8) | data[5]) * 200 / 1048576 - 50
+        return temperature_c * 9 / 5 + 32, humidity
+
+    async def read_sample(self):
+        """
+        Take `oversampling` conversions and combine them into one sample, rejecting outliers.
+
+        Returns:
+            Tuple[Optional[float], Optional[float]]: (temperature, humidity) rounded to one decimal.
+        """
+        readings = []
+        for _ in range(self.oversampling):
+            reading = await self.read_measurement()
+            if reading:
+                readings.append(reading)
+        return self.combine(readings)
+
+    def combine(self, readings):
+        """
+        Combine oversampled readings into one sample.
+
+        Returns:
+            Tuple[Optional[float], Optional[float]]: (temperature, humidity) rounded to one decimal.
+        """
+        if not readings:
+            return None, None
+        temperature = self._robust_mean([t for t, _ in readings])
+        humidity = self._robust_mean([h for _, h in readings])
+        return round(temperature, 1), round(humidity, 1)
+
+    def _robust_mean(self, values):
+        """Average the values after dropping those further than `outlier_limit` MADs from the median."""
+        if len(values) < 3:
+            return statistics.fmean(values)
+        median = statistics.median(values)
+        mad = statistics.median(abs(v - median) for v in values)
+        if mad == 0:
+            return median
+        kept = [v for v in values if abs(v - median) <= self.outlier_limit * mad]
+        return statistics.fmean(kept)
+
+    @staticmethod
+    def _crc8(data):
+        """CRC-8 used by the AHT2x family (polynomial 0x31, init 0xFF)."""
+        crc = 0xFF
+        for byte in data:
+            crc ^= byte
+            for _ in range(8):
+                crc = ((crc << 1) ^ 0x31) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        return crc
 
     async def _read_raw_data(self):
         if self.bus:
-            await asyncio.to_thread(self.bus.write_i2c_block_data, self.address, 0xAC, [0x33, 0x00])
-            await asyncio.sleep(0.05)
-            return await asyncio.to_thread(self.bus.read_i2c_block_data, self.address, 0x00, 6)
+            await asyncio.to_thread(self.trigger_measurement)
+            await asyncio.sleep(CONVERSION_TIME)
+            return await asyncio.to_thread(self.read_frame)
         return None
 
     async def process_data(self):
         try:
-            temperature = await self.read_temperature()
-            humidity = await self.read_humidity()
-            timestamp = datetime.now(timezone.utc).astimezone().isoformat()
-            await self.stream_data(temperature=temperature, humidity=humidity, timestamp=timestamp)
-        except BaseException as e:
-            await logger.error(f"Error processing data: {e}")
-
-    async def stream_data(self, temperature, humidity, timestamp):
+            temperature, humidity = await self.read_sample()
+            await self.stream_data(temperature=temperature, humidity=humidity)
+        except Exception as e:
+            logger.error(f"Error processing data: {e}")
+
+    async def stream_data(self, temperature, humidity, timestamp_ms=None):
+        # The stream entry ID carries the sample time; samples taken elsewhere keep their own
         data = {
-            "timestamp": timestamp,
             "temperature": temperature,
             "humidity": humidity
         }
-        await self.redis.xadd('environmental', data)
+        await add_sample(self.redis, 'environmental', data, timestamp_ms)
 
     async def run(self):
         await self.async_init()
@@ -0,0 +1,42 @@
+import time
+from core.ping_probe import LatencyHistogram
+from utils.logging_setup import local_logger as logger
+
+class JitterTracker:
+    """
+    Records how late each sample was taken relative to its scheduled time and logs a
+    p50/p99/max summary every `report_interval` seconds. Used by both the in-loop relay
+    monitor and the dedicated sampling process so their jitter can be compared directly.
+    """
+
+    def __init__(self, name: str, report_interval: float = 60.0):
+        self.name = name
+        self.report_interval = report_interval
+        self.histogram = LatencyHistogram()
+        self.max_us = 0
+        self.last_report = time.monotonic()
+
+    def record(self, scheduled: float, actual: float):
+        """
+        Args:
+            scheduled (float): The monotonic time the sample was due.
+            actual (float): The monotonic time the sample was taken.
+        """
+        lateness_us = max(0, int((actual - scheduled) * 1e6))
+        self.histogram.record(lateness_us)
+        self.max_us = max(self.max_us, lateness_us)
+        if actual - self.last_report >= self.report_interval:
+            self.report()
+            self.last_report = actual
+
+    def report(self):
+        if not self.histogram.total:
+            return
+        logger.info(
+            f"Sampling jitter for {self.name}: n={self.histogram.total} "
+            f"p50={self.histogram.percentile(50) / 1000:.2f}ms "
+            f"p99={self.histogram.percentile(99) / 1000:.2f}ms "
+            f"max={self.max_us / 1000:.2f}ms"
+        )
+        self.histogram.reset()
+        self.max_us = 0
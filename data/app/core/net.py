@@ -1,64 +1,55 @@
-from datetime import datetime, timezone
 import asyncio
-import aioping 
 from utils.logging_setup import local_logger as logger
 from utils.config import settings
 from utils.singleton import RedisClient
-
-# This script also needs better error handling
+from utils.stream_writer import add_sample
+from core.ping_probe import IcmpProbe
 
 class NetworkData:
+    """
+    Measures latency, jitter, percentile RTTs and loss to each configured ping target.
+    Probes are paced evenly over the collection interval instead of fired in a burst, and
+    all targets share one ICMP socket. The first target keeps the original un-prefixed
+    fields (avg_rtt, min_rtt, ...); every target is also reported as `<label>_<field>`.
+    """
     def __init__(self):
-        self.target_ip = settings.PING_TARGET
+        self.targets = settings.PING_TARGETS
+        self.primary = next(iter(self.targets))
         self.collection_interval = settings.COLLECTION_INTERVAL
-        self.ping_count = 5  # Number of pings per test
+        self.ping_count = settings.PING_COUNT  # Pings per target per interval
         self.null = settings.NULL
-        
+        self.probe = IcmpProbe(self.targets, timeout=settings.PING_TIMEOUT)
+
     async def async_init(self):
         self.redis = await RedisClient.get_instance()
-        
+
     async def run_ping_test(self):
         try:
-            response_list = await asyncio.gather(*[self.ping_host() for _ in range(self.ping_count)])
-            packets_lost = response_list.count(None)
-            packet_loss_percent = packets_lost / self.ping_count * 100
-            valid_responses = list(filter(None, response_list))
-            if valid_responses:
-                avg_rtt = round(sum(valid_responses)/len(valid_responses),2)
-                min_rtt = round(min(valid_responses),2)
-                max_rtt = round(max(valid_responses),2)
-            else:
-                avg_rtt = self.null
-                min_rtt = self.null
-                max_rtt = self.null
-            await self.stream_data(avg_rtt, min_rtt, max_rtt, packet_loss_percent)
+            stats = await self.probe.run_window(self.ping_count, self.collection_interval)
+            summaries = {label: target.summary(self.null) for label, target in stats.items()}
+            await self.stream_data(summaries)
         except Exception as e:
             logger.error(f"Failed to perform ping test: {e}")
-            
-    async def ping_host(self):
-        try:
-            delay = await aioping.ping(self.target_ip)
-            return delay * 1000
-        except TimeoutError:
-            return None
-    
-    async def stream_data(self, avg_rtt, min_rtt, max_rtt, packet_loss_percent):
+            # Reopen the socket on the next window
+            self.probe.close()
+            await asyncio.sleep(self.collection_interval)
+
+    async def stream_data(self, summaries):
         """Saves the data to Redis."""
         try:
-            timestamp = datetime.now(timezone.utc).astimezone().isoformat()
-            data = {
-                "timestamp": timestamp,
-                "avg_rtt": avg_rtt,
-                "min_rtt": min_rtt,
-                "max_rtt": max_rtt,
-                "packet_loss_percent": packet_loss_percent
-            }
-            await self.redis.xadd('network', data)
+            data = dict(summaries[self.primary])
+            for label, summary in summaries.items():
+                for field, value in summary.items():
+                    data[f"{label}_{field}"] = value
+            await add_sample(self.redis, 'network', data)
         except Exception as e:
             logger.error(f"Failed to stream data to Redis: {e}", exc_info=True)
-        
+
     async def run(self):
         await self.async_init()
-        while True:
-            await self.run_ping_test()
-            await asyncio.sleep(self.collection_interval)
\ No newline at end of file
+        try:
+            while True:
+                # Probes are paced across the interval, so no extra sleep is needed
+                await self.run_ping_test()
+        finally:
+            self.probe.close()
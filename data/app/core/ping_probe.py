@@ -0,0 +1,218 @@
+import asyncio
+import os
+import socket
+import struct
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from utils.logging_setup import local_logger as logger
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram in the style of HdrHistogram. Values are recorded in microseconds
+    into buckets whose width grows with magnitude, so every recorded value keeps a fixed
+    relative precision while memory stays proportional to the number of distinct buckets hit.
+    With the default 8 sub-bucket bits a bucket is at most 1/128 of its lower bound wide, so
+    a value is off by under 0.8% (the reported midpoints by under 0.4%).
+    """
+
+    def __init__(self, sub_bucket_bits: int = 8):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half_count = self.sub_bucket_count >> 1
+        self.counts = Counter()
+        self.total = 0
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return self.sub_bucket_count + (shift - 1) * self.half_count + ((value >> shift) - self.half_count)
+
+    def _value(self, index: int) -> int:
+        """Return the midpoint of the bucket at the given index."""
+        if index < self.sub_bucket_count:
+            return index
+        offset = index - self.sub_bucket_count
+        shift = offset // self.half_count + 1
+        lower = ((offset % self.half_count) + self.half_count) << shift
+        return lower + ((1 << shift) >> 1)
+
+    def record(self, value_us: int):
+        self.counts[self._index(max(0, int(value_us)))] += 1
+        self.total += 1
+
+    def percentile(self, percentile: float) -> Optional[int]:
+        """
+        Args:
+            percentile (float): Percentile in the range 0-100.
+
+        Returns:
+            Optional[int]: The value (in microseconds) at the percentile, or None if empty.
+        """
+        if not self.total:
+            return None
+        threshold = max(1, round(percentile / 100 * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= threshold:
+                return self._value(index)
+        return self._value(max(self.counts))
+
+    def reset(self):
+        self.counts.clear()
+        self.total = 0
+
+
+class TargetStats:
+    """Per-target results for one probing window."""
+
+    def __init__(self):
+        self.sent = 0
+        self.rtts: List[float] = []  # Milliseconds, in send order
+        self.histogram = LatencyHistogram()
+
+    def record(self, rtt_ms: float):
+        self.rtts.append(rtt_ms)
+        self.histogram.record(rtt_ms * 1000)
+
+    def summary(self, null) -> Dict[str, float]:
+        received = len(self.rtts)
+        loss = round((self.sent - received) / self.sent * 100, 2) if self.sent else 100.0
+        if not received:
+            return {"avg_rtt": null, "min_rtt": null, "max_rtt": null, "jitter": null,
+                    "p50_rtt": null, "p90_rtt": null, "p99_rtt": null, "packet_loss_percent": loss}
+        # Jitter as the mean absolute difference between consecutive RTTs
+        diffs = [abs(b - a) for a, b in zip(self.rtts, self.rtts[1:])]
+        jitter = sum(diffs) / len(diffs) if diffs else 0.0
+        return {
+            "avg_rtt": round(sum(self.rtts) / received, 2),
+            "min_rtt": round(min(self.rtts), 2),
+            "max_rtt": round(max(self.rtts), 2),
+            "jitter": round(jitter, 2),
+            "p50_rtt": round(self.histogram.percentile(50) / 1000, 2),
+            "p90_rtt": round(self.histogram.percentile(90) / 1000, 2),
+            "p99_rtt": round(self.histogram.percentile(99) / 1000, 2),
+            "packet_loss_percent": loss,
+        }
+
+
+class IcmpProbe:
+    """
+    Sends ICMP echo requests to several targets over one shared, non-blocking socket.
+    Replies are read by a single event loop reader callback and matched to their request
+    by sequence number, so no task or socket is created per ping.
+
+    An unprivileged ICMP datagram socket is preferred; a raw socket is used as a fallback
+    (the data container runs privileged).
+    """
+
+    def __init__(self, targets: Dict[str, str], timeout: float = 2.0):
+        """
+        Args:
+            targets (Dict[str, str]): Target addresses keyed by label (e.g. {"google": "8.8.8.8"}).
+            timeout (float): Seconds to wait for the replies of the last probe in a window.
+        """
+        self.targets = targets
+        self.timeout = timeout
+        self.identifier = os.getpid() & 0xFFFF
+        self.sequence = 0
+        self.pending: Dict[int, Tuple[str, int]] = {}  # seq -> (label, send time ns)
+        self.stats: Dict[str, TargetStats] = {}
+        self.sock = None
+        self.raw = False
+        self.loop = None
+
+    def open(self):
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        except PermissionError:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            self.raw = True
+        self.sock.setblocking(False)
+        self.loop = asyncio.get_running_loop()
+        self.loop.add_reader(self.sock.fileno(), self._on_readable)
+        logger.debug(f"ICMP probe socket opened ({'raw' if self.raw else 'datagram'})")
+
+    def close(self):
+        if self.sock is not None:
+            self.loop.remove_reader(self.sock.fileno())
+            self.sock.close()
+            self.sock = None
+
+    @staticmethod
+    def _checksum(data: bytes) -> int:
+        if len(data) % 2:
+            data += b'\x00'
+        total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+        total = (total >> 16) + (total & 0xFFFF)
+        total += total >> 16
+        return ~total & 0xFFFF
+
+    def _packet(self, sequence: int) -> bytes:
+        payload = b'rpi-probe'.ljust(16, b'\x00')
+        header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, self.identifier, sequence)
+        checksum = self._checksum(header + payload)
+        return struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, checksum, self.identifier, sequence) + payload
+
+    def send(self, label: str):
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        self.pending[self.sequence] = (label, time.perf_counter_ns())
+        self.stats[label].sent += 1
+        try:
+            self.sock.sendto(self._packet(self.sequence), (self.targets[label], 0))
+        except OSError as e:
+            # Unreachable network etc. - counts as loss
+            logger.debug(f"ICMP send to {label} ({self.targets[label]}) failed: {e}")
+
+    def _on_readable(self):
+        while True:
+            try:
+                data = self.sock.recv(1024)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.debug(f"ICMP receive failed: {e}")
+                return
+            received_ns = time.perf_counter_ns()
+            if self.raw:
+                data = data[(data[0] & 0x0F) * 4:]  # Strip the IP header
+            if len(data) < 8:
+                continue
+            icmp_type, _, _, identifier, sequence = struct.unpack('!BBHHH', data[:8])
+            # Datagram sockets have their identifier rewritten by the kernel
+            if icmp_type != ICMP_ECHO_REPLY or (self.raw and identifier != self.identifier):
+                continue
+            entry = self.pending.pop(sequence, None)
+            if entry is None:
+                continue  # Late reply from a previous window
+            label, sent_ns = entry
+            self.stats[label].record((received_ns - sent_ns) / 1e6)
+
+    async def run_window(self, count: int, duration: float) -> Dict[str, TargetStats]:
+        """
+        Send `count` probes to every target, paced evenly over `duration` seconds and
+        interleaved between targets, then wait for outstanding replies.
+
+        Returns:
+            Dict[str, TargetStats]: Stats keyed by target label.
+        """
+        if self.sock is None:
+            self.open()
+        self.stats = {label: TargetStats() for label in self.targets}
+        self.pending.clear()
+        total = count * len(self.targets)
+        spacing = max(0.0, duration - self.timeout) / total if total else 0
+        for _ in range(count):
+            for label in self.targets:
+                self.send(label)
+                await asyncio.sleep(spacing)
+        deadline = time.monotonic() + self.timeout
+        while self.pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return self.stats
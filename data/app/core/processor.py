@@ -1,9 +1,13 @@
 import asyncio
-from datetime import datetime, timezone
-from influxdb_client import Point
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from influxdb_client import Point, WritePrecision
 from utils.logging_setup import local_logger as logger
 from utils.config import settings
 from utils.singleton import InfluxWriter, RedisClient
+from utils.stream_schema import decode, isoformat
 from aws.client import publish
 
 class BaseProcessor:
@@ -12,222 +16,300 @@ class BaseProcessor:
         self.write_api=None
         self.bucket=settings.BUCKET
         self.org=settings.ORG
+        self.publish=publish
 
     async def async_init(self):
         self.redis=await RedisClient.get_instance()
         self.write_api=await InfluxWriter.get_instance()
-    
-    async def write_to_influxdb(self, points):
-        """Write one or many InfluxDB points to the database."""
+
+    async def write_to_influxdb(self, points) -> bool:
+        """
+        Write one or many InfluxDB points to the database.
+
+        Returns:
+            bool: True if the points were written, False if the write failed.
+        """
         try:
             await self.write_api.write(bucket=self.bucket, org=self.org, record=points)
+            return True
         except Exception as e:
             logger.error(f"Failed to write to InfluxDB: {e}")
-    
+            return False
+
     async def publish_to_aws(self, topic: str, data: dict):
         """Publish data to AWS IoT Core."""
         try:
-            await publish(topic, data)
+            await self.publish(topic, data)
             logger.debug(f"Published to AWS: {topic} - {data}")
         except Exception as e:
             logger.error(f"Failed to publish to AWS: {e}")
 
-class RelayProcessor(BaseProcessor):
+# Groups of the per-stream processors that processor_group replaced ({} is the stream name)
+LEGACY_GROUPS = ('general_group', 'relay_group_{}')
+
+def _parse_id(entry_id) -> Tuple[int, int]:
+    ms, _, seq = (entry_id.decode() if isinstance(entry_id, bytes) else str(entry_id)).partition('-')
+    return int(ms), int(seq or 0)
+
+async def _legacy_start(redis, stream: str) -> Tuple[Optional[str], List[str]]:
     """
-    Processor for relay data streams. Relay data is collected at a high rate (Every Second) and must be averaged
-    over a certain period (e.g., 60 data points over 60 seconds) before uploading to InfluxDB and AWS.
+    Find where a replaced consumer group got to on a stream, so its successor resumes there
+    instead of skipping everything written while the processor was being upgraded.
+
+    Returns:
+        Tuple[Optional[str], List[str]]: The ID to create the new group at (None when the stream
+                                         has no legacy group) and the legacy groups found.
     """
-    def __init__(self, relay_id, collection_interval=60, batch_size=60):
-        super().__init__()
-        self.relay_id=relay_id
-        self.collection_interval=collection_interval
-        self.batch_size=batch_size
-        self.group_name=f'relay_group_{self.relay_id}'
-        self.consumer_name=f'processor_{self.relay_id}'
-    
-    async def async_init(self):
-        await super().async_init()
-        await self.setup_groups()
-    
-    async def setup_groups(self):
-        """
-        Setup the Redis consumer groups for the relay stream. If the group already exists, proceed and log.
-        """
+    legacy = {name.format(stream) for name in LEGACY_GROUPS}
+    start, found = None, []
+    for group in await redis.xinfo_groups(stream):
+        name = group['name'].decode() if isinstance(group['name'], bytes) else group['name']
+        if name not in legacy:
+            continue
+        found.append(name)
+        position = _parse_id(group['last-delivered-id'])
+        if group['pending']:
+            # Start just before the oldest unacknowledged entry so it is delivered again
+            ms, seq = _parse_id((await redis.xpending(stream, name))['min'])
+            position = (ms, seq - 1) if seq else (ms - 1, 2 ** 64 - 1) if ms else (0, 0)
+        if start is None or position < start:
+            start = position
+    return (f"{start[0]}-{start[1]}" if start else None), found
+
+async def create_groups(redis, streams, group_name, migrate: bool = False):
+    """
+    Create the consumer group on each stream. New groups start at the end of the stream ('$')
+    so history written before the processor existed is not uploaded twice.
+
+    Args:
+        migrate (bool): Take over from the groups in LEGACY_GROUPS: the new group starts where
+                        they stopped (including their pending entries) and they are destroyed.
+    """
+    for stream in streams:
+        start, legacy = '$', []
+        if migrate:
+            try:
+                legacy_start, legacy = await _legacy_start(redis, stream)
+                start = legacy_start or start
+            except Exception as e:
+                # XINFO fails on a stream that does not exist yet; there is nothing to migrate
+                logger.debug(f"No legacy groups to migrate on {stream}: {e}")
         try:
-            await self.redis.xgroup_create(self.relay_id, self.group_name, id='0', mkstream=True)
+            await redis.xgroup_create(stream, group_name, id=start, mkstream=True)
+            if legacy:
+                logger.info(f"Created group {group_name} for {stream} at {start}, taking over from {legacy}")
         except Exception as e:
-            if "BUSYGROUP" not in str(e):
-                logger.critical(f"Error creating group {self.group_name} for {self.relay_id}: {e}")
+            if "BUSYGROUP" in str(e):
+                logger.debug(f"Group {group_name} already exists for {stream}")
             else:
-                logger.debug(f"Group {self.group_name} already exists for {self.relay_id}")
+                logger.critical(f"Error creating group {group_name} for {stream}: {e}")
+                continue
+        for name in legacy:
+            try:
+                await redis.xgroup_destroy(stream, name)
+                logger.info(f"Removed legacy group {name} from {stream}")
+            except Exception as e:
+                logger.error(f"Error removing legacy group {name} from {stream}: {e}")
 
-    async def process_relay_stream(self):
-        """Read a batch of messages from the relay stream and aggregate results."""
-        try:
-            message = await self.redis.xreadgroup(
-                groupname=self.group_name,
-                consumername=self.consumer_name,
-                streams={self.relay_id: '>'},
-                count=self.batch_size,
-                block=1000
-            )
-            if message:
-                await self.process_data(message)
-        except Exception as e:
-            logger.error(f"Error reading stream {self.relay_id}: {e}")
+class StreamHandler(BaseProcessor, ABC):
+    """
+    Handles the messages of one stream on behalf of the StreamProcessor.
 
-    async def process_data(self, message):
-        """
-        Average the relay data points (volts, watts, amps) and then:
-        - Write the averaged data to InfluxDB
-        - Publish the same averaged data to AWS IoT under topic `relay/data`
+    `handle` receives each batch as soon as it is read and returns the message IDs that are
+    done with and can be acknowledged. `flush` is called on every consumer loop iteration so
+    handlers that buffer (aggregate) can emit on time even when no new messages arrive.
+
+    Messages whose points could not be written to InfluxDB are not acknowledged: they stay in
+    the consumer's pending list, so `recover_pending` re-reads them after a restart, and the
+    points are held here and written again every PROCESSOR_RETRY_INTERVAL seconds meanwhile.
+    """
+    def __init__(self, stream: str):
+        super().__init__()
+        self.stream = stream
+        self.unwritten: List[Tuple[list, List[bytes]]] = []  # (points, message IDs) of failed writes
+        self.retried = 0.0
+
+    @abstractmethod
+    async def handle(self, messages) -> List[bytes]:
+        ...
+
+    async def flush(self, force: bool = False) -> List[bytes]:
+        return await self.retry_unwritten(force)
+
+    async def write_batch(self, points: list, message_ids: List[bytes]) -> List[bytes]:
         """
-        _volts=0.0
-        _watts=0.0
-        _amps=0.0
-        msgs=message[0][1]
-        count=0
+        Write points and return the message IDs they came from, or hold them for a retry.
 
-        for message_id, msg in msgs:
-            try:
-                volts=float(msg[b'volts'])
-                watts=float(msg[b'watts'])
-                amps=float(msg[b'amps'])
-                _volts+=volts
-                _watts+=watts
-                _amps+=amps
-                count+=1
-            except Exception as e:
-                logger.error(f"Error processing message {message_id}: {e}")
-        if count>0:
-            avg_volts=round(_volts/count, 2)
-            avg_watts=round(_watts/count, 2)
-            avg_amps=round(_amps/count, 2)
-            timestamp=datetime.now(timezone.utc).astimezone().isoformat()
-            # Generic Data dictionary to be used for InfluxDB and AWS
-            data={
-                "source": self.relay_id,
-                "timestamp": timestamp,
-                "volts": avg_volts,
-                "watts": avg_watts,
-                "amps": avg_amps,
-            }
-
-            # InfluxDB Point
-            point = Point(self.relay_id)\
-                .tag("source", data['source'])\
-                .field("volts", data['volts'])\
-                .field("watts", data['watts'])\
-                .field("amps", data['amps'])\
-                .time(datetime.fromisoformat(data['timestamp']))
-            
-        # Concurrently write to InfluxDB and publish to AWS
-            await asyncio.gather(
-                self.write_to_influxdb(point),
-                self.publish_to_aws("relay/data", data)
-            )
+        Returns:
+            List[bytes]: The IDs that can be acknowledged; empty if the write failed.
+        """
+        if not self.unwritten and await self.write_to_influxdb(points):
+            return message_ids
+        # Behind earlier failures, or failed itself: keep the order and try again later
+        self.unwritten.append((points, message_ids))
+        if len(self.unwritten) > settings.PROCESSOR_MAX_UNWRITTEN:
+            _, dropped = self.unwritten.pop(0)
+            # Still pending in Redis, so they are written after the next restart
+            logger.warning(f"Holding too many failed writes for {self.stream}, leaving {len(dropped)} messages to recovery")
+        return []
 
-    async def run(self):
-        """Main loop for the Relay Processor."""
-        await self.async_init()
-        while True:
-            await self.process_relay_stream()
-            await asyncio.sleep(self.collection_interval)
+    async def retry_unwritten(self, force: bool = False) -> List[bytes]:
+        """Write the held batches, oldest first, and return the IDs of those now written."""
+        if not self.unwritten:
+            return []
+        now = time.monotonic()
+        if not force and now - self.retried < settings.PROCESSOR_RETRY_INTERVAL:
+            return []
+        self.retried = now
+        written = []
+        while self.unwritten:
+            points, message_ids = self.unwritten[0]
+            if not await self.write_to_influxdb(points):
+                break
+            self.unwritten.pop(0)
+            written.extend(message_ids)
+        if written:
+            logger.info(f"Wrote {len(written)} held messages of {self.stream} to InfluxDB")
+        return written
 
-class GeneralProcessor(BaseProcessor):
+class RelayAggregator(StreamHandler):
     """
-    Processor for general data streams (cellular, network, environmental).
-    These data points are collected less frequently and can be uploaded as-is.
-    After uploading to InfluxDB, also publish to AWS IoT.
+    Handler for relay data streams. Relay data is collected at a high rate and must be averaged
+    over a window (e.g. 60 seconds) before uploading to InfluxDB and AWS. Messages are acknowledged
+    only once the window containing them has been written to InfluxDB.
+
+    Relay sampling adapts between 1 and `max_gap` seconds, so the average is weighted by time:
+    each sample counts for the time until the next one, at most `max_gap` seconds. Otherwise the
+    densely sampled busy moments would outweigh the quiet ones.
     """
+    def __init__(self, relay_id, window=60, max_gap=10):
+        super().__init__(relay_id)
+        self.relay_id=relay_id
+        self.window_ms=window*1000
+        self.max_gap_ms=max_gap*1000
+        self._reset()
 
-    def __init__(self, streams, collection_interval=300):
-        super().__init__()
-        self.collection_interval = collection_interval
-        self.group_name = 'general_group'
-        self.consumer_name = 'general_processor'
-        self.streams = streams
+    def _reset(self):
+        self.sums={"volts": 0.0, "watts": 0.0, "amps": 0.0}
+        self.weight=0
+        self.held=None  # (timestamp, values) of the newest sample, weighted once the next one arrives
+        self.count=0
+        self.window_start_ms=None
+        self.window_opened=None  # Monotonic time the window was opened, for idle flushes
+        self.last_ms=None
+        self.pending_ids=[]
 
-    async def async_init(self):
-        await super().async_init()
-        await self.setup_groups()
+    def _add_held(self, until_ms):
+        """Add the held sample to the sums, weighted by the time until `until_ms` (at most max_gap)."""
+        timestamp_ms, values=self.held
+        weight=min(max(until_ms-timestamp_ms, 1), self.max_gap_ms)
+        for field in self.sums:
+            self.sums[field]+=values[field]*weight
+        self.weight+=weight
+        self.held=None
 
-    async def setup_groups(self):
-        """
-        Create a consumer group for each stream. If already exists, proceed without error.
-        """
-        for stream in self.streams:
+    async def handle(self, messages) -> List[bytes]:
+        acked=[]
+        for message_id, msg in messages:
             try:
-                await self.redis.xgroup_create(stream, self.group_name, id='0', mkstream=True)
+                timestamp_ms, values=decode(message_id, msg)
+                sample={field: float(values[field]) for field in self.sums}
             except Exception as e:
-                if "BUSYGROUP" in str(e):
-                    logger.debug(f"Group {self.group_name} already exists for {stream}")
-                else:
-                    logger.critical(f"Error creating group {self.group_name} for {stream}: {e}")
+                logger.error(f"Error processing message {message_id}: {e}")
+                acked.append(message_id)  # Unparseable, never retry
+                continue
+            if self.held is not None:
+                self._add_held(timestamp_ms)
+            if self.window_start_ms is not None and timestamp_ms-self.window_start_ms>=self.window_ms:
+                acked.extend(await self.flush(force=True))
+            if self.window_start_ms is None:
+                self.window_start_ms=timestamp_ms
+                self.window_opened=time.monotonic()
+            self.held=(timestamp_ms, sample)
+            self.count+=1
+            self.last_ms=timestamp_ms
+            self.pending_ids.append(message_id)
+        return acked
 
-    async def read_single_stream(self, stream_name):
+    async def flush(self, force: bool = False) -> List[bytes]:
         """
-        Read up to 10 messages from a single stream. Blocks up to 1000ms if no messages are available.
+        Average the buffered relay data points (volts, watts, amps) and then:
+        - Write the averaged data to InfluxDB
+        - Publish the same averaged data to AWS IoT under topic `relay/data`
+        Windows whose write failed are retried first.
         """
-        try:
-            response = await self.redis.xreadgroup(
-                groupname=self.group_name,
-                consumername=self.consumer_name,
-                streams={stream_name: '>'},
-                count=10,
-                block=1000
-            )
-            return response
-        except Exception as e:
-            logger.error(f"Error reading stream {stream_name}: {e}")
-            return []
+        acked=await self.retry_unwritten(force)
+        if not self.count:
+            return acked
+        if not force and time.monotonic()-self.window_opened<self.window_ms/1000:
+            return acked
+        if self.held is not None:
+            # No next sample yet: the newest one counts for the longest gap
+            self._add_held(self.held[0]+self.max_gap_ms)
+        data={
+            "source": self.relay_id,
+            "timestamp": isoformat(self.last_ms),
+            "volts": round(self.sums["volts"]/self.weight, 2),
+            "watts": round(self.sums["watts"]/self.weight, 2),
+            "amps": round(self.sums["amps"]/self.weight, 2),
+        }
+        point = Point(self.relay_id)\
+            .tag("source", data['source'])\
+            .field("volts", data['volts'])\
+            .field("watts", data['watts'])\
+            .field("amps", data['amps'])\
+            .time(self.last_ms, WritePrecision.MS)
+        flushed=self.pending_ids
+        self._reset()
+        # Concurrently write to InfluxDB and publish to AWS
+        written, _ = await asyncio.gather(
+            self.write_batch([point], flushed),
+            self.publish_to_aws("relay/data", data)
+        )
+        return acked+written
+
+class PassthroughHandler(StreamHandler):
+    """
+    Handler for general data streams (cellular, network, environmental).
+    These data points are collected less frequently and are uploaded as-is:
+    written to InfluxDB, then published to AWS IoT.
+    """
 
-    async def create_points_and_dicts(self, stream_name, messages):
+    def create_points_and_dicts(self, messages):
         """
         From the raw Redis messages, create both:
         - A list of InfluxDB Point objects for database insertion.
         - A list of data dictionaries for AWS IoT publishing.
 
         Args:
-            stream_name (bytes): The name of the stream as bytes.
             messages: The list of messages (message_id, message_dict) from Redis.
 
         Returns:
-            (points, data_dicts) tuple
+            (points, data_dicts, message_ids) tuple, message_ids being those the points came from
         """
         points = []
         data_dicts = []
-        stream_str = stream_name.decode()
+        message_ids = []
 
         for message_id, msg in messages:
             try:
-                # Extract timestamp (if missing, use current time)
-                timestamp = msg[b'timestamp'].decode() if b'timestamp' in msg else datetime.utcnow().isoformat()
-
-                # Build a dict of fields from the message
-                data = {}
-                for key, value in msg.items():
-                    key_str = key.decode()
-                    if key_str == 'timestamp':
-                        data[key_str] = value.decode()
-                    else:
-                        # Convert numerical fields to float
-                        data[key_str] = float(value.decode())
+                # The entry ID carries the sample time; values are already numeric
+                timestamp_ms, values = decode(message_id, msg)
 
                 # Prepare Influx Point
-                point = Point(stream_str).tag("source", stream_str).time(datetime.fromisoformat(timestamp))
-                for k, v in data.items():
-                    if k != 'timestamp':
-                        point = point.field(k, v)
-                
+                point = Point(self.stream).tag("source", self.stream).time(timestamp_ms, WritePrecision.MS)
+                for k, v in values.items():
+                    point = point.field(k, v)
+
                 points.append(point)
-                data_dicts.append(data)
+                data_dicts.append({"timestamp": isoformat(timestamp_ms), **values})
+                message_ids.append(message_id)
             except Exception as e:
-                logger.error(f"Error processing message {message_id} in {stream_str}: {e}")
+                logger.error(f"Error processing message {message_id} in {self.stream}: {e}")
 
-        return points, data_dicts
+        return points, data_dicts, message_ids
 
-    def determine_aws_topic(self, stream_name: str):
+    def determine_aws_topic(self):
         """
         Determine the AWS IoT topic based on the stream name.
 
@@ -236,35 +318,206 @@ class GeneralProcessor(BaseProcessor):
         - "network" -> "network/data"
         - "environmental" -> "environmental/data"
         """
-        return f"{stream_name}/data"
+        return f"{self.stream}/data"
+
+    async def handle(self, messages) -> List[bytes]:
+        points, data_dicts, message_ids = self.create_points_and_dicts(messages)
+        # Unparseable messages are acknowledged right away, they would never succeed
+        written = set(message_ids)
+        acked = [message_id for message_id, _ in messages if message_id not in written]
+        if points:
+            # Write all points to InfluxDB in one request
+            acked.extend(await self.write_batch(points, message_ids))
+            topic = self.determine_aws_topic()
+            for data in data_dicts:
+                await self.publish_to_aws(topic, data)
+        return acked
+
+def build_handler(stream: str, spec: dict) -> StreamHandler:
+    """
+    Create the handler described by a spec, e.g. {"kind": "aggregate", "window": 60, "max_gap": 10} or
+    {"kind": "passthrough"}. Specs are plain dicts so they can be sent to worker processes.
+    """
+    if spec["kind"] == "aggregate":
+        return RelayAggregator(stream, window=spec.get("window", settings.RELAY_AGGREGATION_WINDOW),
+                               max_gap=spec.get("max_gap", 10))
+    if spec["kind"] == "passthrough":
+        return PassthroughHandler(stream)
+    raise ValueError(f"Unknown stream handler kind: {spec['kind']}")
+
+class StreamProcessor(BaseProcessor):
+    """
+    Single consumer for every data stream. One blocking XREADGROUP covers all streams; each
+    stream's messages go to its handler (RelayAggregator or PassthroughHandler) as soon as
+    they arrive. While reads come back full the consumer keeps draining without blocking and
+    grows the batch size; once it catches up the batch shrinks back and reads block again.
+    """
 
-    async def process_single_stream(self, stream: str):
+    def __init__(self, handlers: Dict[str, StreamHandler], consumer_name: str = 'processor',
+                 min_batch: int = 32, max_batch: int = 1024, block_ms: int = 1000, create_groups: bool = True,
+                 group_name: str = settings.PROCESSOR_GROUP):
         """
-        Process one stream: read messages, convert them, write to Influx, publish to AWS.
+        Args:
+            handlers (Dict[str, StreamHandler]): Handler for each stream, keyed by stream name.
+            consumer_name (str): This consumer's name within the consumer group.
+            group_name (str): Consumer group to read through. Each group receives every message.
+            create_groups (bool): Create the consumer groups on start. Worker processes leave this
+                                  to the supervisor so setup happens once.
+            min_batch (int): Smallest per-stream COUNT, used while idle.
+            max_batch (int): Largest per-stream COUNT, reached while draining a backlog.
+            block_ms (int): How long a read blocks once the streams are drained.
         """
-        response = await self.read_single_stream(stream)
-        if not response:
+        super().__init__()
+        self.handlers = handlers
+        self.group_name = group_name
+        self.consumer_name = consumer_name
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.batch_size = min_batch
+        self.block_ms = block_ms
+        self.create_groups = create_groups
+        self.metrics = {"messages": 0, "batches": 0, "acked": 0, "errors": 0}
+        self.metrics_key = settings.PROCESSOR_METRICS_KEY.format(consumer_name)
+        self.metrics_interval = settings.PROCESSOR_METRICS_INTERVAL
+        self.metrics_written = 0.0
+
+    async def async_init(self):
+        await super().async_init()
+        for handler in self.handlers.values():
+            await handler.async_init()
+        if self.create_groups:
+            await create_groups(self.redis, self.handlers, self.group_name,
+                                migrate=self.group_name == settings.PROCESSOR_GROUP)
+
+    async def read(self, block: Optional[int], stream_id: str = '>'):
+        try:
+            return await self.redis.xreadgroup(
+                groupname=self.group_name,
+                consumername=self.consumer_name,
+                streams={stream: stream_id for stream in self.handlers},
+                count=self.batch_size,
+                block=block
+            )
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Error reading streams: {e}")
+            await asyncio.sleep(1)
+            return []
+
+    async def claim_orphaned(self):
+        """
+        Take over entries other consumers of the group read but never acknowledged and have left
+        idle for PROCESSOR_CLAIM_MIN_IDLE seconds, such as those of the single 'processor'
+        consumer before workers mode was enabled, or of a worker whose index no longer exists.
+        Claimed entries join this consumer's pending list for `recover_pending` to handle.
+        """
+        min_idle_ms = int(settings.PROCESSOR_CLAIM_MIN_IDLE * 1000)
+        for stream in self.handlers:
+            start_id, claimed = '0-0', 0
+            while True:
+                try:
+                    # Reply is [next start ID, claimed entries, deleted IDs]; '0-0' ends the scan
+                    start_id, messages, *_ = await self.redis.xautoclaim(
+                        stream, self.group_name, self.consumer_name, min_idle_ms,
+                        start_id=start_id, count=self.max_batch
+                    )
+                except Exception as e:
+                    logger.error(f"Error claiming pending messages on {stream}: {e}")
+                    break
+                claimed += len(messages)
+                if start_id in (b'0-0', '0-0'):
+                    break
+            if claimed:
+                logger.info(f"Claimed {claimed} idle pending messages on {stream} for {self.consumer_name}")
+
+    async def recover_pending(self):
+        """
+        Re-handle messages this consumer read but never acknowledged (e.g. before a restart).
+        Reading with ID '0' returns the consumer's own pending entries instead of new ones.
+        """
+        last_ids = {stream: '0' for stream in self.handlers}
+        while last_ids:
+            try:
+                response = await self.redis.xreadgroup(
+                    groupname=self.group_name,
+                    consumername=self.consumer_name,
+                    streams=last_ids,
+                    count=self.max_batch
+                )
+            except Exception as e:
+                logger.error(f"Error reading pending messages: {e}")
+                return
+            last_ids = {}
+            for s_name, messages in response or []:
+                if messages:
+                    await self.process([(s_name, messages)])
+                    last_ids[s_name.decode()] = messages[-1][0]
+
+    async def write_metrics(self, force: bool = False):
+        """Publish this consumer's counters to Redis so per-worker throughput can be compared."""
+        now = time.monotonic()
+        if not force and now - self.metrics_written < self.metrics_interval:
             return
-        # response format: [(stream_name_bytes, [(message_id, {fields}), ...])]
-        for s_name, messages in response:
-            points, data_dicts = await self.create_points_and_dicts(s_name, messages)
-            if points:
-                # Write all points to InfluxDB
-                await self.write_to_influxdb(points)
-                
-                # Publish each data dictionary to AWS
-                stream_str = s_name.decode()
-                topic = self.determine_aws_topic(stream_str)
-                for data in data_dicts:
-                    # Ensure timestamp is present; if not, add current time
-                    if 'timestamp' not in data:
-                        data['timestamp'] = datetime.now(timezone.utc).astimezone().isoformat()
-                    await self.publish_to_aws(topic, data)
+        self.metrics_written = now
+        try:
+            await self.redis.hset(self.metrics_key, mapping={
+                **self.metrics, "batch_size": self.batch_size, "pid": os.getpid(), "updated": int(time.time())
+            })
+            await self.redis.expire(self.metrics_key, self.metrics_interval * 10)
+        except Exception as e:
+            logger.debug(f"Error writing processor metrics: {e}")
+
+    async def ack(self, stream: str, message_ids: List[bytes]):
+        if message_ids:
+            try:
+                await self.redis.xack(stream, self.group_name, *message_ids)
+                self.metrics["acked"] += len(message_ids)
+            except Exception as e:
+                logger.error(f"Error acknowledging {len(message_ids)} messages on {stream}: {e}")
+
+    async def process(self, response) -> bool:
+        """
+        Dispatch one XREADGROUP response to the handlers.
+
+        Returns:
+            bool: True if any stream returned a full batch (more is probably waiting).
+        """
+        full = False
+        for s_name, messages in response or []:
+            stream = s_name.decode()
+            full = full or len(messages) >= self.batch_size
+            self.metrics["messages"] += len(messages)
+            self.metrics["batches"] += 1
+            try:
+                acked = await self.handlers[stream].handle(messages)
+            except Exception as e:
+                self.metrics["errors"] += 1
+                logger.error(f"Error handling {len(messages)} messages from {stream}: {e}")
+                continue
+            await self.ack(stream, acked)
+        return full
+
+    async def flush(self, force: bool = False):
+        for stream, handler in self.handlers.items():
+            try:
+                await self.ack(stream, await handler.flush(force=force))
+            except Exception as e:
+                logger.error(f"Error flushing {stream}: {e}")
 
     async def run(self):
         await self.async_init()
-        while True:
-            # Every collection_interval seconds, process all streams in parallel
-            await asyncio.sleep(self.collection_interval)
-            tasks = [asyncio.create_task(self.process_single_stream(stream)) for stream in self.streams]
-            await asyncio.gather(*tasks)
\ No newline at end of file
+        await self.claim_orphaned()
+        await self.recover_pending()
+        draining = False
+        try:
+            while True:
+                response = await self.read(block=None if draining else self.block_ms)
+                draining = await self.process(response)
+                if draining:
+                    self.batch_size = min(self.batch_size * 2, self.max_batch)
+                else:
+                    self.batch_size = max(self.batch_size // 2, self.min_batch)
+                await self.flush()
+                await self.write_metrics()
+        finally:
+            await self.flush(force=True)
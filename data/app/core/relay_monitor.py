@@ -1,16 +1,20 @@
 import asyncio
-from typing import Dict
+import time
+from typing import Dict, Optional
 import board
 import adafruit_ina260
 from utils.validator import RelayConfig
 from utils.logging_setup import local_logger as logger
 from utils.singleton import RedisClient
+from utils.stream_writer import add_sample
 from core.rules_engine import RulesEngine
 from core.schedule_engine import ScheduleEngine
 from core.relay_manager import RelayManager
+from core.adaptive_sampler import AdaptiveSampler
+from core.jitter import JitterTracker
 
 class RelayMonitor:
-    def __init__(self, relay_id: str, relay_config: RelayConfig, relay_manager: RelayManager):
+    def __init__(self, relay_id: str, relay_config: RelayConfig, relay_manager: RelayManager, sample_locally: bool = True):
         """
         Initializes the RelayMonitor with the given relay ID, configuration, and a shared RelayManager.
 
@@ -18,6 +22,8 @@ class RelayMonitor:
             relay_id (str): The identifier for the relay.
             relay_config (RelayConfig): The configuration for the relay.
             relay_manager (RelayManager): The RelayManager instance for controlling relay states.
+            sample_locally (bool): Read the sensor on this event loop. When False the samples are
+                                   taken by the sampling process and delivered through handle_sample.
         """
         self.relay_id = relay_id
         self.config = relay_config
@@ -28,11 +34,14 @@ class RelayMonitor:
         self.monitor = relay_config.monitor
         self.schedule = relay_config.schedule
         self.rules = relay_config.rules if relay_config.rules else {}
-        self.collection_interval = 1
+        self.sampler = AdaptiveSampler(relay_config.sampling)
+        self.collection_interval = self.sampler.interval
         self.relay_manager = relay_manager
+        self.sample_locally = sample_locally
+        self.jitter = JitterTracker(f"{relay_id} (event loop)")
 
         # Initialize RulesEngine with Rule objects
-        self.rules_engine = RulesEngine(self.relay_id, self.rules, relay_manager=self.relay_manager)
+        self.rules_engine = RulesEngine(self.relay_id, self.rules, relay_manager=self.relay_manager, source=self.name)
         self.schedule_engine = ScheduleEngine(self.relay_id, self.schedule)
         self.state = self.boot_power
         self.i2c = None
@@ -47,7 +56,9 @@ class RelayMonitor:
         else:
             logger.debug(f"Schedule disabled for {self.relay_id}")
 
-        if self.monitor:
+        if self.monitor and not self.sample_locally:
+            logger.debug(f"Relay {self.relay_id} is sampled by the sampling process")
+        elif self.monitor:
             try:
                 self.i2c = board.I2C()
                 self.sensor = adafruit_ina260.INA260(self.i2c, address=self.address)
@@ -61,7 +72,7 @@ class RelayMonitor:
 
         if tasks:
             await asyncio.gather(*tasks)
-        else:
+        elif not self.monitor:
             logger.warning(f"No tasks running for relay {self.relay_id}")
     
     async def init_redis(self):
@@ -96,16 +107,34 @@ class RelayMonitor:
     async def collect_data_loop(self):
         """
         Collects data from the sensor in a loop and evaluates rules based on the collected data.
+        The delay between samples is chosen by the AdaptiveSampler. The loop keeps the original
+        relative sleep, so the jitter recorded here (how late each wake-up is against the sleep
+        it asked for) is the baseline the sampling process is compared with.
         """
+        due = time.monotonic()
         while True:
+            self.jitter.record(due, time.monotonic())
             try:
                 data = await self.collect_data()
-                await self.stream_data(data)
-                await self.rules_engine.evaluate_rules(data)
-                logger.debug(f"Collected and evaluated data for relay {self.relay_id}: {data}")
+                await self.handle_sample(data)
+                proximity = self.rules_engine.threshold_proximity(data)
+                self.collection_interval = self.sampler.next_interval(data, proximity)
+                logger.debug(f"Collected and evaluated data for relay {self.relay_id}: {data}, next sample in {self.collection_interval}s")
             except Exception as e:
                 logger.error(f"Error collecting data for relay {self.relay_id}: {e}")
+            due = time.monotonic() + self.collection_interval
             await asyncio.sleep(self.collection_interval)
+
+    async def handle_sample(self, data: Dict[str, float], timestamp_ms: Optional[int] = None):
+        """
+        Stream a sample and evaluate the rules against it.
+
+        Args:
+            data (Dict[str, float]): The sample, as returned by collect_data.
+            timestamp_ms (Optional[int]): When the sample was taken, if not now.
+        """
+        await self.stream_data(data, timestamp_ms)
+        await self.rules_engine.evaluate_rules(data)
     
     async def collect_data(self) -> Dict[str, float]:
         """
@@ -119,18 +148,20 @@ class RelayMonitor:
         amps = await asyncio.to_thread(lambda: round(self.sensor.current / 1000, 2))
         return {"relay": self.relay_id, "volts": volts, "amps": amps, "watts": watts}
     
-    async def stream_data(self, data: Dict[str, float]):
+    async def stream_data(self, data: Dict[str, float], timestamp_ms: Optional[int] = None):
         """
         Streams the collected data to Redis for storage and further processing.
 
         Args:
             data (Dict[str, float]): The data to be streamed.
+            timestamp_ms (Optional[int]): Sample time used as the entry ID; defaults to now.
         """
         if not self.redis:
             logger.error("Redis client not initialized")
             return
         try:
-            await self.redis.xadd(self.relay_id, data)
+            # The stream name already identifies the relay
+            await add_sample(self.redis, self.relay_id, {k: v for k, v in data.items() if k != "relay"}, timestamp_ms)
             logger.debug(f"Data streamed for relay {self.relay_id}: {data}")
         except Exception as e:
             logger.error(f"Error streaming data for relay {self.relay_id}: {e}")
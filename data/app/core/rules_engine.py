@@ -1,8 +1,10 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from utils.logging_setup import local_logger as logger
 from utils.config import settings
 from core.relay_manager import RelayManager
 from aws.client import publish as aws_publish
+from core.alert_limiter import alert_limiter
+from core.alert_store import alert_store
 
 class RulesEngine:
     """
@@ -13,22 +15,28 @@ class RulesEngine:
     The engine tracks the state of each rule (triggered or not) to avoid spamming 
     repeated actions. When a rule first becomes triggered (alert_start) or returns 
     to normal (alert_clear), corresponding actions and notifications are performed.
+    AWS notifications go through the shared AlertLimiter; a suppressed transition still
+    runs its relay and log actions and is always recorded in the local AlertStore.
     """
 
-    def __init__(self, relay_id: str, rules: Dict[str, Any], relay_manager: RelayManager):
+    def __init__(self, relay_id: str, rules: Dict[str, Any], relay_manager: RelayManager, source: Optional[str] = None):
         """
         Initialize the RulesEngine with a given relay ID and a dictionary of rules.
 
         Args:
-            relay_id (str): The identifier for the relay these rules apply to.
+            relay_id (str): The identifier for the relay these rules apply to, or the stream name for stream rules.
             rules (Dict[str, Any]): A dictionary of rules, keyed by rule_id.
                                     Each rule should be a Rule object containing 'field', 'condition', 'value', and 'actions'.
             relay_manager (RelayManager): The RelayManager instance for controlling relay states.
+            source (Optional[str]): Name shown as the alert source in the local history; defaults to relay_id.
         """
         self.relay_id = relay_id
+        self.source = source or relay_id
         self.rules = rules
         self.relay_manager = relay_manager
         self.publish = aws_publish
+        self.alert_limiter = alert_limiter
+        self.alert_store = alert_store
 
         # Initialize rule states to track if they've been triggered
         self.rule_states = {rule_id: False for rule_id in self.rules.keys()}
@@ -60,6 +68,24 @@ class RulesEngine:
                 self.rule_states[rule_id] = False
                 await self._handle_alert_clear(rule_id, rule, data)
 
+    def threshold_proximity(self, data: Dict[str, float]) -> Optional[float]:
+        """
+        Compute how close the data is to the nearest rule threshold.
+
+        Args:
+            data (Dict[str, float]): Current sensor data.
+
+        Returns:
+            Optional[float]: The smallest relative distance |value - threshold| / |threshold|
+                             across all rules, or None if no rule applies to the data.
+        """
+        distances = [
+            abs(data[rule.field] - rule.value) / max(abs(rule.value), 1.0)
+            for rule in self.rules.values()
+            if isinstance(data.get(rule.field), (int, float))
+        ]
+        return min(distances) if distances else None
+
     def _evaluate_condition(self, data: Dict[str, float], field: str, condition: str, value: float) -> bool:
         """
         Check if a rule's condition is met given the current data.
@@ -74,10 +100,15 @@ class RulesEngine:
             bool: True if the condition is met, False otherwise.
         """
         if field not in data:
-            logger.error(f"Field '{field}' not found in data: {data}")
+            # Stream messages omit fields the collector could not read this time
+            logger.debug(f"Field '{field}' not found in data: {data}")
             return False
 
         data_value = data[field]
+        if not isinstance(data_value, (int, float)):
+            # e.g. a network field a collector filled with a string; comparing it would raise
+            logger.debug(f"Field '{field}' is not numeric: {data_value!r}")
+            return False
 
         logger.debug(f"Evaluating condition: {data_value} {condition} {value}")
 
@@ -108,9 +139,15 @@ class RulesEngine:
             data (Dict[str, float]): Current sensor data.
         """
         logger.debug(f"Alert START for rule {rule_id} on relay {self.relay_id}. Condition met.")
+        await self._record_alert(rule_id, rule, data, alert_state='start')
+        notify = self.alert_limiter.allow(self.relay_id, rule_id, 'start')
         for action in rule.actions:
+            if action.type == 'aws' and not notify:
+                continue
             await self._execute_action(action, data, alert_state='start')
-        await self._send_aws_alert(rule_id, data, alert_type='start')
+        # An 'aws' action already reported this transition
+        if notify and not any(action.type == 'aws' for action in rule.actions):
+            await self._send_aws_alert(rule_id, data, alert_type='start')
 
     async def _handle_alert_clear(self, rule_id: str, rule: Any, data: Dict[str, float]):
         """
@@ -123,9 +160,31 @@ class RulesEngine:
             data (Dict[str, float]): Current sensor data.
         """
         logger.debug(f"Alert CLEAR for rule {rule_id} on relay {self.relay_id}. Condition not met.")
+        await self._record_alert(rule_id, rule, data, alert_state='clear')
         # If you want symmetrical actions on clear, you can iterate and execute them here.
         # Currently, only AWS alert_clear is sent.
-        await self._send_aws_alert(rule_id, data, alert_type='clear')
+        if self.alert_limiter.allow(self.relay_id, rule_id, 'clear'):
+            await self._send_aws_alert(rule_id, data, alert_type='clear')
+
+    async def _record_alert(self, rule_id: str, rule: Any, data: Dict[str, float], alert_state: str):
+        """
+        Record a rule transition in the local alert history. Starts are warnings, clears are info.
+
+        Args:
+            rule_id (str): The rule identifier.
+            rule (Rule): The rule configuration.
+            data (Dict[str, float]): Current sensor data.
+            alert_state (str): 'start' or 'clear'.
+        """
+        custom = next((action.message for action in rule.actions if action.message), None)
+        reading = f"{rule.field} = {data.get(rule.field)} (limit {rule.condition} {rule.value})"
+        if alert_state == 'start':
+            message = f"{custom}: {reading}" if custom else f"Rule {rule_id} triggered: {reading}"
+            level = 'Warning'
+        else:
+            message = f"Rule {rule_id} cleared: {reading}"
+            level = 'Info'
+        await self.alert_store.record(self.source, level, message, rule_id=rule_id, state=alert_state)
 
     async def _execute_action(self, action: Any, data: Dict[str, float], alert_state: str):
         """
@@ -143,12 +202,12 @@ class RulesEngine:
             message = action.message or 'No message provided'
             logger.info(f"Rule action (log): {message}")
         elif action_type == 'relay_on':
-            await self.relay_manager.set_relay_on(self.relay_id)
+            await self.relay_manager.set_relay_on(action.target or self.relay_id)
         elif action_type == 'relay_off':
-            await self.relay_manager.set_relay_off(self.relay_id)
+            await self.relay_manager.set_relay_off(action.target or self.relay_id)
         elif action_type == 'pulse_relay':
             duration = action.duration or 1.0
-            await self.relay_manager.pulse_relay(self.relay_id, duration)
+            await self.relay_manager.pulse_relay(action.target or self.relay_id, duration)
         elif action_type == 'aws':
             message = action.message or 'Alert triggered'
             payload = {
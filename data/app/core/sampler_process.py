@@ -0,0 +1,260 @@
+import asyncio
+import heapq
+import multiprocessing
+import os
+import time
+from typing import Dict, List
+import board
+import adafruit_ina260
+from utils.logging_setup import local_logger as logger
+from utils.config import settings
+from utils.ring_buffer import SharedRingBuffer
+from utils.validator import RelayConfig
+from core.adaptive_sampler import AdaptiveSampler
+from core.rules_engine import RulesEngine
+from core.relay_monitor import RelayMonitor
+from core.jitter import JitterTracker
+from core.env import EnvironmentalData, CONVERSION_TIME, STATUS_CALIBRATED
+
+# Ring buffer source index of the AHT sensor; relays follow in sorted order
+ENVIRONMENTAL_SOURCE = 0
+
+def source_names(relay_ids) -> List[str]:
+    """Map ring buffer source indices to stream names. Both processes build it the same way."""
+    return ["environmental"] + sorted(relay_ids)
+
+
+class RelaySource:
+    """Samples one INA260 and picks the next interval with the relay's AdaptiveSampler."""
+
+    def __init__(self, relay_id: str, config: RelayConfig, source: int, i2c):
+        self.relay_id = relay_id
+        self.source = source
+        self.sensor = adafruit_ina260.INA260(i2c, address=int(config.address, 16))
+        self.sampler = AdaptiveSampler(config.sampling)
+        # Only used for threshold proximity; rule actions run in the main process
+        self.rules_engine = RulesEngine(relay_id, config.rules or {}, relay_manager=None)
+        self.jitter = JitterTracker(f"{relay_id} (sampling process)")
+        self.interval = self.sampler.interval
+
+    def reset(self):
+        pass
+
+    def step(self, ring: SharedRingBuffer, due: float) -> float:
+        """
+        Take a sample and write it to the ring.
+
+        Returns:
+            float: Monotonic time the next step is due.
+        """
+        self.jitter.record(due, time.monotonic())
+        data = {
+            "volts": round(self.sensor.voltage, 2),
+            "amps": round(self.sensor.current / 1000, 2),
+            "watts": round(self.sensor.power / 1000, 2),
+        }
+        ring.write(self.source, time.time_ns() // 1_000_000, [data["volts"], data["amps"], data["watts"]])
+        self.interval = self.sampler.next_interval(data, self.rules_engine.threshold_proximity(data))
+        return due + self.interval
+
+
+class EnvironmentalSource:
+    """
+    Samples the AHT without blocking the other sources: each conversion is split into a trigger
+    step and a read step CONVERSION_TIME later, repeated `oversampling` times per sample.
+    """
+
+    def __init__(self, sensor: EnvironmentalData, interval: float, source: int = ENVIRONMENTAL_SOURCE):
+        self.sensor = sensor
+        self.interval = interval
+        self.source = source
+        self.jitter = JitterTracker("environmental (sampling process)")
+        self.reset()
+
+    def reset(self):
+        self.readings = []
+        self.conversions = 0
+        self.converting = False
+        self.cycle_due = None
+
+    def step(self, ring: SharedRingBuffer, due: float) -> float:
+        """
+        Run the next trigger or read step.
+
+        Returns:
+            float: Monotonic time the next step is due.
+        """
+        if not self.converting:
+            if self.cycle_due is None:
+                self.cycle_due = due
+                self.jitter.record(due, time.monotonic())
+            self.sensor.trigger_measurement()
+            self.converting = True
+            return time.monotonic() + CONVERSION_TIME
+
+        frame = self.sensor.read_frame()
+        self.converting = False
+        self.conversions += 1
+        if frame and not frame[0] & STATUS_CALIBRATED:
+            logger.warning("AHT sensor reports it is not calibrated, re-initializing.")
+            self.sensor.init_sensor()
+        else:
+            reading = self.sensor.decode_frame(frame)
+            if reading:
+                self.readings.append(reading)
+        if self.conversions < self.sensor.oversampling:
+            return time.monotonic()
+
+        temperature, humidity = self.sensor.combine(self.readings)
+        ring.write(self.source, time.time_ns() // 1_000_000, [temperature, humidity])
+        next_due = self.cycle_due + self.interval
+        self.reset()
+        return next_due
+
+
+def _set_scheduling(cpu: int, priority: int):
+    """Pin the process to a core and/or switch it to SCHED_FIFO, if configured and permitted."""
+    if cpu >= 0:
+        try:
+            os.sched_setaffinity(0, {cpu})
+            logger.info(f"Sampling process pinned to CPU {cpu}")
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Could not pin sampling process to CPU {cpu}: {e}")
+    if priority > 0:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+            logger.info(f"Sampling process running with SCHED_FIFO priority {priority}")
+        except (AttributeError, OSError) as e:
+            # Requires CAP_SYS_NICE inside the container
+            logger.warning(f"Could not set SCHED_FIFO priority {priority}: {e}")
+
+def sampler_main(ring_name: str, relays: Dict[str, RelayConfig], env_interval: float, cpu: int, priority: int):
+    """Entry point of the sampling process."""
+    _set_scheduling(cpu, priority)
+    ring = SharedRingBuffer(ring_name)
+    names = source_names(relays)
+    sources = []
+
+    sensor = EnvironmentalData()
+    if sensor.bus:
+        sources.append(EnvironmentalSource(sensor, env_interval))
+    else:
+        logger.warning("AHT sensor unavailable, sampling relays only")
+
+    i2c = board.I2C()
+    for relay_id, config in relays.items():
+        try:
+            sources.append(RelaySource(relay_id, config, names.index(relay_id), i2c))
+        except ValueError as e:
+            logger.error(f"Error initializing sensor for relay {relay_id}: {e}")
+
+    logger.info(f"Sampling process started with {len(sources)} sources")
+    try:
+        _run_schedule(ring, sources)
+    finally:
+        ring.close()
+
+def _run_schedule(ring: SharedRingBuffer, sources: list):
+    # Earliest deadline first; every source reschedules itself after each step
+    schedule = [(time.monotonic(), index) for index in range(len(sources))]
+    while schedule:
+        due, index = schedule[0]
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+            continue
+        heapq.heappop(schedule)
+        source = sources[index]
+        try:
+            next_due = source.step(ring, due)
+        except Exception as e:
+            logger.error(f"Sampling error on source {index}: {e}")
+            source.reset()
+            next_due = due + source.interval
+        # Never try to catch up on missed samples
+        heapq.heappush(schedule, (max(next_due, time.monotonic()), index))
+
+
+class SamplerProcess:
+    """
+    Runs relay and environmental sampling in a dedicated process so Influx, MQTT and SNMP work on
+    the main event loop can't delay samples. The process writes timestamped samples into a shared
+    memory ring buffer; this side drains the ring and hands each sample to its RelayMonitor (stream
+    and rules) or to EnvironmentalData (stream), keeping the sample time as the stream entry ID.
+    """
+
+    def __init__(self, monitors: Dict[str, RelayMonitor], environmental: EnvironmentalData):
+        """
+        Args:
+            monitors (Dict[str, RelayMonitor]): Monitors of the relays to sample, keyed by relay ID.
+            environmental (EnvironmentalData): Instance used to stream AHT samples (without its own bus).
+        """
+        self.monitors = monitors
+        self.environmental = environmental
+        self.sources = source_names(monitors)
+        self.context = multiprocessing.get_context("spawn")
+        self.ring = None
+        self.process = None
+        self.restarts = 0
+        self.restart_at = 0.0
+        self.overruns = 0
+
+    def _start(self):
+        relays = {relay_id: monitor.config for relay_id, monitor in self.monitors.items()}
+        self.process = self.context.Process(
+            target=sampler_main,
+            args=(self.ring.name, relays, settings.COLLECTION_INTERVAL, settings.SAMPLER_CPU, settings.SAMPLER_PRIORITY),
+            name="sampler",
+            daemon=True,
+        )
+        self.process.start()
+        logger.info(f"Started sampling process (pid {self.process.pid})")
+
+    def _check_process(self):
+        if self.process is not None and self.process.is_alive():
+            return
+        if self.process is not None:
+            self.restarts += 1
+            delay = min(2 ** self.restarts, 60)
+            self.restart_at = time.monotonic() + delay
+            logger.error(f"Sampling process exited with code {self.process.exitcode}; restarting in {delay}s")
+            self.process = None
+        if time.monotonic() >= self.restart_at:
+            self._start()
+
+    async def dispatch(self, source: int, timestamp_ms: int, values: list):
+        name = self.sources[source]
+        if source == ENVIRONMENTAL_SOURCE:
+            temperature, humidity = values
+            await self.environmental.stream_data(temperature=temperature, humidity=humidity, timestamp_ms=timestamp_ms)
+        else:
+            volts, amps, watts = values
+            data = {"relay": name, "volts": volts, "amps": amps, "watts": watts}
+            await self.monitors[name].handle_sample(data, timestamp_ms)
+
+    async def run(self):
+        await self.environmental.async_init()
+        self.ring = SharedRingBuffer(capacity=settings.SAMPLER_RING_CAPACITY, create=True)
+        try:
+            while True:
+                self._check_process()
+                for source, timestamp_ms, values in self.ring.read():
+                    try:
+                        await self.dispatch(source, timestamp_ms, values)
+                    except Exception as e:
+                        logger.error(f"Error handling sample from {self.sources[source]}: {e}")
+                if self.ring.overruns != self.overruns:
+                    logger.warning(f"Sampling ring buffer overrun, {self.ring.overruns - self.overruns} samples dropped")
+                    self.overruns = self.ring.overruns
+                await asyncio.sleep(settings.SAMPLER_POLL_INTERVAL)
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            await asyncio.to_thread(self.process.join, 10)
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        logger.info("Sampling process stopped")
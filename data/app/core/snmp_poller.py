@@ -0,0 +1,140 @@
+import asyncio
+import time
+from typing import Dict, Optional
+import aiosnmp
+from utils.logging_setup import local_logger as logger
+from utils.config import settings
+
+class SnmpDevice:
+    """
+    Polling state for one SNMP agent: its OIDs, its open session and its failure backoff.
+    """
+    def __init__(self, name: str, host: str, oids: Dict[str, str], tables: Optional[Dict[str, str]] = None,
+                 community: str = settings.COMMUNITY, timeout: float = settings.SNMP_TIMEOUT,
+                 retries: int = settings.SNMP_RETRIES):
+        self.name = name
+        self.host = host
+        self.oids = oids
+        self.tables = tables or {}
+        self.community = community
+        self.timeout = timeout
+        self.retries = retries
+        # Reverse lookup so each varbind is matched in O(1)
+        self.keys_by_oid = {oid.lstrip('.'): key for key, oid in oids.items()}
+        self.session = None
+        self.failures = 0
+        self.retry_at = 0.0
+
+    @property
+    def deadline(self) -> float:
+        """
+        Seconds a whole poll may take: every request (the GET and each table walk) may use
+        all of its attempts, so the poll never cancels a retry the session is still waiting on.
+        """
+        requests = (1 if self.oids else 0) + len(self.tables)
+        return self.timeout * (self.retries + 1) * max(requests, 1) + settings.SNMP_DEADLINE_MARGIN
+
+    def in_backoff(self) -> bool:
+        return time.monotonic() < self.retry_at
+
+    def record_failure(self):
+        self.failures += 1
+        delay = min(settings.SNMP_BACKOFF_BASE * 2 ** (self.failures - 1), settings.SNMP_BACKOFF_MAX)
+        self.retry_at = time.monotonic() + delay
+        return delay
+
+    def record_success(self):
+        self.failures = 0
+        self.retry_at = 0.0
+
+
+class SnmpPoller:
+    """
+    Keeps one SNMP session open per device and batches every scalar OID of a device
+    into a single GET PDU. Table OIDs are fetched with GETBULK walks. Devices are polled
+    concurrently, each bounded by its own deadline, and a device that fails is skipped
+    with exponential backoff until its next retry time.
+    """
+
+    def __init__(self):
+        self.devices: Dict[str, SnmpDevice] = {}
+
+    def register(self, name: str, host: str, oids: Dict[str, str], tables: Optional[Dict[str, str]] = None, **kwargs):
+        """
+        Register a device to be polled.
+
+        Args:
+            name (str): The identifier used to look up results.
+            host (str): The device address.
+            oids (Dict[str, str]): Scalar OIDs keyed by result name, fetched in one GET.
+            tables (Dict[str, str], optional): Table/column OIDs keyed by result name, fetched with GETBULK.
+        """
+        self.devices[name] = SnmpDevice(name, host, oids, tables, **kwargs)
+
+    async def _session(self, device: SnmpDevice):
+        if device.session is None:
+            session = aiosnmp.Snmp(host=device.host, community=device.community, port=161,
+                                   timeout=device.timeout, retries=device.retries, max_repetitions=10)
+            await session.__aenter__()
+            device.session = session
+            logger.debug(f"SNMP session opened for {device.name} ({device.host})")
+        return device.session
+
+    async def _close_session(self, device: SnmpDevice):
+        if device.session is not None:
+            try:
+                await device.session.__aexit__(None, None, None)
+            except Exception as e:
+                logger.debug(f"Error closing SNMP session for {device.name}: {e}")
+            finally:
+                device.session = None
+
+    async def _fetch(self, device: SnmpDevice) -> Dict[str, object]:
+        session = await self._session(device)
+        results = {}
+        if device.oids:
+            response = await session.get(list(device.oids.values()))
+            for varbind in response:
+                key = device.keys_by_oid.get(varbind.oid.lstrip('.'))
+                if key is not None:
+                    results[key] = varbind.value
+        for key, oid in device.tables.items():
+            response = await session.bulk_walk(oid)
+            results[key] = [varbind.value for varbind in response]
+        return results
+
+    async def poll(self, name: str) -> Optional[Dict[str, object]]:
+        """
+        Poll a single registered device.
+
+        Returns:
+            Optional[Dict[str, object]]: Raw values keyed by result name, or None if the device
+            is unknown, in backoff, or did not answer within its deadline.
+        """
+        device = self.devices.get(name)
+        if device is None:
+            logger.error(f"SNMP device {name} is not registered")
+            return None
+        if device.in_backoff():
+            return None
+        try:
+            async with asyncio.timeout(device.deadline):
+                results = await self._fetch(device)
+            device.record_success()
+            return results
+        except Exception as e:
+            # Drop the session so the next attempt starts from a clean socket
+            await self._close_session(device)
+            delay = device.record_failure()
+            logger.warning(f"SNMP poll of {device.name} ({device.host}) failed: {e!r}; retrying in {delay}s")
+            return None
+
+    async def poll_all(self) -> Dict[str, Optional[Dict[str, object]]]:
+        """Poll every registered device concurrently."""
+        names = list(self.devices)
+        results = await asyncio.gather(*(self.poll(name) for name in names))
+        return dict(zip(names, results))
+
+    async def close(self):
+        for device in self.devices.values():
+            await self._close_session(device)
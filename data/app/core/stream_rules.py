@@ -0,0 +1,56 @@
+from collections import defaultdict
+from typing import Dict, List
+from utils.logging_setup import local_logger as logger
+from utils.config import settings
+from utils.stream_schema import decode
+from utils.validator import StreamRule
+from core.processor import StreamHandler, StreamProcessor
+from core.relay_manager import RelayManager
+from core.rules_engine import RulesEngine
+
+class RulesHandler(StreamHandler):
+    """
+    Evaluates the stream rules of one stream against each message as it is read, so rules on
+    environmental, network, cellular or relay data act through the RelayManager without polling.
+    Fields the collector could not read (None or the NULL placeholder) never match a rule.
+    """
+
+    def __init__(self, stream: str, rules: Dict[str, StreamRule], relay_manager: RelayManager):
+        super().__init__(stream)
+        self.rules_engine = RulesEngine(stream, rules, relay_manager=relay_manager, source=stream.capitalize())
+
+    async def handle(self, messages) -> List[bytes]:
+        for message_id, msg in messages:
+            try:
+                _, values = decode(message_id, msg)
+            except Exception as e:
+                logger.error(f"Error decoding message {message_id} in {self.stream}: {e}")
+                continue
+            data = {k: v for k, v in values.items() if v is not None and v != settings.NULL}
+            try:
+                await self.rules_engine.evaluate_rules(data)
+            except Exception as e:
+                # One bad message must not hold back the acknowledgement of the whole batch
+                logger.error(f"Error evaluating rules for message {message_id} in {self.stream}: {e}")
+        return [message_id for message_id, _ in messages]
+
+def build_rules_processor(stream_rules: Dict[str, StreamRule], relay_manager: RelayManager) -> StreamProcessor:
+    """
+    Create the consumer that evaluates stream rules. It reads through its own consumer group, so
+    it sees every message independently of the processor that uploads them.
+
+    Args:
+        stream_rules (Dict[str, StreamRule]): The configured stream rules, keyed by rule ID.
+        relay_manager (RelayManager): The RelayManager the rule actions use.
+
+    Returns:
+        StreamProcessor: A consumer with one RulesHandler per stream that has rules.
+    """
+    rules_by_stream = defaultdict(dict)
+    for rule_id, rule in stream_rules.items():
+        rules_by_stream[rule.stream][rule_id] = rule
+    handlers = {
+        stream: RulesHandler(stream, rules, relay_manager)
+        for stream, rules in rules_by_stream.items()
+    }
+    return StreamProcessor(handlers, consumer_name='rules', group_name=settings.RULES_GROUP)
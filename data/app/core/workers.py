@@ -0,0 +1,126 @@
+import asyncio
+import multiprocessing
+import queue
+import time
+from typing import Dict, List
+from utils.logging_setup import local_logger as logger
+from utils.config import settings
+from utils.singleton import RedisClient
+from core.processor import StreamProcessor, build_handler, create_groups
+from aws.client import publish
+
+def assign_streams(specs: Dict[str, dict], workers: int) -> List[Dict[str, dict]]:
+    """
+    Split the stream specs between workers. Passthrough streams are read by every worker, so
+    their messages are load-balanced by the consumer group. Aggregate (relay) streams are each
+    pinned to one worker, otherwise every worker would average a different subset of a window.
+
+    Returns:
+        List[Dict[str, dict]]: The specs each worker should consume, indexed by worker.
+    """
+    assignments = [{} for _ in range(workers)]
+    aggregate_streams = sorted(stream for stream, spec in specs.items() if spec["kind"] == "aggregate")
+    for stream, spec in specs.items():
+        if spec["kind"] == "aggregate":
+            assignments[aggregate_streams.index(stream) % workers][stream] = spec
+        else:
+            for assignment in assignments:
+                assignment[stream] = spec
+    return assignments
+
+def worker_main(index: int, specs: Dict[str, dict], publish_queue):
+    """Entry point of a processor worker process."""
+    asyncio.run(_run_worker(index, specs, publish_queue))
+
+async def _run_worker(index: int, specs: Dict[str, dict], publish_queue):
+    # Only the main process holds the MQTT connection; AWS IoT drops duplicate client IDs
+    async def forward(topic, payload):
+        publish_queue.put_nowait((topic, payload))
+
+    handlers = {stream: build_handler(stream, spec) for stream, spec in specs.items()}
+    for handler in handlers.values():
+        handler.publish = forward
+    processor = StreamProcessor(handlers, consumer_name=f"processor-{index}", create_groups=False)
+    logger.info(f"Processor worker {index} consuming {sorted(handlers)}")
+    await processor.run()
+
+
+class ProcessorSupervisor:
+    """
+    Runs N StreamProcessor workers as separate processes, each a distinct consumer in the same
+    consumer group, so stream processing scales across cores and stays off the sampling loop.
+
+    The supervisor creates the consumer groups once before the workers start, restarts workers
+    that exit (with exponential backoff), and publishes the workers' AWS messages from the main
+    process's MQTT connection.
+    """
+
+    def __init__(self, specs: Dict[str, dict], workers: int, check_interval: float = 5.0):
+        """
+        Args:
+            specs (Dict[str, dict]): Handler spec for each stream (see build_handler).
+            workers (int): Number of worker processes.
+            check_interval (float): Seconds between liveness checks.
+        """
+        self.specs = specs
+        self.workers = workers
+        self.check_interval = check_interval
+        self.assignments = assign_streams(specs, workers)
+        self.context = multiprocessing.get_context("spawn")
+        self.publish_queue = self.context.Queue()
+        self.processes: List[multiprocessing.Process] = [None] * workers
+        self.restarts = [0] * workers
+        self.restart_at = [0.0] * workers
+
+    def _start(self, index: int):
+        process = self.context.Process(
+            target=worker_main,
+            args=(index, self.assignments[index], self.publish_queue),
+            name=f"processor-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[index] = process
+        logger.info(f"Started processor worker {index} (pid {process.pid})")
+
+    async def _forward_publishes(self):
+        while True:
+            try:
+                topic, payload = await asyncio.to_thread(self.publish_queue.get, True, 1.0)
+            except queue.Empty:
+                continue
+            await publish(topic, payload)
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            for index, process in enumerate(self.processes):
+                if process is not None and process.is_alive():
+                    continue
+                if process is not None:
+                    self.restarts[index] += 1
+                    delay = min(2 ** self.restarts[index], 60)
+                    self.restart_at[index] = time.monotonic() + delay
+                    logger.error(f"Processor worker {index} exited with code {process.exitcode}; restarting in {delay}s")
+                    self.processes[index] = None
+                if time.monotonic() >= self.restart_at[index]:
+                    self._start(index)
+
+    async def run(self):
+        redis = await RedisClient.get_instance()
+        await create_groups(redis, self.specs, settings.PROCESSOR_GROUP, migrate=True)
+        for index in range(self.workers):
+            self._start(index)
+        try:
+            await asyncio.gather(self._forward_publishes(), self._supervise())
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            if process is not None:
+                await asyncio.to_thread(process.join, 10)
+        logger.info("Processor workers stopped")
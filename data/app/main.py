@@ -3,21 +3,31 @@ import signal
 import json
 from typing import Optional
 from utils.validator import validate_config
+from utils.config import settings
 from utils.logging_setup import local_logger as logger
 from core.relay_manager import RelayManager
 from core.relay_monitor import RelayMonitor
-from core.processor import GeneralProcessor, RelayProcessor
+from core.processor import StreamProcessor, build_handler
+from core.workers import ProcessorSupervisor
 from core.cell import CellularData
 from core.net import NetworkData
 from core.env import EnvironmentalData
+from core.snmp_poller import SnmpPoller
+from core.device_info import DeviceInfoCache
+from core.sampler_process import SamplerProcess
+from core.stream_rules import build_rules_processor
+from core.alert_limiter import alert_limiter
 from aws.manager import AWSManager
 
 class ApplicationManager:
     def __init__(self):
         self.tasks = []
+        self.stream_specs = {}
+        self.sampled_relays = {}
         self.config = None
         self.relay_manager = None
         self.aws_manager = AWSManager()
+        self.snmp_poller = SnmpPoller()
         self.shutdown_event: Optional[asyncio.Event] = None
         self.shutdown_signal_received = False
 
@@ -37,38 +47,80 @@ class ApplicationManager:
         signal.signal(signal.SIGINT, handle_shutdown_signal)
 
     async def initialize_relay_tasks(self):
-        """Initialize tasks for relay monitoring and processing."""
+        """Initialize tasks for relay monitoring and register how their streams are processed."""
         for relay_id, relay_config in self.config.relays.items():
             should_monitor = relay_config.monitor
             has_schedule = (hasattr(relay_config, 'schedule') and 
                           relay_config.schedule and 
                           relay_config.schedule.enabled)
             if should_monitor or has_schedule:
-                monitor = RelayMonitor(relay_id, relay_config, relay_manager=self.relay_manager)
+                monitor = RelayMonitor(
+                    relay_id, relay_config,
+                    relay_manager=self.relay_manager,
+                    sample_locally=not settings.SAMPLER_PROCESS,
+                )
                 monitor_task = asyncio.create_task(monitor.start())
                 self.tasks.append(monitor_task)
+                if should_monitor:
+                    self.sampled_relays[relay_id] = monitor
 
-                processor=RelayProcessor(relay_id)
-                processor_task = asyncio.create_task(processor.run())
-                self.tasks.append(processor_task)
-                logger.debug(f"Relay {relay_id}: monitoring and processing tasks created.")
+                self.stream_specs[relay_id] = {"kind": "aggregate", "window": settings.RELAY_AGGREGATION_WINDOW,
+                                               "max_gap": relay_config.sampling.max_interval}
+                logger.debug(f"Relay {relay_id}: monitoring task created and stream registered.")
             else:
                 logger.debug(f"No monitoring or scheduling configured for relay {relay_id}.")
 
     async def initialize_general_tasks(self):
-        """Initialize tasks for general data collection and processing."""
+        """Initialize tasks for general data collection and register how their streams are processed."""
         collectors = [
             ('network', NetworkData()),
-            ('cellular', CellularData()),
-            ('environmental', EnvironmentalData())
+            ('cellular', CellularData(snmp_poller=self.snmp_poller)),
         ]
+        if not settings.SAMPLER_PROCESS:
+            collectors.append(('environmental', EnvironmentalData()))
         for name, collector in collectors:
             collector_task = asyncio.create_task(collector.run())
             self.tasks.append(collector_task)
+            self.stream_specs[name] = {"kind": "passthrough"}
 
-        streams = [name for name, _ in collectors]
-        general_processor = GeneralProcessor(streams=streams)
-        processor_task = asyncio.create_task(general_processor.run())
+        device_info_task = asyncio.create_task(DeviceInfoCache(self.snmp_poller).run())
+        self.tasks.append(device_info_task)
+
+        alert_digest_task = asyncio.create_task(alert_limiter.run())
+        self.tasks.append(alert_digest_task)
+
+    async def initialize_sampler_task(self):
+        """Start the dedicated sampling process for the relay and environmental sensors, if enabled."""
+        if not settings.SAMPLER_PROCESS:
+            return
+        sampler = SamplerProcess(self.sampled_relays, EnvironmentalData(open_bus=False))
+        sampler_task = asyncio.create_task(sampler.run())
+        self.tasks.append(sampler_task)
+        self.stream_specs['environmental'] = {"kind": "passthrough"}
+        logger.info(f"Sampling {sorted(self.sampled_relays)} and environmental in a dedicated process")
+
+    async def initialize_rules_task(self):
+        """Start the stream rules service if any stream rules are configured."""
+        if not self.config.stream_rules:
+            logger.debug("No stream rules configured.")
+            return
+        rules_processor = build_rules_processor(self.config.stream_rules, self.relay_manager)
+        rules_task = asyncio.create_task(rules_processor.run())
+        self.tasks.append(rules_task)
+        logger.info(f"Stream rules service evaluating {len(self.config.stream_rules)} rules")
+
+    async def initialize_processor_task(self):
+        """
+        Start stream processing: either a single consumer on this event loop, or (when
+        PROCESSOR_WORKERS > 0) a supervisor running that many consumer processes.
+        """
+        if settings.PROCESSOR_WORKERS > 0:
+            supervisor = ProcessorSupervisor(self.stream_specs, settings.PROCESSOR_WORKERS)
+            processor_task = asyncio.create_task(supervisor.run())
+            logger.info(f"Stream processing running in {settings.PROCESSOR_WORKERS} worker processes")
+        else:
+            handlers = {stream: build_handler(stream, spec) for stream, spec in self.stream_specs.items()}
+            processor_task = asyncio.create_task(StreamProcessor(handlers).run())
         self.tasks.append(processor_task)
 
     async def setup(self):
@@ -107,6 +159,9 @@ class ApplicationManager:
             logger.info("Initializing tasks...")
             await self.initialize_relay_tasks()
             await self.initialize_general_tasks()
+            await self.initialize_sampler_task()
+            await self.initialize_processor_task()
+            await self.initialize_rules_task()
 
             if not self.tasks:
                 logger.warning("No tasks have been initialized")
@@ -156,6 +211,9 @@ class ApplicationManager:
                 except asyncio.TimeoutError:
                     logger.warning("Some tasks did not complete within shutdown timeout")
             
+            # Close the persistent SNMP sessions
+            await self.snmp_poller.close()
+
             # Shutdown AWS components
             if self.aws_manager:
                 await self.aws_manager.shutdown()
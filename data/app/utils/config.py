@@ -97,17 +97,79 @@ class Settings:
         # SNMP settings
         self.COMMUNITY = 'public'
         self.SNMP_TARGET = '192.168.1.1'
+        self.CAMERA_TARGET = '192.168.1.3'
+        self.SNMP_TIMEOUT = 5  # Timeout of one SNMP request (seconds)
+        self.SNMP_RETRIES = 1  # Resends of a request that timed out, before the poll counts as failed
+        self.SNMP_DEADLINE_MARGIN = 1  # Extra seconds a whole poll may take beyond its requests' timeouts and retries
+        self.SNMP_BACKOFF_BASE = 5  # First retry delay after a failed poll (seconds)
+        self.SNMP_BACKOFF_MAX = 300  # Upper bound for the retry delay (seconds)
         self.OIDS = {
             'sinr': '.1.3.6.1.4.1.23695.200.1.12.1.1.1.5.0',
             'rsrp': '.1.3.6.1.4.1.23695.200.1.12.1.1.1.7.0',
             'rsrq': '.1.3.6.1.4.1.23695.200.1.12.1.1.1.8.0',
         }
+        self.ROUTER_INFO_OIDS = {
+            'model': '.1.3.6.1.2.1.1.1.0',
+            'serial': '.1.3.6.1.4.1.23695.200.1.1.1.1.2.0',
+            'firmware': '.1.3.6.1.4.1.23695.200.1.1.1.1.3.0',
+            'ssid': '.1.3.6.1.4.1.23695.4.2.3.1.2.1',
+            'uptime': '.1.3.6.1.2.1.25.1.1.0',
+        }
+        self.CAMERA_INFO_OIDS = {
+            'model': '.1.3.6.1.2.1.1.1.0',
+            'serial': '.1.3.6.1.2.1.2.2.1.6.2',
+            'uptime': '.1.3.6.1.2.1.1.3.0',
+        }
+
+        # Device info cache (read by the web app)
+        self.DEVICE_INFO_KEY = 'device_info:{}'
+        self.DEVICE_INFO_INTERVAL = 60  # Seconds between background refreshes
+        self.DEVICE_INFO_TTL = 300  # Seconds before a device that stopped answering drops out of the cache
         
         # Network/Ping settings
-        self.PING_TARGET = '8.8.8.8'
+        self.PING_TARGETS = {  # Label -> address; the first target fills the un-prefixed network fields. Stream rules can use <label>_<field> once listed in validation.stream_fields
+            'google': '8.8.8.8',
+            'cloudflare': '1.1.1.1',
+            'router': self.SNMP_TARGET,
+        }
+        self.PING_COUNT = 10  # Probes per target per collection interval
+        self.PING_TIMEOUT = 2  # Seconds to wait for the last replies of a window
+
+        # Stream processing settings
+        self.PROCESSOR_GROUP = 'processor_group'  # Consumer group shared by every data stream
+        self.RELAY_AGGREGATION_WINDOW = 60  # Seconds of relay samples averaged into one point
+        self.PROCESSOR_WORKERS = int(os.getenv('PROCESSOR_WORKERS', 0))  # 0 = process streams on the main event loop
+        self.PROCESSOR_METRICS_KEY = 'processor:metrics:{}'  # Per-consumer counters hash
+        self.PROCESSOR_METRICS_INTERVAL = 10  # Seconds between metrics writes
+        self.PROCESSOR_RETRY_INTERVAL = 10  # Seconds between attempts to write points InfluxDB rejected
+        self.PROCESSOR_MAX_UNWRITTEN = 500  # Failed writes held per stream; older ones are left to restart recovery
+        self.PROCESSOR_CLAIM_MIN_IDLE = 60  # Seconds another consumer's pending entry must sit idle before it is claimed on start
+        self.RULES_GROUP = 'rules_group'  # Consumer group of the stream rules service
+
+        # Sampling process settings
+        self.SAMPLER_PROCESS = os.getenv('SAMPLER_PROCESS', 'false').lower() == 'true'  # Sample relays/AHT in a dedicated process
+        self.SAMPLER_CPU = int(os.getenv('SAMPLER_CPU', -1))  # Core to pin the sampling process to, -1 = no pinning
+        self.SAMPLER_PRIORITY = int(os.getenv('SAMPLER_PRIORITY', 0))  # SCHED_FIFO priority (1-99), 0 = normal scheduling
+        self.SAMPLER_RING_CAPACITY = 4096  # Samples buffered between the sampling process and the service
+        self.SAMPLER_POLL_INTERVAL = 0.05  # Seconds between ring buffer reads
+
+        # Alert rate limiting settings
+        self.ALERT_WINDOW = 3600  # Sliding window (seconds) the alert limits apply to
+        self.ALERT_RULE_LIMIT = 6  # Alerts published per rule per window
+        self.ALERT_DEVICE_LIMIT = 20  # Alerts published per relay/stream per window, across its rules
+        self.ALERT_DIGEST_INTERVAL = 900  # Seconds between digests of suppressed alerts, 0 = no digest
+        self.ALERT_DB_PATH = os.getenv('ALERT_DB_PATH', '/app_data/alerts.db')  # Local alert history, shared with the web app
+        self.ALERT_RETENTION_DAYS = float(os.getenv('ALERT_RETENTION_DAYS', 365))  # Alerts older than this are deleted, 0 = keep forever
+        self.ALERT_MAX_ROWS = int(os.getenv('ALERT_MAX_ROWS', 100000))  # Most alerts kept; the oldest are deleted first, 0 = no limit
+        self.ALERT_PRUNE_INTERVAL = 3600  # Seconds between alert retention passes
 
         # Data collection settings
         self.COLLECTION_INTERVAL = 30
         self.NULL = -9999  # Value to use for missing data, may need to be adjusted based on data type
 
+        # Environmental sensor (AHT) settings
+        self.ENV_SENSOR = os.getenv('ENV_SENSOR', 'AHT10').upper()  # AHT10, or AHT20 for the AHT2x family (CRC-checked frames)
+        self.ENV_OVERSAMPLING = int(os.getenv('ENV_OVERSAMPLING', 1))  # Conversions averaged per sample
+        self.ENV_OUTLIER_LIMIT = 3.0  # Reject readings further than this many MADs from the median
+
 settings = Settings()
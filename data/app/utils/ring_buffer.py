@@ -0,0 +1,99 @@
+import math
+import struct
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence, Tuple
+
+# Header: write index (u64), capacity (u32), slot size (u32)
+HEADER = struct.Struct('<QII')
+HEADER_SIZE = 64
+# Slot: sequence (u64), timestamp ms (i64), source index (u16), value count (u16), values (4 x f64)
+SLOT = struct.Struct('<QqHH4x4d')
+MAX_VALUES = 4
+
+class SharedRingBuffer:
+    """
+    Single-producer / single-consumer ring of fixed-size sample records in shared memory.
+
+    The producer (the sampling process) never waits on the consumer: it overwrites the oldest
+    slot when the ring is full, and the consumer detects the overrun and skips ahead. Each slot
+    carries a sequence number used as a seqlock: it is odd while the slot is being written and
+    set to 2 * index + 2 once the record is complete, so a consumer that races the producer sees
+    a mismatch and retries instead of returning a torn record. No locks are shared between the
+    processes.
+    """
+
+    def __init__(self, name: Optional[str] = None, capacity: int = 4096, create: bool = False):
+        """
+        Args:
+            name (Optional[str]): Shared memory block name. Generated when creating, required when attaching.
+            capacity (int): Number of slots (only used when creating).
+            create (bool): Create the block (producer side owner) instead of attaching to it.
+        """
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + capacity * SLOT.size)
+            HEADER.pack_into(self.shm.buf, 0, 0, capacity, SLOT.size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        _, self.capacity, slot_size = HEADER.unpack_from(self.shm.buf, 0)
+        if slot_size != SLOT.size:
+            raise ValueError(f"Ring buffer slot size mismatch: {slot_size} != {SLOT.size}")
+        self.name = self.shm.name
+        self.owner = create
+        self.read_index = self.write_index
+        self.overruns = 0
+
+    @property
+    def write_index(self) -> int:
+        return HEADER.unpack_from(self.shm.buf, 0)[0]
+
+    def _offset(self, index: int) -> int:
+        return HEADER_SIZE + (index % self.capacity) * SLOT.size
+
+    def write(self, source: int, timestamp_ms: int, values: Sequence[Optional[float]]):
+        """
+        Append one record (producer only).
+
+        Args:
+            source (int): Index of the sample source (see the producer/consumer source table).
+            timestamp_ms (int): Sample time in epoch milliseconds.
+            values (Sequence[Optional[float]]): Up to MAX_VALUES values; None is stored as NaN.
+        """
+        index = self.write_index
+        offset = self._offset(index)
+        padded = [math.nan if v is None else float(v) for v in values] + [math.nan] * (MAX_VALUES - len(values))
+        struct.pack_into('<Q', self.shm.buf, offset, 2 * index + 1)
+        SLOT.pack_into(self.shm.buf, offset, 2 * index + 1, timestamp_ms, source, len(values), *padded)
+        struct.pack_into('<Q', self.shm.buf, offset, 2 * index + 2)
+        struct.pack_into('<Q', self.shm.buf, 0, index + 1)
+
+    def read(self, limit: int = 1024) -> List[Tuple[int, int, List[Optional[float]]]]:
+        """
+        Return records written since the last read (consumer only).
+
+        Returns:
+            List[Tuple[int, int, List[Optional[float]]]]: (source, timestamp_ms, values) tuples, oldest first.
+        """
+        records = []
+        write_index = self.write_index
+        if write_index - self.read_index > self.capacity:
+            self.overruns += write_index - self.read_index - self.capacity
+            self.read_index = write_index - self.capacity
+        while self.read_index < write_index and len(records) < limit:
+            offset = self._offset(self.read_index)
+            expected = 2 * self.read_index + 2
+            sequence, timestamp_ms, source, count, *values = SLOT.unpack_from(self.shm.buf, offset)
+            if struct.unpack_from('<Q', self.shm.buf, offset)[0] != sequence or sequence != expected:
+                if sequence > expected:
+                    # The producer lapped this slot while we were reading it
+                    self.overruns += 1
+                    self.read_index += 1
+                    continue
+                break  # Slot still being written, pick it up on the next read
+            records.append((source, timestamp_ms, [None if math.isnan(v) else v for v in values[:count]]))
+            self.read_index += 1
+        return records
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
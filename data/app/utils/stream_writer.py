@@ -0,0 +1,38 @@
+from typing import Dict, Optional
+from redis.asyncio import Redis
+from utils.stream_schema import encode, PAYLOAD_FIELD, ID_FIELD, LATEST_KEY
+
+# XADD the entry and copy it into the stream's latest-value hash in one atomic step, so a reader
+# of the hash never sees values that are not in the stream yet (or an ID that doesn't match them).
+# If the clock stepped back below the stream's last ID the explicit ID is rejected; the sample is
+# then added with '*', which Redis places right after the last entry.
+XADD_LATEST = f"""
+local id = redis.pcall('XADD', KEYS[1], ARGV[2], '{PAYLOAD_FIELD.decode()}', ARGV[1])
+if type(id) == 'table' and id.err then
+    id = redis.call('XADD', KEYS[1], '*', '{PAYLOAD_FIELD.decode()}', ARGV[1])
+end
+redis.call('HSET', KEYS[2], '{PAYLOAD_FIELD.decode()}', ARGV[1], '{ID_FIELD.decode()}', id)
+return id
+"""
+
+_script = None
+
+async def add_sample(redis: Redis, stream: str, data: Dict[str, Optional[float]], timestamp_ms: Optional[int] = None) -> bytes:
+    """
+    Append a sample to a stream and update its `latest:<stream>` hash.
+
+    Args:
+        redis (Redis): The Redis client.
+        stream (str): The stream name.
+        data (Dict[str, Optional[float]]): The numeric fields of the sample.
+        timestamp_ms (Optional[int]): Sample time used as the entry ID; defaults to now.
+
+    Returns:
+        bytes: The new entry ID.
+    """
+    global _script
+    if _script is None or _script.registered_client is not redis:
+        # Sent with EVALSHA; redis-py loads the script again if the server has flushed it
+        _script = redis.register_script(XADD_LATEST)
+    entry_id = f"{timestamp_ms}-*" if timestamp_ms else "*"
+    return await _script(keys=[stream, LATEST_KEY.format(stream)], args=[encode(data)[PAYLOAD_FIELD], entry_id])
@@ -14,6 +14,7 @@ class ValidationConfig(BaseModel):
     allowed_conditions: List[str]
     allowed_actions: List[str]
     time_format: str = "HH:MM"
+    stream_fields: Dict[str, List[str]] = {}  # Fields stream rules may use, keyed by stream
 
 # Load the system config    
 class SystemConfig(BaseModel):
@@ -57,6 +58,43 @@ class Rule(BaseModel):
             raise ValueError(f"Invalid condition: {v}. Allowed conditions: {allowed_conditions}")
         return v
 
+class StreamRule(BaseModel):
+    """
+    A rule evaluated against every message of a data stream, e.g.
+    {"stream": "environmental", "field": "temperature", "condition": ">", "value": 110,
+     "actions": [{"type": "relay_on", "target": "relay4"}]}.
+    Relay actions name the relay to act on in `target`. Relay streams use the relay fields.
+    The field must be listed exactly in the stream's `stream_fields`, including the per-target
+    network fields (e.g. "google_packet_loss_percent"), so a misspelled field is rejected.
+    """
+    stream: str
+    field: str
+    condition: str
+    value: Union[int, float]
+    actions: List[Action]
+
+    @field_validator('field')
+    def validate_field(cls, v, info):
+        stream = info.data.get('stream')
+        allowed_fields = VALIDATION_CONFIG.stream_fields.get(stream, VALIDATION_CONFIG.allowed_fields)
+        if v not in allowed_fields:
+            raise ValueError(f"Invalid field for stream {stream}: {v}. Allowed fields: {allowed_fields}")
+        return v
+
+    @field_validator('condition')
+    def validate_condition(cls, v):
+        allowed_conditions = VALIDATION_CONFIG.allowed_conditions
+        if v not in allowed_conditions:
+            raise ValueError(f"Invalid condition: {v}. Allowed conditions: {allowed_conditions}")
+        return v
+
+    @field_validator('actions')
+    def validate_targets(cls, v):
+        for action in v:
+            if action.type in ("relay_on", "relay_off", "pulse_relay") and not action.target:
+                raise ValueError(f"Action {action.type} on a stream rule needs a target relay")
+        return v
+
 class Schedule(BaseModel):
     enabled: bool
     every_day: bool
@@ -84,6 +122,19 @@ class Schedule(BaseModel):
             raise ValueError(f"Invalid time format: {v}. Must be in the format: {time_format}")
         return v
 
+class SamplingConfig(BaseModel):
+    min_interval: float = 1.0  # Fastest sampling (seconds), used while values move or sit near a rule threshold
+    max_interval: float = 10.0  # Slowest sampling (seconds), reached while values are flat
+    change_threshold: float = 0.05  # Relative change between samples that counts as activity
+    proximity_threshold: float = 0.1  # Relative distance to a rule threshold that counts as "near"
+
+    @field_validator('max_interval')
+    def validate_intervals(cls, v, info):
+        min_interval = info.data.get('min_interval')
+        if min_interval is not None and v < min_interval:
+            raise ValueError(f"max_interval ({v}) must be >= min_interval ({min_interval})")
+        return v
+
 class RelayConfig(BaseModel):
     name: str
     pin: int
@@ -92,6 +143,7 @@ class RelayConfig(BaseModel):
     monitor: bool = False
     schedule: Optional[Union[Schedule, bool]] = None
     rules: Optional[Union[Dict[str, Rule], bool]] = None
+    sampling: SamplingConfig = SamplingConfig()
 
     @field_validator('pin', 'address', mode='before')
     def immutable_fields(cls, v):
@@ -103,6 +155,18 @@ class FullConfig(BaseModel):
     system: SystemConfig
     relays: Dict[str, RelayConfig]
     validation: ValidationConfig
+    stream_rules: Dict[str, StreamRule] = {}
+
+    @field_validator('stream_rules')
+    def validate_stream_rules(cls, v, info):
+        relays = info.data.get('relays', {})
+        for rule_id, rule in v.items():
+            if rule.stream not in relays and rule.stream not in VALIDATION_CONFIG.stream_fields:
+                raise ValueError(f"Rule {rule_id}: unknown stream {rule.stream}")
+            for action in rule.actions:
+                if action.target and action.target not in relays:
+                    raise ValueError(f"Rule {rule_id}: unknown target relay {action.target}")
+        return v
 
 def load_json_file(filepath: str) -> dict:
     with open(filepath, 'r') as file:
@@ -0,0 +1,66 @@
+"""
+Per-request latency of the web app's security header and access log middleware, against no
+middleware and against the BaseHTTPMiddleware version they replaced.
+
+Usage: python scripts/bench_middleware.py (run it on the Pi for the numbers that matter)
+"""
+
+import asyncio
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "web", "app"))
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from core.middleware import DOCS_CSP, DOCS_PREFIXES, STRICT_CSP, AccessLogMiddleware, SecurityHeadersMiddleware
+
+async def endpoint(scope, receive, send):
+    await PlainTextResponse("ok")(scope, receive, send)
+
+async def dispatch(request, call_next):
+    # The previous main.py middleware: BaseHTTPMiddleware, headers built per response
+    response = await call_next(request)
+    csp = DOCS_CSP if request.url.path.startswith(DOCS_PREFIXES) else STRICT_CSP
+    response.headers['Content-Security-Policy'] = csp
+    response.headers['X-Frame-Options'] = "DENY"
+    response.headers['X-Content-Type-Options'] = "nosniff"
+    response.headers['Strict-Transport-Security'] = "max-age=31536000; includeSubDomains"
+    response.headers['Referrer-Policy'] = "no-referrer"
+    return response
+
+scope = {"type": "http", "method": "GET", "path": "/", "raw_path": b"/", "query_string": b"",
+         "headers": [], "scheme": "http", "server": ("localhost", 8000), "root_path": "", "http_version": "1.1"}
+
+def make_receive():
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Future()  # Like a server: nothing more until the client disconnects
+    return receive
+
+async def send(message):
+    pass
+
+async def measure(app, runs: int) -> float:
+    for _ in range(runs // 10):
+        await app(dict(scope), make_receive(), send)
+    start = time.perf_counter()
+    for _ in range(runs):
+        await app(dict(scope), make_receive(), send)
+    return (time.perf_counter() - start) / runs * 1e6
+
+runs = 20_000
+print(f"{platform.machine()}, Python {platform.python_version()}, {os.cpu_count()} CPUs")
+stacks = {
+    "none": endpoint,
+    "BaseHTTPMiddleware": BaseHTTPMiddleware(endpoint, dispatch=dispatch),
+    "pure ASGI": AccessLogMiddleware(SecurityHeadersMiddleware(endpoint), sample_rate=0.0),
+}
+for name, app in stacks.items():
+    print(f"{name:>18}: {asyncio.run(measure(app, runs)):7.1f} us/request")
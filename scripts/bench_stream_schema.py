@@ -0,0 +1,26 @@
+"""
+Bytes per entry and decode cost of the legacy and v1 (msgpack) Redis stream entry formats.
+
+Usage: python scripts/bench_stream_schema.py
+"""
+
+import os
+import sys
+import timeit
+from datetime import datetime, timezone
+
+# stream_schema.py is identical in both services; benchmark the data service copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "app"))
+from utils.stream_schema import decode, encode
+
+sample = {"volts": 12.07, "amps": 0.43, "watts": 5.19}
+message_id = b'1718000000000-0'
+legacy = {b'timestamp': datetime.now(timezone.utc).astimezone().isoformat().encode(),
+          b'relay': b'relay1', **{k.encode(): str(v).encode() for k, v in sample.items()}}
+compact = encode(sample)
+runs = 100_000
+
+for name, fields in (("legacy", legacy), ("v1", compact)):
+    size = sum(len(k) + len(v) for k, v in fields.items())
+    seconds = timeit.timeit(lambda: decode(message_id, fields), number=runs)
+    print(f"{name:>6}: {size:3d} bytes/entry ({len(fields)} fields), {seconds / runs * 1e6:.2f} us/decode")
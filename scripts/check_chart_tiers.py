@@ -0,0 +1,57 @@
+"""
+Check that a relay chart whose range crosses the Redis/InfluxDB tier boundary keeps one point
+per window, and that hot-tier windows are time-weighted.
+
+Usage: python scripts/check_chart_tiers.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "web", "app"))
+from core.config import settings
+from core.downsample import epoch_ms, rfc3339
+from core.stream_schema import encode
+from routers.line import WebGrapher, chart_window
+
+window = chart_window("relay_1", 7200, settings.CHART_MAX_POINTS)
+window_ms = window * 1000
+now_ms = 1_700_000_000_000 // window_ms * window_ms + 25_000
+stop_ms = now_ms // window_ms * window_ms
+start_ms = now_ms - 7200 * 1000
+
+# Raw relay samples in Redis, every 10 s while flat, with a 1 s burst at 20 V in one window
+burst_window = stop_ms - 10 * window_ms
+samples = {ms: 12.0 for ms in range(now_ms - 4200 * 1000, now_ms, 10_000)}
+samples.update({burst_window + 10_000 + i * 1000: 20.0 for i in range(5)})
+samples[burst_window + 15_000] = 12.0
+
+class FakeRedis:
+    async def xrange(self, stream, min="-", max="+", count=None):
+        low, high = (0 if min == "-" else int(min)), (float("inf") if max == "+" else int(max))
+        entries = [(f"{ms}-0".encode(), encode({"volts": volts})) for ms, volts in sorted(samples.items()) if low <= ms <= high]
+        return entries[:count] if count else entries
+
+class ColdGrapher(WebGrapher):
+    # InfluxDB holds one 60 s relay average per window, stamped by aggregateWindow at the window end
+    def generate_query(self, page_name, start_ms, stop_ms, window=None):
+        return start_ms, stop_ms, window
+
+    async def query_columns(self, query):
+        start_ms, stop_ms, window = query
+        ends = range(start_ms // (window * 1000) * (window * 1000) + window * 1000, stop_ms + 1, window * 1000)
+        return {"timestamp": [rfc3339(end) for end in ends], "volts": [12.0 for _ in ends]}
+
+grapher = ColdGrapher(None, FakeRedis())
+boundary = asyncio.run(grapher.hot_boundary("relay_1", stop_ms))
+assert start_ms < boundary < stop_ms, "the range should cross the tier boundary"
+columns = asyncio.run(grapher.read_columns("relay_1", start_ms, stop_ms, window))
+times = [epoch_ms(ts) for ts in columns["timestamp"]]
+steps = {later - earlier for earlier, later in zip(times, times[1:])}
+assert steps == {window_ms}, f"point spacing changes across the tier boundary: {sorted(steps)}"
+assert times[-1] == stop_ms, "the last point should end the last completed window"
+# 20 V for 5 s and 12 V for 55 s, not the per-sample mean of (6 * 12 + 5 * 20) / 11
+burst = columns["volts"][times.index(burst_window + window_ms)]
+assert abs(burst - (20 * 5 + 12 * 55) / 60) < 1e-9, f"burst window averaged to {burst}"
+print(f"{len(times)} points, {window} s apart across the boundary at {rfc3339(boundary)}: ok")
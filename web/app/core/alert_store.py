@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from core.config import settings
+
+class AlertReader:
+    """
+    Read-only access to the alert history the data service keeps in SQLite (WAL mode).
+
+    Pages are fetched with keyset pagination: newest first, ordered by (timestamp, id), and the
+    next page starts below the last row of the previous one. Together with the time, source and
+    level indexes this keeps every page as cheap as the first, however much history exists.
+    Message search uses the FTS5 index.
+
+    Queries run on a small thread pool with one read-only connection per thread.
+    """
+
+    def __init__(self, path: str = settings.ALERT_DB_PATH, workers: int = 2):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="alert_reader")
+        self.local = threading.local()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            if not os.path.exists(self.path):
+                return None  # No alert recorded yet
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            connection.row_factory = sqlite3.Row
+            self.local.connection = connection
+        return connection
+
+    @staticmethod
+    def encode_cursor(timestamp_ms: int, alert_id: int) -> str:
+        return f"{timestamp_ms}-{alert_id}"
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[int, int]:
+        timestamp_ms, alert_id = cursor.split("-", 1)
+        return int(timestamp_ms), int(alert_id)
+
+    @staticmethod
+    def match_expression(text: str) -> str:
+        # Every word must appear; quoting keeps FTS5 operators in user input from being parsed
+        return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+    def _query(self, limit: int, cursor: Optional[str], start_ms: Optional[int], end_ms: Optional[int],
+               level: Optional[str], source: Optional[str], text: Optional[str]) -> Tuple[List[dict], Optional[str]]:
+        connection = self._connection()
+        if connection is None:
+            return [], None
+        clauses, params = [], []
+        if cursor:
+            clauses.append("(alerts.timestamp, alerts.id) < (?, ?)")
+            params.extend(self.decode_cursor(cursor))
+        if start_ms is not None:
+            clauses.append("alerts.timestamp >= ?")
+            params.append(start_ms)
+        if end_ms is not None:
+            clauses.append("alerts.timestamp < ?")
+            params.append(end_ms)
+        if level:
+            clauses.append("alerts.level = ?")
+            params.append(level)
+        if source:
+            clauses.append("alerts.source = ?")
+            params.append(source)
+        query = "SELECT alerts.id, alerts.timestamp, alerts.source, alerts.level, alerts.rule_id, alerts.state, alerts.message FROM alerts"
+        if text and text.strip():
+            query += " JOIN alerts_fts ON alerts_fts.rowid = alerts.id"
+            clauses.append("alerts_fts MATCH ?")
+            params.append(self.match_expression(text))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY alerts.timestamp DESC, alerts.id DESC LIMIT ?"
+        params.append(limit + 1)
+        rows = connection.execute(query, params).fetchall()
+        alerts = [{
+            "timestamp": datetime.fromtimestamp(row["timestamp"] / 1000, timezone.utc).isoformat(),
+            "source": row["source"],
+            "level": row["level"],
+            "rule_id": row["rule_id"],
+            "state": row["state"],
+            "value": row["message"]
+        } for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = self.encode_cursor(last["timestamp"], last["id"])
+        return alerts, next_cursor
+
+    async def fetch(self, limit: int, cursor: Optional[str] = None, start_ms: Optional[int] = None,
+                    end_ms: Optional[int] = None, level: Optional[str] = None, source: Optional[str] = None,
+                    text: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        One page of alerts, newest first.
+
+        Args:
+            limit (int): Alerts per page.
+            cursor (Optional[str]): `next_cursor` of the previous page; None for the first page.
+            start_ms (Optional[int]): Only alerts at or after this time (epoch ms).
+            end_ms (Optional[int]): Only alerts before this time (epoch ms).
+            level (Optional[str]): Only alerts of this level.
+            source (Optional[str]): Only alerts from this source.
+            text (Optional[str]): Only alerts whose message contains all of these words.
+
+        Returns:
+            Tuple[List[dict], Optional[str]]: The alerts and the cursor of the next page (None on the last page).
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._query, limit, cursor, start_ms, end_ms, level, source, text)
+
+alert_reader = AlertReader()
@@ -0,0 +1,124 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Dict, Set
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli #type: ignore
+except ImportError:  # Brotli variants are skipped without the package; gzip ones are still built
+    brotli = None
+
+STATIC_DIR = "static"
+DIST_DIR = "dist"  # Fingerprinted copies, under static/ and served from /static/dist/
+DIST_PREFIX = f"/static/{DIST_DIR}/"
+FINGERPRINTED = {".js", ".css", ".png", ".svg", ".ico"}
+COMPRESSIBLE = {".js", ".css", ".svg"}
+# The file name changes with the content, so a fingerprinted URL can be cached forever
+IMMUTABLE = "public, max-age=31536000, immutable"
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+def _write(path: str, data: bytes):
+    # Several workers may build at once; a rename never leaves a partly written file behind
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "wb") as file:
+        file.write(data)
+    os.replace(temp, path)
+
+class AssetManifest:
+    """
+    Maps static assets to fingerprinted copies (e.g. js/line.js -> dist/js/line.3f9a1c2b7d4e.js)
+    with gzip and brotli variants compressed once at the highest level, instead of gzipping
+    the same files again on every request. Templates link to the fingerprinted names through
+    the `asset()` template global, and unchanged files are not rewritten on later builds.
+    """
+
+    def __init__(self, static_dir: str = STATIC_DIR):
+        self.static_dir = static_dir
+        self.paths: Dict[str, str] = {}
+
+    def build(self) -> Dict[str, str]:
+        """Fingerprint and precompress every asset, remove stale builds and return the manifest."""
+        paths = {}
+        produced: Set[str] = set()
+        dist_root = os.path.join(self.static_dir, DIST_DIR)
+        for root, dirs, files in os.walk(self.static_dir):
+            if os.path.abspath(root) == os.path.abspath(self.static_dir) and DIST_DIR in dirs:
+                dirs.remove(DIST_DIR)
+            for name in files:
+                source = os.path.join(root, name)
+                relative = os.path.relpath(source, self.static_dir).replace(os.sep, "/")
+                stem, ext = os.path.splitext(relative)
+                if ext not in FINGERPRINTED:
+                    continue
+                with open(source, "rb") as file:
+                    data = file.read()
+                digest = hashlib.blake2b(data, digest_size=6).hexdigest()
+                hashed = f"{DIST_DIR}/{stem}.{digest}{ext}"
+                target = os.path.join(self.static_dir, hashed)
+                _write(target, data)
+                produced.add(target)
+                if ext in COMPRESSIBLE:
+                    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+                    if brotli is not None:
+                        variants[".br"] = brotli.compress(data, quality=11)
+                    for suffix, compressed in variants.items():
+                        if len(compressed) < len(data):
+                            _write(target + suffix, compressed)
+                            produced.add(target + suffix)
+                paths[relative] = hashed
+        for root, _, files in os.walk(dist_root):
+            for name in files:
+                path = os.path.join(root, name)
+                if path not in produced and not name.endswith(".tmp"):
+                    os.remove(path)
+        self.paths = paths
+        return paths
+
+    def url(self, path: str) -> str:
+        """URL of an asset, e.g. asset('js/line.js'); the original file if it was not built."""
+        return "/static/" + self.paths.get(path, path)
+
+manifest = AssetManifest()
+asset_url = manifest.url
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves fingerprinted assets with immutable cache headers, sending the
+    prebuilt brotli or gzip variant when the client accepts it. Other files are served as usual.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if not path.startswith(DIST_DIR + os.sep):
+            return await super().get_response(path, scope)
+        accepted = Headers(scope=scope).get("accept-encoding", "")
+        response = None
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and os.path.isfile(os.path.join(self.directory, path + suffix)):
+                response = await super().get_response(path + suffix, scope)
+                response.headers["content-encoding"] = encoding
+                if "content-type" in response.headers:
+                    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                    if media_type.startswith("text/"):
+                        media_type += "; charset=utf-8"
+                    response.headers["content-type"] = media_type
+                break
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["cache-control"] = IMMUTABLE
+            response.headers["vary"] = "Accept-Encoding"
+        return response
+
+
+if __name__ == "__main__":
+    # Build ahead of time, e.g. in an image build; the app also builds at startup
+    for original, hashed in sorted(AssetManifest().build().items()):
+        print(f"{original} -> {hashed}")
@@ -0,0 +1,158 @@
+import asyncio
+from typing import Dict, Iterable, Optional, Set
+from redis.asyncio import Redis #type: ignore
+from starlette.requests import HTTPConnection
+from core.config import settings
+from core.logger import logger
+from core.stream_schema import decode, ID_FIELD
+from core.latest import read_latest
+from core.tracking_cache import TrackingCache
+
+class Subscriber:
+    """
+    One WebSocket's inbox. Frames are (stream, values) tuples; a subscriber can listen to
+    several streams through the same bounded queue.
+    """
+
+    def __init__(self, maxsize: int = settings.WS_QUEUE_SIZE):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+
+class StreamBroadcaster:
+    """
+    Follows one Redis stream with a blocking XREAD and fans each new entry out to every
+    subscriber, so Redis load no longer grows with the number of viewers.
+
+    Subscribers get the latest full values when they join and then delta frames holding only
+    the fields that changed. Frames are never awaited: if a subscriber's queue is full the frame
+    is dropped for that subscriber alone, and it is sent the full values again once it has room,
+    so a slow client neither stalls the others nor ends up with stale fields.
+    """
+
+    def __init__(self, redis: Redis, stream: str):
+        self.redis = redis
+        self.stream = stream
+        self.subscribers: Set[Subscriber] = set()
+        self.lagging: Set[Subscriber] = set()
+        self.latest: Dict[str, Optional[float]] = {}
+        self.last_id = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    async def start(self, latest: Dict[bytes, bytes]):
+        """Start following the stream from its `latest:<stream>` hash (empty if it has no data yet)."""
+        self.latest = {}
+        # Without a latest entry, follow only entries added from now on
+        self.last_id = '$'
+        error = None
+        if latest:
+            try:
+                self._apply(latest[ID_FIELD], latest)
+                self.last_id = latest[ID_FIELD]
+            except Exception as e:
+                self.latest, error = {}, e
+        self.task = asyncio.create_task(self._run())
+        if error:
+            await logger.error(f"Error decoding latest {self.stream} entry: {error}")
+
+    def subscribe(self, subscriber: Subscriber):
+        self.subscribers.add(subscriber)
+        self._send(subscriber, self.latest, full=True)
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+        self.lagging.discard(subscriber)
+        if not self.subscribers and self.task:
+            self.task.cancel()
+            self.task = None
+
+    def _send(self, subscriber: Subscriber, values: dict, full: bool = False):
+        if subscriber in self.lagging:
+            values, full = self.latest, True
+        if not values and not full:
+            return
+        try:
+            subscriber.queue.put_nowait((self.stream, dict(values)))
+            self.lagging.discard(subscriber)
+        except asyncio.QueueFull:
+            subscriber.dropped += 1
+            self.lagging.add(subscriber)
+
+    def _apply(self, message_id: bytes, fields: dict) -> dict:
+        """Update the latest values with one entry and return the fields that changed."""
+        timestamp_ms, values = decode(message_id, fields)
+        values = {k: round(v, 1) if v is not None else None for k, v in values.items()}
+        delta = {k: v for k, v in values.items() if self.latest.get(k) != v or k not in self.latest}
+        self.latest.update(values)
+        self.latest["timestamp"] = timestamp_ms
+        if delta:
+            delta["timestamp"] = timestamp_ms
+        return delta
+
+    async def _run(self):
+        while True:
+            try:
+                response = await self.redis.xread(
+                    {self.stream: self.last_id}, count=100, block=settings.BROADCAST_BLOCK_MS
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await logger.error(f"Error reading from Redis stream {self.stream}: {e}")
+                await asyncio.sleep(1)
+                continue
+            for _, messages in response or []:
+                for message_id, fields in messages:
+                    self.last_id = message_id
+                    try:
+                        delta = self._apply(message_id, fields)
+                    except Exception as e:
+                        await logger.error(f"Error decoding {self.stream} entry {message_id}: {e}")
+                        continue
+                    for subscriber in list(self.subscribers):
+                        self._send(subscriber, delta)
+
+
+class BroadcastHub:
+    """Creates one StreamBroadcaster per stream on first use and shares it between WebSockets."""
+
+    def __init__(self, redis: Redis, cache: TrackingCache):
+        self.redis = redis
+        self.cache = cache
+        self.broadcasters: Dict[str, StreamBroadcaster] = {}
+
+    async def subscribe(self, streams: Iterable[str], subscriber: Subscriber):
+        """
+        Subscribe to several streams at once. Broadcasters that are not running yet are started
+        from their latest-value hashes, all read in one pipelined round trip.
+        """
+        broadcasters = [self.broadcasters.setdefault(stream, StreamBroadcaster(self.redis, stream)) for stream in streams]
+        idle = [broadcaster for broadcaster in broadcasters if not broadcaster.running]
+        if idle:
+            try:
+                latest = await read_latest(self.cache, [broadcaster.stream for broadcaster in idle])
+            except Exception as e:
+                await logger.error(f"Error reading latest values from Redis: {e}")
+                latest = {}
+            for broadcaster in idle:
+                # Another subscriber may have started it while the hashes were read
+                if not broadcaster.running:
+                    await broadcaster.start(latest.get(broadcaster.stream, {}))
+        for broadcaster in broadcasters:
+            broadcaster.subscribe(subscriber)
+
+    def unsubscribe(self, stream: str, subscriber: Subscriber):
+        if stream in self.broadcasters:
+            self.broadcasters[stream].unsubscribe(subscriber)
+
+    def close(self):
+        for broadcaster in self.broadcasters.values():
+            if broadcaster.task:
+                broadcaster.task.cancel()
+
+def get_hub(conn: HTTPConnection) -> BroadcastHub:
+    return conn.app.state.hub
@@ -0,0 +1,93 @@
+import asyncio
+from fastapi import FastAPI
+from starlette.requests import HTTPConnection
+from redis.asyncio import Redis, BlockingConnectionPool #type: ignore
+from redis.asyncio.retry import Retry #type: ignore
+from redis.backoff import ExponentialBackoff #type: ignore
+from redis.exceptions import ConnectionError, TimeoutError #type: ignore
+from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync #type: ignore
+from influxdb_client.client.query_api_async import QueryApiAsync #type: ignore
+from core.config import settings
+from core.logger import logger
+from core.tracking_cache import TrackingCache
+
+class Clients:
+    """
+    Redis and InfluxDB clients shared by every request for the lifetime of the app.
+
+    Redis commands go through one bounded connection pool: requests wait for a free connection
+    instead of opening new ones, idle connections are health checked before reuse, and commands
+    that hit a connection error are retried with exponential backoff. InfluxDB queries reuse
+    the kept-alive HTTP connections of one aiohttp session. Hot keys (latest values, device
+    info) are read through `cache`, which Redis keeps coherent with client tracking.
+    """
+
+    def __init__(self):
+        retry = Retry(ExponentialBackoff(cap=settings.BACKOFF_MAX, base=settings.BACKOFF_BASE), settings.REDIS_RETRIES)
+        pool = BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            health_check_interval=settings.HEALTH_CHECK_INTERVAL,
+            socket_keepalive=True,
+            retry=retry,
+            retry_on_error=[ConnectionError, TimeoutError],
+        )
+        self.redis = Redis(connection_pool=pool)
+        self.cache = TrackingCache(self.redis)
+        self.influx = InfluxDBClientAsync(
+            url=settings.INFLUXDB_URL,
+            token=settings.TOKEN,
+            org=settings.ORG,
+            timeout=settings.INFLUX_TIMEOUT,
+            connection_pool_maxsize=settings.INFLUX_POOL_SIZE,
+        )
+        self.query_api = QueryApiAsync(self.influx)
+        self.status = {"redis": False, "influxdb": False}
+
+    async def check(self) -> dict:
+        """Ping both services and record whether they are reachable."""
+        try:
+            self.status["redis"] = bool(await self.redis.ping())
+        except Exception as e:
+            self.status["redis"] = False
+            await logger.warning(f"Redis health check failed: {e}")
+        try:
+            self.status["influxdb"] = await self.influx.ping()
+        except Exception as e:
+            self.status["influxdb"] = False
+            await logger.warning(f"InfluxDB health check failed: {e}")
+        return self.status
+
+    async def monitor(self):
+        """Health check both services periodically, backing off while either is down."""
+        delay = settings.BACKOFF_BASE
+        while True:
+            status = await self.check()
+            if all(status.values()):
+                delay = settings.BACKOFF_BASE
+                await asyncio.sleep(settings.HEALTH_CHECK_INTERVAL)
+            else:
+                await logger.error(f"Backend unavailable {status}, rechecking in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.BACKOFF_MAX)
+
+    async def close(self):
+        await self.redis.aclose()
+        await self.influx.close()
+
+async def open_clients(app: FastAPI) -> Clients:
+    clients = Clients()
+    await clients.check()
+    app.state.clients = clients
+    return clients
+
+# FastAPI dependencies; HTTPConnection covers both HTTP and WebSocket routes
+def get_redis(conn: HTTPConnection) -> Redis:
+    return conn.app.state.clients.redis
+
+def get_cache(conn: HTTPConnection) -> TrackingCache:
+    return conn.app.state.clients.cache
+
+def get_query_api(conn: HTTPConnection) -> QueryApiAsync:
+    return conn.app.state.clients.query_api
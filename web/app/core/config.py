@@ -15,9 +15,41 @@ class Settings:
     BUCKET = os.getenv('DOCKER_INFLUXDB_INIT_BUCKET')
     ORG = os.getenv('DOCKER_INFLUXDB_INIT_ORG')
     TOKEN = os.getenv('DOCKER_INFLUXDB_INIT_ADMIN_TOKEN')
+
+    # Connection pool settings, shared by every request (see core/clients.py)
+    REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 20))  # Shared pool size; requests wait for a free connection
+    REDIS_POOL_TIMEOUT = 5  # Seconds a request waits for a pooled connection
+    REDIS_RETRIES = 3  # Retries of a command after a connection error, with backoff
+    INFLUX_POOL_SIZE = int(os.getenv("INFLUX_POOL_SIZE", 10))  # Kept-alive HTTP connections to InfluxDB
+    INFLUX_TIMEOUT = 10_000  # InfluxDB request timeout (ms)
+    HEALTH_CHECK_INTERVAL = 30  # Seconds between Redis/InfluxDB health checks
+    BACKOFF_BASE = 0.5  # First reconnect delay (seconds), doubled on each failure
+    BACKOFF_MAX = 30  # Longest reconnect delay (seconds)
+
+    # Live gauge WebSocket settings
+    WS_QUEUE_SIZE = 8  # Frames buffered per client before frames are dropped for it
+    BROADCAST_BLOCK_MS = 5000  # How long each stream's XREAD blocks waiting for new entries
+
+    # Client-side cache of hot Redis keys, kept coherent by Redis client tracking (see core/tracking_cache.py)
+    CLIENT_CACHE_PREFIXES = ["latest:", "device_info:"]  # Key prefixes Redis sends invalidations for
+    CLIENT_CACHE_MAX_KEYS = 1024  # Least recently read keys are evicted beyond this
+
+    # Chart query cache settings
+    CHART_CACHE_ENTRIES = 128  # Cached (measurement, timeframe, aggregation) results
+    CHART_RAW_TTL = 10  # Seconds an unaggregated result stays fresh
+    CHART_MAX_POINTS = 720  # Default points per field returned by the chart API
+    CHART_RAW_RESOLUTION = 1  # Seconds between raw samples; ranges that fit at this rate are not aggregated
+    LTTB_OVERSAMPLE = 4  # With LTTB, aggregate to this many times max_points before downsampling
+    HOT_TIER_SECONDS = 3600  # Most recent part of a chart range read from the Redis stream instead of InfluxDB
+    RELAY_AGGREGATION_WINDOW = 60  # Seconds per relay point in InfluxDB (the data service's RELAY_AGGREGATION_WINDOW)
+    RELAY_SAMPLE_MAX_GAP = 10  # Longest time (seconds) one relay sample stands for in an average (the samplers' max_interval)
+
+    # Access log settings
+    ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", 0.01))  # Share of requests logged; 5xx responses are always logged
     
     # Authentication/Security related settings   
     HASHED_PASSWORDS_FILE = "/app_data/hashed_passwords.json"
+    ALERT_DB_PATH = os.getenv("ALERT_DB_PATH", "/app_data/alerts.db")  # Alert history written by the data service
     ADMIN_USERNAME = os.getenv("ADMIN_USERNAME")
     ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD")
     USER_USERNAME = os.getenv("USER_USERNAME")
@@ -25,16 +57,19 @@ class Settings:
     SECRET_KEY = secrets.token_hex(32)
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = 60
+    BCRYPT_WORKERS = 2  # Threads that run bcrypt, bounding the CPU logins can use
+    LOGIN_MAX_FAILURES = 5  # Failed logins allowed per client IP within LOGIN_WINDOW
+    LOGIN_WINDOW = 300  # Seconds failed logins are counted for
+    LOGIN_MAX_PENDING = 16  # Logins waiting for bcrypt at once, across all clients; more are told to retry
+    LOGIN_MAX_CLIENTS = 4096  # Client IPs whose failed logins are remembered
+    TOKEN_CACHE_SIZE = 256  # Verified access tokens kept in memory
+    TOKEN_CACHE_TTL = 60  # Seconds a verified token is trusted before it is decoded again
     CERT_DIR = "/etc/nginx/certs"
     CERT_FILE = os.path.join(CERT_DIR, "cert.pem")
     KEY_FILE = os.path.join(CERT_DIR, "key.pem")
 
-    # SNMP settings
-    COMMUNITY = 'public'
-    ROUTER_IP = '192.168.1.1'
-    CAMERA_IP = '192.168.1.3'
-    CAMERA_OIDS = {"model": '.1.3.6.1.2.1.1.1.0', "serial": '.1.3.6.1.2.1.2.2.1.6.2'} # Neither Camera nor Router have an OID for uptime
-    ROUTER_OIDS = {"model": '.1.3.6.1.2.1.1.1.0', "serial": '.1.3.6.1.4.1.23695.200.1.1.1.1.2.0', "firmware": '.1.3.6.1.4.1.23695.200.1.1.1.1.3.0', "ssid": '.1.3.6.1.4.1.23695.4.2.3.1.2.1',}
+    # Device info (router/camera) is polled over SNMP by the data service and cached in Redis
+    DEVICE_INFO_KEY = "device_info:{}"
     
     # Etc settings
     GPIO_PINS = {"router": 21, "camera": 20, "strobe": 16, "fan": 12}
@@ -0,0 +1,134 @@
+import math
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DURATION_PATTERN = re.compile(r"(\d+)(ms|s|m|h|d|w)")
+DURATION_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def parse_duration(duration: str) -> Optional[float]:
+    """
+    Convert a Flux duration literal (e.g. "90m", "1d12h") to seconds.
+
+    Returns:
+        Optional[float]: The duration in seconds, or None if it is not a valid duration.
+    """
+    parts = DURATION_PATTERN.findall(duration)
+    if not parts or "".join(value + unit for value, unit in parts) != duration:
+        return None
+    return sum(int(value) * DURATION_SECONDS[unit] for value, unit in parts)
+
+def epoch_ms(timestamp: str) -> int:
+    """Convert an InfluxDB RFC3339 UTC timestamp (e.g. "2024-01-01T00:00:01.123456789Z") to epoch milliseconds."""
+    seconds = datetime.fromisoformat(timestamp[:19]).replace(tzinfo=timezone.utc).timestamp()
+    millis = timestamp[20:23] if timestamp[19:20] == "." else ""
+    return int(seconds) * 1000 + int(millis.rstrip("Z").ljust(3, "0"))
+
+def rfc3339(timestamp_ms: int) -> str:
+    """Render epoch milliseconds as an RFC3339 UTC timestamp, usable as a Flux time literal."""
+    seconds, millis = divmod(timestamp_ms, 1000)
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S") + f".{millis:03d}Z"
+
+def aggregation_window(range_seconds: float, max_points: int, resolution: float = 1.0) -> Optional[int]:
+    """
+    Pick the aggregation window (whole seconds) that keeps a range at or below `max_points`.
+
+    Args:
+        range_seconds (float): Length of the queried range.
+        max_points (int): Most points the chart should receive per field.
+        resolution (float): Interval of the raw data; no aggregation is needed below it.
+
+    Returns:
+        Optional[int]: Window in seconds, or None if the raw data already fits.
+    """
+    if range_seconds / resolution <= max_points:
+        return None
+    return math.ceil(range_seconds / max_points)
+
+def sample_weights(timestamps: Sequence[int], stop_ms: int, max_gap_ms: int) -> List[int]:
+    """
+    Time each sample stands for: until the next sample (the last one until `stop_ms`), at most
+    `max_gap_ms` and at least 1 ms. Used to average irregularly spaced samples over time.
+    """
+    following = list(timestamps[1:]) + [stop_ms]
+    return [min(max(after - timestamp, 1), max_gap_ms) for timestamp, after in zip(timestamps, following)]
+
+def aggregate_windows(timestamps: Sequence[int], columns: Dict[str, List], window_ms: int,
+                      stop_ms: int, max_gap_ms: Optional[int] = None) -> Tuple[List[int], Dict[str, List]]:
+    """
+    Average each column over epoch-aligned windows, the way Flux `aggregateWindow(fn: mean,
+    createEmpty: false)` does: every window is stamped with its end (clipped to `stop_ms`), None
+    values are ignored and windows without any value are left out.
+
+    Args:
+        timestamps (Sequence[int]): Sorted sample times (epoch ms).
+        columns (Dict[str, List]): Field values, one per timestamp.
+        window_ms (int): Window length.
+        stop_ms (int): Exclusive end of the queried range.
+        max_gap_ms (Optional[int]): Weight samples by the time they stand for (see `sample_weights`)
+                                    instead of equally, for adaptively sampled data.
+
+    Returns:
+        Tuple[List[int], Dict[str, List]]: Window times and the mean of each field per window.
+    """
+    weights = sample_weights(timestamps, stop_ms, max_gap_ms) if max_gap_ms else [1] * len(timestamps)
+    times: List[int] = []
+    means: Dict[str, List] = {name: [] for name in columns}
+    sums = {name: [0.0, 0] for name in columns}
+    current = None
+
+    def flush():
+        if any(count for _, count in sums.values()):
+            times.append(min(current + window_ms, stop_ms))
+            for name, (total, count) in sums.items():
+                means[name].append(total / count if count else None)
+
+    for i, timestamp in enumerate(timestamps):
+        start = timestamp // window_ms * window_ms
+        if start != current:
+            if current is not None:
+                flush()
+            current = start
+            sums = {name: [0.0, 0] for name in columns}
+        for name, values in columns.items():
+            if values[i] is not None:
+                sums[name][0] += values[i] * weights[i]
+                sums[name][1] += weights[i]
+    if current is not None:
+        flush()
+    return times, means
+
+def lttb_indices(x: Sequence[float], y: Sequence[float], threshold: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets: choose `threshold` points that preserve the visual shape
+    of the series. The first and last points are always kept; from every bucket in between,
+    the point forming the largest triangle with the previously kept point and the average of
+    the next bucket is kept.
+
+    Returns:
+        List[int]: Indices of the kept points, in order.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    kept = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        next_count = next_end - next_start
+        avg_x = sum(x[next_start:next_end]) / next_count
+        avg_y = sum(y[next_start:next_end]) / next_count
+        ax, ay = x[a], y[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (y[j] - ay) - (ax - x[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
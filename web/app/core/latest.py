@@ -0,0 +1,16 @@
+from typing import Dict, Iterable
+from core.stream_schema import LATEST_KEY
+from core.tracking_cache import TrackingCache
+
+async def read_latest(cache: TrackingCache, streams: Iterable[str]) -> Dict[str, Dict[bytes, bytes]]:
+    """
+    Fetch the `latest:<stream>` hash of several streams, with one pipelined round trip for
+    those that are not in the client-side cache.
+
+    Returns:
+        Dict[str, Dict[bytes, bytes]]: The raw hash per stream, empty if the stream has no data
+                                       yet. Decode it with `stream_schema.decode_latest`.
+    """
+    streams = list(streams)
+    hashes = await cache.hgetall([LATEST_KEY.format(stream) for stream in streams])
+    return dict(zip(streams, hashes))
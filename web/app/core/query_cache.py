@@ -0,0 +1,80 @@
+import asyncio
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+class QueryCache:
+    """
+    In-process cache of rendered query responses with single-flight loading.
+
+    Each entry holds the response body and its ETag until its TTL expires. Concurrent requests
+    for a key that is missing or expired share one in-flight load instead of each running the
+    query; a failed load is not cached and is raised to every waiting request.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self.entries: Dict[Hashable, Tuple[float, bytes, str]] = {}
+        self.inflight: Dict[Hashable, asyncio.Task] = {}
+
+    @staticmethod
+    def etag(body: bytes) -> str:
+        return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+    @staticmethod
+    def matches(if_none_match: str, etag: str) -> bool:
+        """
+        Check an If-None-Match header against an ETag. The header is a comma-separated list of
+        entity tags or `*`; the comparison is weak (RFC 9110), so a `W/` prefix is ignored.
+        """
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag == etag:
+                return True
+        return False
+
+    async def get(self, key: Hashable, ttl: float, load: Callable[[], Awaitable[bytes]]) -> Tuple[bytes, str]:
+        """
+        Return the cached body for `key`, loading it with `load` if missing or expired.
+
+        Args:
+            key (Hashable): Cache key, e.g. (measurement, timeframe, aggregation).
+            ttl (float): Seconds the loaded body stays fresh.
+            load (Callable[[], Awaitable[bytes]]): Produces the response body.
+
+        Returns:
+            Tuple[bytes, str]: The body and its ETag.
+        """
+        entry = self.entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1], entry[2]
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, ttl, load))
+            self.inflight[key] = task
+        # Shielded so a client disconnecting doesn't cancel the load for everyone else
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, ttl: float, load: Callable[[], Awaitable[bytes]]) -> Tuple[bytes, str]:
+        try:
+            body = await load()
+            etag = self.etag(body)
+            self._store(key, (time.monotonic() + ttl, body, etag))
+            return body, etag
+        finally:
+            self.inflight.pop(key, None)
+
+    def _store(self, key: Hashable, entry: Tuple[float, bytes, str]):
+        self.entries.pop(key, None)
+        if len(self.entries) >= self.max_entries:
+            now = time.monotonic()
+            for stale in [k for k, (expires, _, _) in self.entries.items() if expires <= now]:
+                del self.entries[stale]
+            while len(self.entries) >= self.max_entries:
+                # Oldest insertion first
+                del self.entries[next(iter(self.entries))]
+        self.entries[key] = entry
@@ -4,9 +4,13 @@
 #? Higher priority to get this right so that settings are sent securely
 #? Setup logic to API token generation and storage
 
+import asyncio
 import json
 import os
-from typing import Dict
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
 from passlib.context import CryptContext
 from core.config import settings
 from fastapi import Request, HTTPException, status
@@ -16,6 +20,10 @@ from datetime import datetime, timedelta
 
 # Initialize the hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt is deliberately slow; it runs on a few worker threads so a login never stalls the event loop
+bcrypt_executor = ThreadPoolExecutor(max_workers=settings.BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+# Verified against for unknown usernames, so they take as long to reject as a wrong password
+DUMMY_HASH = pwd_context.hash("dummy-password")
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -23,6 +31,10 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(bcrypt_executor, verify_password, plain_password, hashed_password)
+
 def load_users() -> Dict[str, dict]:
     if os.path.exists(settings.HASHED_PASSWORDS_FILE):
         with open(settings.HASHED_PASSWORDS_FILE, 'r') as file:
@@ -45,10 +57,112 @@ def load_users() -> Dict[str, dict]:
             json.dump(users, file)
     return users
 
-def authenticate_user(username: str, password: str):
-    users = load_users()
+class UserCache:
+    """
+    The user table, kept in memory and reloaded only when the passwords file changes
+    (its modification time or size differs from the cached copy).
+    """
+
+    def __init__(self, path: str = settings.HASHED_PASSWORDS_FILE):
+        self.path = path
+        self.users: Optional[Dict[str, dict]] = None
+        self.version: Optional[Tuple[int, int]] = None
+        self.lock = asyncio.Lock()
+
+    def _file_version(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    async def get(self) -> Dict[str, dict]:
+        version = self._file_version()
+        if self.users is not None and version is not None and version == self.version:
+            return self.users
+        async with self.lock:
+            version = self._file_version()
+            if self.users is None or version is None or version != self.version:
+                # Creating the file hashes the default passwords, so it runs off the event loop too
+                self.users = await asyncio.get_running_loop().run_in_executor(bcrypt_executor, load_users)
+                self.version = self._file_version()
+        return self.users
+
+user_cache = UserCache()
+
+class LoginThrottle:
+    """
+    Limits failed logins per client IP over a sliding window, which also caps how much bcrypt
+    work one client can cause. Each attempt counts as a failure before its password is checked,
+    so concurrent attempts cannot all slip past the limit while bcrypt runs; a successful login
+    clears the client's failures. At most `max_pending` checks wait for bcrypt at once, and at
+    most `max_clients` clients are tracked (those idle longest are forgotten first).
+    """
+
+    def __init__(self, max_failures: int = settings.LOGIN_MAX_FAILURES, window: float = settings.LOGIN_WINDOW,
+                 max_pending: int = settings.LOGIN_MAX_PENDING, max_clients: int = settings.LOGIN_MAX_CLIENTS):
+        self.max_failures = max_failures
+        self.window = window
+        self.max_pending = max_pending
+        self.max_clients = max_clients
+        self.pending = 0
+        # Client -> attempt times, least recently active client first
+        self.failures: "OrderedDict[str, deque]" = OrderedDict()
+
+    def _prune(self, client: str, now: float) -> deque:
+        failures = self.failures.get(client, deque())
+        while failures and now - failures[0] >= self.window:
+            failures.popleft()
+        return failures
+
+    def _evict(self, now: float):
+        while self.failures:
+            client, failures = next(iter(self.failures.items()))
+            if len(self.failures) <= self.max_clients and failures and now - failures[-1] < self.window:
+                break
+            del self.failures[client]
+
+    def attempt(self, client: str) -> int:
+        """
+        Register a login attempt before its password is checked. Every registered attempt must
+        be followed by `finished`.
+
+        Returns:
+            int: 0 if the attempt may go ahead, otherwise the seconds until the client may try again.
+        """
+        now = time.monotonic()
+        failures = self._prune(client, now)
+        if len(failures) >= self.max_failures:
+            return int(self.window - (now - failures[0])) + 1
+        if self.pending >= self.max_pending:
+            return 1
+        failures.append(now)
+        self.failures[client] = failures
+        self.failures.move_to_end(client)
+        self._evict(now)
+        self.pending += 1
+        return 0
+
+    def finished(self, client: str, success: bool):
+        self.pending -= 1
+        if success:
+            self.failures.pop(client, None)
+
+login_throttle = LoginThrottle()
+
+def client_ip(request: Request) -> str:
+    # Behind the proxy the peer is the proxy itself; the last X-Forwarded-For entry is the
+    # address the proxy saw, which the client cannot forge
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+async def authenticate_user(username: str, password: str):
+    users = await user_cache.get()
     user = users.get(username)
-    if not user or not verify_password(password, user["hashed_password"]):
+    valid = await verify_password_async(password, user["hashed_password"] if user else DUMMY_HASH)
+    if not user or not valid:
         return None
     return user
 
@@ -59,17 +173,35 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+# Recently verified tokens: token -> (user, seconds since epoch the entry stops being valid)
+token_cache: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+
+def cache_token(token: str, user: dict, expires: float):
+    token_cache[token] = (user, min(expires, time.time() + settings.TOKEN_CACHE_TTL))
+    token_cache.move_to_end(token)
+    while len(token_cache) > settings.TOKEN_CACHE_SIZE:
+        token_cache.popitem(last=False)
+
 async def get_current_user(request: Request):
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    cached = token_cache.get(token)
+    if cached:
+        user, expires = cached
+        if expires > time.time():
+            token_cache.move_to_end(token)
+            return dict(user)
+        del token_cache[token]
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
         role: str = payload.get("role")
         if username is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Token")
-        return {"username": username, "role": role}
+        user = {"username": username, "role": role}
+        cache_token(token, user, payload.get("exp", 0))
+        return dict(user)
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Token")
     
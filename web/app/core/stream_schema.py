@@ -0,0 +1,97 @@
+"""
+Compact Redis stream entry format shared by the data and web services.
+
+This file is kept identical in data/app/utils/stream_schema.py and web/app/core/stream_schema.py
+because the two services are built as separate images.
+
+Version 1 entries hold a single field, `v1`, whose value is a msgpack map of the sample's
+numeric fields (volts, amps, ...). No timestamp is stored: the stream entry ID already
+carries the epoch-millisecond time the sample was added. Entries written before the
+compact format (one stringified field per value plus an ISO `timestamp`) are still decoded.
+
+The data service also keeps a `latest:<stream>` hash holding the newest entry's `v1` payload
+and its entry ID (`id`), written atomically with each XADD, so readers that only need the
+current values can fetch them with HGETALL instead of traversing the stream.
+
+Run `python scripts/bench_stream_schema.py` to print bytes per entry and decode cost for
+both formats.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple, Union
+import msgpack
+
+SCHEMA_VERSION = 1
+PAYLOAD_FIELD = b'v1'
+ID_FIELD = b'id'
+LATEST_KEY = 'latest:{}'
+
+def encode(data: Dict[str, Optional[float]]) -> Dict[str, bytes]:
+    """
+    Pack a sample into the fields for `XADD`.
+
+    Args:
+        data (Dict[str, Optional[float]]): The numeric fields of one sample. A `timestamp`
+                                           key, if present, is dropped (the entry ID is used).
+
+    Returns:
+        Dict[str, bytes]: The stream entry fields.
+    """
+    values = {k: v for k, v in data.items() if k != 'timestamp'}
+    return {PAYLOAD_FIELD: msgpack.packb(values)}
+
+def entry_time_ms(message_id: Union[bytes, str]) -> int:
+    """Return the epoch-millisecond part of a stream entry ID (e.g. b'1718000000000-0')."""
+    if isinstance(message_id, bytes):
+        message_id = message_id.decode()
+    return int(message_id.split('-', 1)[0])
+
+def decode(message_id: Union[bytes, str], fields: Dict[bytes, bytes]) -> Tuple[int, Dict[str, Optional[float]]]:
+    """
+    Unpack a stream entry in either format.
+
+    Args:
+        message_id (Union[bytes, str]): The stream entry ID.
+        fields (Dict[bytes, bytes]): The raw entry fields as returned by redis-py.
+
+    Returns:
+        Tuple[int, Dict[str, Optional[float]]]: (epoch milliseconds, numeric fields).
+    """
+    payload = fields.get(PAYLOAD_FIELD)
+    if payload is not None:
+        return entry_time_ms(message_id), msgpack.unpackb(payload)
+    return _decode_legacy(message_id, fields)
+
+def decode_latest(fields: Dict[bytes, bytes]) -> Optional[Tuple[int, Dict[str, Optional[float]]]]:
+    """
+    Unpack a `latest:<stream>` hash.
+
+    Args:
+        fields (Dict[bytes, bytes]): The hash as returned by `HGETALL`.
+
+    Returns:
+        Optional[Tuple[int, Dict[str, Optional[float]]]]: (epoch milliseconds, numeric fields),
+                                                          or None if the hash does not exist yet.
+    """
+    if not fields or ID_FIELD not in fields:
+        return None
+    return decode(fields[ID_FIELD], fields)
+
+def _decode_legacy(message_id, fields) -> Tuple[int, Dict[str, Optional[float]]]:
+    timestamp_ms = entry_time_ms(message_id)
+    values = {}
+    for key, value in fields.items():
+        key = key.decode() if isinstance(key, bytes) else key
+        if key == 'timestamp':
+            timestamp_ms = int(datetime.fromisoformat(value.decode()).timestamp() * 1000)
+            continue
+        try:
+            values[key] = float(value)
+        except (TypeError, ValueError):
+            continue  # Non-numeric fields such as 'relay'
+    return timestamp_ms, values
+
+def isoformat(timestamp_ms: int) -> str:
+    """Render an epoch-millisecond time as the local ISO-8601 string used in AWS payloads."""
+    return datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc).astimezone().isoformat()
+
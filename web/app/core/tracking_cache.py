@@ -0,0 +1,160 @@
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Union
+from redis.asyncio import Redis #type: ignore
+from redis.asyncio.connection import Connection #type: ignore
+from core.config import settings
+from core.logger import logger
+
+INVALIDATE_CHANNEL = b"__redis__:invalidate"
+
+class TrackingCache:
+    """
+    In-process cache of hot Redis keys that Redis itself keeps coherent (server-assisted client
+    side caching). One dedicated connection turns on `CLIENT TRACKING` in broadcast mode for
+    the configured key prefixes and subscribes to the invalidation channel; whenever any client
+    modifies or expires a tracked key, Redis pushes its name and the cached copy is dropped.
+    Repeat reads of an unchanged key are then answered without a network round trip.
+
+    Until tracking is established (and whenever the tracking connection drops) the cache is
+    emptied and every read goes to Redis, so a missed invalidation can never serve stale data.
+    """
+
+    def __init__(self, redis: Redis, prefixes: Sequence[str] = settings.CLIENT_CACHE_PREFIXES,
+                 max_keys: int = settings.CLIENT_CACHE_MAX_KEYS):
+        self.redis = redis
+        self.prefixes = list(prefixes)
+        self.max_keys = max_keys
+        self.entries: "OrderedDict[str, Union[bytes, dict, None]]" = OrderedDict()
+        self.tracking = False
+        self.established = False
+        # Keys being read right now, and those of them invalidated before the read returned
+        self.loading: Dict[str, int] = {}
+        self.dirty = set()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.flushes = 0
+
+    def stats(self) -> dict:
+        reads = self.hits + self.misses
+        return {
+            "tracking": self.tracking,
+            "keys": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / reads, 4) if reads else None,
+            "invalidations": self.invalidations,
+            "flushes": self.flushes,
+        }
+
+    def tracked(self, key: str) -> bool:
+        return self.tracking and any(key.startswith(prefix) for prefix in self.prefixes)
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        """`MGET` through the cache; only the keys that are not cached are sent to Redis."""
+        return await self._read(keys, lambda missing: self.redis.mget(missing))
+
+    async def hgetall(self, keys: List[str]) -> List[dict]:
+        """`HGETALL` of several hashes through the cache, with one pipeline for the uncached ones."""
+        async def load(missing: List[str]) -> List[dict]:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in missing:
+                    pipe.hgetall(key)
+                return await pipe.execute()
+        return await self._read(keys, load)
+
+    async def _read(self, keys: List[str], load) -> list:
+        values = {}
+        missing = []
+        for key in keys:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                values[key] = self.entries[key]
+                self.hits += 1
+            else:
+                missing.append(key)
+        if missing:
+            self.misses += len(missing)
+            cacheable = [key for key in missing if self.tracked(key)]
+            for key in cacheable:
+                self.loading[key] = self.loading.get(key, 0) + 1
+            try:
+                loaded = dict(zip(missing, await load(missing)))
+            finally:
+                for key in cacheable:
+                    self.loading[key] -= 1
+                    if not self.loading[key]:
+                        del self.loading[key]
+            for key in cacheable:
+                # A value invalidated while it was being read may already be out of date
+                if key not in self.dirty and self.tracking:
+                    self._store(key, loaded[key])
+                if key not in self.loading:
+                    self.dirty.discard(key)
+            values.update(loaded)
+        return [values[key] for key in keys]
+
+    def _store(self, key: str, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_keys:
+            self.entries.popitem(last=False)
+
+    def _invalidate(self, keys: Optional[list]):
+        if keys is None:
+            # Sent when the tracking table is flushed (FLUSHALL, FLUSHDB, memory pressure)
+            self._flush()
+            return
+        for key in keys:
+            key = key.decode() if isinstance(key, bytes) else key
+            self.invalidations += 1
+            self.entries.pop(key, None)
+            if key in self.loading:
+                self.dirty.add(key)
+
+    def _flush(self):
+        self.flushes += 1
+        self.entries.clear()
+        self.dirty.update(self.loading)
+
+    async def _listen(self):
+        # The listener gets its own connection: it is in subscribed mode for as long as it lives
+        kwargs = dict(self.redis.connection_pool.connection_kwargs, health_check_interval=0, socket_timeout=None)
+        connection = Connection(**kwargs)
+        try:
+            await connection.connect()
+            await connection.send_command("CLIENT", "ID")
+            client_id = await connection.read_response()
+            prefixes = [arg for prefix in self.prefixes for arg in ("PREFIX", prefix)]
+            # Broadcast mode: invalidations for every key under the prefixes, whoever read them
+            await connection.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST", *prefixes)
+            await connection.read_response()
+            await connection.send_command("SUBSCRIBE", INVALIDATE_CHANNEL)
+            await connection.read_response()
+            self.tracking = self.established = True
+            await logger.info(f"Redis client tracking enabled for {self.prefixes}")
+            while True:
+                message = await connection.read_response()
+                if message and message[0] == b"message" and message[1] == INVALIDATE_CHANNEL:
+                    self._invalidate(message[2])
+        finally:
+            self.tracking = False
+            self._flush()
+            await connection.disconnect()
+
+    async def run(self):
+        """Keep the tracking connection open, re-establishing it with backoff if it drops."""
+        delay = settings.BACKOFF_BASE
+        while True:
+            self.established = False
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await logger.error(f"Redis client tracking lost, reads bypass the cache: {e}")
+            if self.established:
+                delay = settings.BACKOFF_BASE
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, settings.BACKOFF_MAX)
@@ -1,30 +1,48 @@
+import asyncio
 import uvicorn
 from fastapi import FastAPI, Request, status
-from fastapi.responses import Response, RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse
 from fastapi.security import OAuth2PasswordBearer
-from fastapi.staticfiles import StaticFiles
 from starlette.exceptions import HTTPException
-from starlette.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 from routers import relay, gauge, signal, alerts, auth, user, admin, line, snmp
 from core.logger import logger
 from core.certificate import is_certificate_valid, generate_cert
 from routers.snmp import load_device_info
+from core.clients import open_clients
+from core.broadcaster import BroadcastHub
+from core.middleware import SecurityHeadersMiddleware, AccessLogMiddleware, DynamicGZipMiddleware
+from core.assets import manifest, PrecompressedStaticFiles
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     if not is_certificate_valid():
         generate_cert()
     await logger.setup(log_file="web.log")
+    try:
+        assets = await asyncio.to_thread(manifest.build)
+        await logger.info(f"Built {len(assets)} fingerprinted static assets")
+    except Exception as e:
+        await logger.error(f"Failed to build static assets, serving the originals: {e}")
+    clients = await open_clients(app)
+    health_task = asyncio.create_task(clients.monitor())
+    cache_task = asyncio.create_task(clients.cache.run())
+    app.state.hub = BroadcastHub(clients.redis, clients.cache)
     await load_device_info(app)
     await logger.info("App started")
     yield
     await logger.info("Shutting down...")
+    health_task.cancel()
+    cache_task.cancel()
+    app.state.hub.close()
+    await clients.close()
 
 app = FastAPI(lifespan=lifespan)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+app.add_middleware(DynamicGZipMiddleware, minimum_size=1000)
+app.add_middleware(SecurityHeadersMiddleware)
+app.add_middleware(AccessLogMiddleware)  # Added last so it is outermost and times the whole stack
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -36,41 +54,16 @@ async def http_exception_handler(request: Request, exc: HTTPException):
             content={"detail": exc.detail},
         )
 
-@app.middleware("http")
-async def security_headers_middleware(request: Request, call_next):
-    response: Response = await call_next(request)
-    
-    # Determine if the request is for documentation
-    if request.url.path.startswith("/docs") or request.url.path.startswith("/redoc"):
-        # Relaxed CSP for documentation pages
-        response.headers['Content-Security-Policy'] = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://code.highcharts.com; "
-            "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
-            "img-src 'self' data: https://fastapi.tiangolo.com; "
-            "font-src 'self' https://cdn.jsdelivr.net; "
-            "connect-src 'self' wss:; "
-            "frame-src 'self'; "
-        )
-    else:
-        # Strict CSP for all other routes
-        response.headers['Content-Security-Policy'] = (
-            "default-src 'self'; "
-            "script-src 'self' https://cdn.jsdelivr.net https://code.highcharts.com; "
-            "style-src 'self' https://cdn.jsdelivr.net; "
-            "img-src 'self' data:; "
-            "font-src 'self' https://cdn.jsdelivr.net; "
-            "connect-src 'self' wss:; "
-            "frame-src 'self'; "
-        )
-    
-    # Common security headers
-    response.headers['X-Frame-Options'] = "DENY"
-    response.headers['X-Content-Type-Options'] = "nosniff"
-    response.headers['Strict-Transport-Security'] = "max-age=31536000; includeSubDomains"
-    response.headers['Referrer-Policy'] = "no-referrer"
-    
-    return response
+@app.get("/health")
+async def health(request: Request):
+    status_map = request.app.state.clients.status
+    code = status.HTTP_200_OK if all(status_map.values()) else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=code, content=status_map)
+
+@app.get("/health/cache")
+async def cache_health(request: Request):
+    # Hit rate and invalidation counts of the client-side Redis cache
+    return request.app.state.clients.cache.stats()
 
 # Include your routers
 app.include_router(auth.router)
@@ -86,7 +79,7 @@ app.include_router(snmp.router)
 
 
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
 
 if __name__ == "__main__":
     # Remove SSL parameters since Nginx handles SSL
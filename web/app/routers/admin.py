@@ -7,11 +7,13 @@ from fastapi.responses import HTMLResponse, RedirectResponse # type: ignore
 from fastapi.templating import Jinja2Templates # type: ignore
 from fastapi.exceptions import HTTPException # type: ignore
 from core.security import get_current_user, is_admin
-from routers.snmp import router_uptime, camera_uptime, rpi_uptime
+from routers.snmp import get_device_info, device_uptime, rpi_uptime
+from core.assets import asset_url
 
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset"] = asset_url
 
 # Alerts page route (Needs formatting work)
 @router.get("/alerts", response_class=HTMLResponse)
@@ -60,8 +62,8 @@ async def system_page(request: Request, user: dict = Depends(get_current_user)):
 # Router page route
 @router.get("/router", response_class=HTMLResponse)
 async def router_page(request: Request, user: dict = Depends(get_current_user)):
-    info = request.app.state.device_info["Router"] # Get the Router info from the app state
-    uptime = await router_uptime() # Get the Router uptime
+    info = await get_device_info(request.app, "Router") # Get the cached Router info
+    uptime = device_uptime(info) # Get the Router uptime
     serial = info["serial"]
     if user is None:
         return RedirectResponse(url="/login")
@@ -88,8 +90,8 @@ async def router_page(request: Request, user: dict = Depends(get_current_user)):
 # Camera page route
 @router.get("/camera", response_class=HTMLResponse)
 async def camera_page(request: Request, user: dict = Depends(get_current_user)):
-    info = request.app.state.device_info["Camera"] # Get the Camera info from the app state
-    uptime = await camera_uptime() # Get the Camera uptime
+    info = await get_device_info(request.app, "Camera") # Get the cached Camera info
+    uptime = device_uptime(info) # Get the Camera uptime
     serial = info["serial"]
     if user is None:
         return RedirectResponse(url="/login")
@@ -116,7 +118,7 @@ async def camera_page(request: Request, user: dict = Depends(get_current_user)):
 # Network page route
 @router.get("/network", response_class=HTMLResponse)
 async def network_page(request: Request, user: dict = Depends(get_current_user)):
-    info = request.app.state.device_info["Router"] # Get the Router info from the app state
+    info = await get_device_info(request.app, "Router") # Get the cached Router info
     if user is None:
         return RedirectResponse(url="/login")
     if not is_admin(user):
@@ -1,136 +1,55 @@
-
 #! -----REFACTORING NOTES-----
 #! ----- DELETE THIS FILE -----
 
-from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync  # type: ignore
-from influxdb_client.client.query_api_async import QueryApiAsync  # type: ignore
 from fastapi import APIRouter, HTTPException, Query  # type: ignore
-from typing import List, Optional
-from datetime import datetime
+from typing import Optional
+from datetime import datetime, timedelta, timezone
 from core.logger import logger
-from core.config import settings
+from core.alert_store import alert_reader
 
 router = APIRouter()
 
-class InfluxService:
-    def __init__(self):
-        self.token = settings.TOKEN
-        self.org = settings.ORG
-        self.bucket = settings.BUCKET
-        self.url = settings.INFLUXDB_URL
-        self.client = None
-        self.query_api = None
-
-    async def __aenter__(self):
-        await self.initialize_client()
-        return self
-    
-    async def __aexit__(self, exc_type, exc, tb):
-        await self.client.close()
-    
-    async def initialize_client(self):
-        self.client = InfluxDBClientAsync(url=self.url, token=self.token, org=self.org)
-        self.query_api = QueryApiAsync(self.client)
-
-    # TODO: verify the logic to make sure they are being returned as desired.
-    # ? Should we build out the alert system to use a custom error code system.
-    # ? e.g psr-001 ('psr' Power Sensor Router, '001' error code)
-    # ? This would allow for more detailed error messages and easier debugging.
-    # ? Maybe a better way to give codes to different scripts and functions.
-    
-    async def fetch_alerts(self, limit: int, offset: int) -> List[dict]:
-        query = f'from(bucket: "{self.bucket}") |> range(start: 0) |> filter(fn: (r) => r._measurement == "alerts") |> sort(columns: ["_time"], desc: true) |> limit(n: {limit + 1}, offset: {offset})'
-        try:
-            result = await self.query_api.query(query, org=self.org)
-            alerts = []
-            for table in result:
-                for record in table.records:
-                    alerts.append({
-                        "timestamp": record.values.get("_time"),
-                        "source": record.values.get("source"),
-                        "level": record.values.get("level"),
-                        "value": record.values.get("_value")
-                    })
-            has_more = len(alerts) > limit
-            return alerts[:limit], has_more
-        except Exception as e:
-            await logger.error(f"Error fetching alerts: {e}")
-            return [], False
-
-    # New Search Function to dynamically build the query
-    async def search_alerts(self, limit: int, offset: int, start: Optional[str] = None, end: Optional[str] = None, level: Optional[str] = None, source: Optional[str] = None) -> List[dict]:
-        query = f'from(bucket: "{self.bucket}")'
-
-        # Only add the range filter if start and/or end is provided
-        if start and end:
-            start_iso = datetime.strptime(start, "%Y-%m-%d").isoformat() + "Z"
-            end_iso = datetime.strptime(end, "%Y-%m-%d").isoformat() + "Z"
-            query += f' |> range(start: {start_iso}, stop: {end_iso})'
-        else:
-            # If no time frame is given, select a broad range (you may change this as per your data structure)
-            query += ' |> range(start: 1970-01-01T00:00:00Z, stop: now())'
-
-        # Add the measurement filter
-        query += ' |> filter(fn: (r) => r._measurement == "alerts")'
-
-        # Apply filters for level and source if provided
-        if level:
-            query += f' |> filter(fn: (r) => r.level == "{level}")'
-        if source:
-            query += f' |> filter(fn: (r) => r.source == "{source}")'
-
-        # Sort and limit the results
-        query += f' |> sort(columns: ["_time"], desc: true) |> limit(n: {limit + 1}, offset: {offset})'
-
-        try:
-            result = await self.query_api.query(query, org=self.org)
-            alerts = []
-            for table in result:
-                for record in table.records:
-                    alerts.append({
-                        "timestamp": record.values.get("_time"),
-                        "source": record.values.get("source"),
-                        "level": record.values.get("level"),
-                        "value": record.values.get("_value")
-                    })
-            has_more = len(alerts) > limit
-            return alerts[:limit], has_more
-        except Exception as e:
-            await logger.error(f"Error fetching alerts: {e}")
-            return [], False
+# ? Should we build out the alert system to use a custom error code system.
+# ? e.g psr-001 ('psr' Power Sensor Router, '001' error code)
+# ? This would allow for more detailed error messages and easier debugging.
+# ? Maybe a better way to give codes to different scripts and functions.
+
+def date_ms(date: str, next_day: bool = False) -> int:
+    # Dates come from the search form as YYYY-MM-DD; the end date is inclusive
+    day = datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    if next_day:
+        day += timedelta(days=1)
+    return int(day.timestamp() * 1000)
+
+async def alert_page(limit: int, cursor: Optional[str] = None, **filters) -> dict:
+    try:
+        alerts, next_cursor = await alert_reader.fetch(limit, cursor, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+    except Exception as e:
+        await logger.error(f"Error fetching alerts: {e}")
+        raise HTTPException(status_code=500, detail=f"Error fetching alerts: {e}")
+    if not alerts:
+        return {"message": "No alerts available", "has_more": False, "next_cursor": None}
+    return {"alerts": alerts, "has_more": next_cursor is not None, "next_cursor": next_cursor}
 
 @router.get("/api/alerts")
-async def get_alerts(limit: int = Query(10, gt=0), offset: int = Query(0, ge=0)):
-    async with InfluxService() as influx_service:
-        try:
-            alerts, has_more = await influx_service.fetch_alerts(limit=limit, offset=offset)
-            if not alerts:
-                return {"message": "No alerts available", "has_more": False}
-            return {"alerts": alerts, "has_more": has_more}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error fetching alerts: {e}")
+async def get_alerts(limit: int = Query(10, gt=0, le=500), cursor: Optional[str] = Query(None)):
+    return await alert_page(limit, cursor)
 
 @router.get("/api/search_alerts")
 async def search_alerts(
-    limit: int = Query(10, gt=0),
-    offset: int = Query(0, ge=0),
+    limit: int = Query(10, gt=0, le=500),
+    cursor: Optional[str] = Query(None),
     start: Optional[str] = Query(None),
     end: Optional[str] = Query(None),
     source: Optional[str] = Query(None),
-    level: Optional[str] = Query(None)
+    level: Optional[str] = Query(None),
+    q: Optional[str] = Query(None, max_length=200)
 ):
-    async with InfluxService() as influx_service:
-        try:
-            alerts, has_more = await influx_service.search_alerts(
-                limit=limit,
-                offset=offset,
-                start=start,
-                end=end,
-                source=source,
-                level=level
-            )
-            if not alerts:
-                return {"message": "No alerts available", "has_more": False}
-            return {"alerts": alerts, "has_more": has_more}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error Fetching Alerts: {e}")
\ No newline at end of file
+    try:
+        start_ms = date_ms(start) if start else None
+        end_ms = date_ms(end, next_day=True) if end else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {e}")
+    return await alert_page(limit, cursor, start_ms=start_ms, end_ms=end_ms, level=level, source=source, text=q)
@@ -4,13 +4,15 @@
 
 from fastapi import APIRouter, Request, Form, Depends, status, HTTPException
 from fastapi.responses import RedirectResponse, HTMLResponse
-from core.security import authenticate_user, create_access_token
+from core.security import authenticate_user, create_access_token, login_throttle, client_ip
 from core.config import settings
 from fastapi.templating import Jinja2Templates
 from datetime import timedelta
+from core.assets import asset_url
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset"] = asset_url
 
 # Dependency to get the hashed passwords
 def get_hashed_passwords(request: Request):
@@ -24,7 +26,21 @@ async def login_page(request: Request):
 # Login submission
 @router.post("/login")
 async def login(request: Request, username: str = Form(...), password: str = Form(...)):
-    user = authenticate_user(username, password)
+    client = client_ip(request)
+    # Registered before bcrypt runs, so concurrent attempts count against the limit too
+    retry_after = login_throttle.attempt(client)
+    if retry_after:
+        return templates.TemplateResponse(
+            "login.html",
+            {"request": request, "error": f"Too many login attempts, try again in {retry_after} seconds"},
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": str(retry_after)},
+        )
+    user = None
+    try:
+        user = await authenticate_user(username, password)
+    finally:
+        login_throttle.finished(client, success=user is not None)
     if not user:
         return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid credentials"})
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
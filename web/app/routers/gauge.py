@@ -6,75 +6,66 @@
 
 import asyncio
 import json
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect #type: ignore
-from redis.asyncio import Redis #type: ignore
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect #type: ignore
 from core.config import settings
 from core.logger import logger
+from core.broadcaster import BroadcastHub, Subscriber, get_hub
 
 
 router = APIRouter()
-redis = Redis.from_url(settings.REDIS_URL)
 PRESET_VALUES = settings.GAUGE_SETTINGS
 STREAM_MAP = settings.STREAM_MAP
+# The homepage shows one field from each of these streams
+HOME_FIELDS = {"system_data": "volts", "environmental": "temperature", "network": "avg_rtt"}
 
-#Function to get the most recent data from Redis
-async def get_live_data(stream: str):
-    try:
-        response = await redis.xrevrange(stream, count=1)
-        if response:
-            _, data = response[0]
-            # Decode and round only numeric values, skip the timestamp
-            decoded_data = {k.decode(): round(float(v.decode()), 1) if k.decode() != "timestamp" else v.decode() for k, v in data.items()}
-            return decoded_data
-        else:
-            await logger.warning(f"No data found in stream {stream}")
-    except Exception as e:
-        await logger.error(f"Error reading from Redis stream {stream}: {e}")
-    return None
+def home_frame(stream: str, values: dict) -> dict:
+    field = HOME_FIELDS[stream]
+    return {field: values[field]} if field in values else {}
 
 # WebSocket endpoint for each page, including the homepage
 @router.websocket("/ws/{page_name:path}")
-async def websocket_endpoint(websocket: WebSocket, page_name: str):
+async def websocket_endpoint(websocket: WebSocket, page_name: str, hub: BroadcastHub = Depends(get_hub)):
     await websocket.accept()
-    if page_name == "" or page_name == "/": # If the user is on the homepage, handle it accordingly
-        stream_name = ["system_data", "environmental", "network"]
-    else:
-        stream_name = STREAM_MAP.get(page_name)
-    if not stream_name:
+    home = page_name == "" or page_name == "/" # If the user is on the homepage, handle it accordingly
+    streams = list(HOME_FIELDS) if home else [STREAM_MAP.get(page_name)]
+    if not streams[0]:
         await websocket.send_text(json.dumps({"error": "Invalid Page Name"}))
         await logger.error(f"Invalid Page Name: {page_name}")
         return
-    try:
+
+    # Updates are pushed by the shared per-stream broadcasters: the latest values first, then deltas
+    subscriber = Subscriber()
+    await hub.subscribe(streams, subscriber)
+
+    async def send_frames():
         while True:
-            # For homepage, handle multiple streams
-            if page_name == "" or page_name == "/":
-                data = {}
-                for stream in stream_name:
-                    stream_data = await get_live_data(stream)
-                    if stream == "system_data":
-                        data["volts"] = stream_data.get("volts", "N/A")
-                    elif stream == "environmental":
-                        data["temperature"] = stream_data.get("temperature", "N/A")
-                    elif stream == "network":
-                        data["avg_rtt"] = stream_data.get("avg_rtt", "N/A")
+            stream, values = await subscriber.queue.get()
+            frame = home_frame(stream, values) if home else values
+            if frame:
+                await websocket.send_text(json.dumps(frame))
+            elif not values:
+                await websocket.send_text(json.dumps({"error": "No data available"}))
 
-                if data:
-                    await websocket.send_text(json.dumps(data))
-                else:
-                    await websocket.send_text(json.dumps({"error": "No data available"}))
-            else:
-                # For other pages, handle a single stream
-                data = await get_live_data(stream_name)
-                if data:
-                    await websocket.send_text(json.dumps(data))
-                else:
-                    await websocket.send_text(json.dumps({"error": "No data available"}))
+    async def wait_for_disconnect():
+        while True:
+            await websocket.receive_text()
 
-            await asyncio.sleep(30)  # Send updates every 30 seconds
+    tasks = [asyncio.create_task(send_frames()), asyncio.create_task(wait_for_disconnect())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
     except WebSocketDisconnect:
         await logger.info(f"WebSocket disconnected from {page_name}")
     except Exception as e:
         await logger.error(f"Error in WebSocket connection for {page_name}: {e}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        for stream in streams:
+            hub.unsubscribe(stream, subscriber)
+        if subscriber.dropped:
+            await logger.info(f"Dropped {subscriber.dropped} frames for a slow client on {page_name}")
         
 # Endpoint to fetch preset values
 @router.get("/presets/{page_name}")
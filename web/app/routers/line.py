@@ -2,86 +2,299 @@
 #! -----REFACTORING NOTES-----
 #? This file is mostly good, minor changes to work with Vue
 
-from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync
+import asyncio
+import csv
+import io
+import time
+from influxdb_client import Dialect
 from influxdb_client.client.query_api_async import QueryApiAsync
-from fastapi import APIRouter, HTTPException
-from typing import Dict, List
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from redis.asyncio import Redis #type: ignore
+from typing import Dict, List, Optional
 from core.config import settings
+from core.clients import get_query_api, get_redis
+from core.query_cache import QueryCache
+from core.downsample import parse_duration, aggregation_window, aggregate_windows, lttb_indices, epoch_ms, rfc3339
+from core.stream_schema import decode
 
 router = APIRouter()
 
+chart_cache = QueryCache(max_entries=settings.CHART_CACHE_ENTRIES)
+
+# Plain CSV without annotation rows: one header row, then one row per timestamp after the pivot
+CSV_DIALECT = Dialect(header=True, delimiter=",", annotations=[], date_time_format="RFC3339")
+# CSV columns that are not chart fields
+NON_FIELD_COLUMNS = {"", "result", "table", "_time", "source"}
+
+def is_relay_stream(stream: str) -> bool:
+    """Relay streams are stored in InfluxDB as RELAY_AGGREGATION_WINDOW averages, not raw samples."""
+    return stream is not None and stream.startswith("relay")
+
+def chart_window(stream: str, range_seconds: float, max_points: int) -> Optional[int]:
+    """
+    Aggregation window (seconds) for a chart of `stream`, or None for raw points.
+
+    Relay charts are never finer than the stored relay windows and use whole multiples of them,
+    so the hot tier (raw samples) is aggregated to the same resolution as the InfluxDB part
+    and the chart keeps one point spacing across the tier boundary.
+    """
+    window = aggregation_window(range_seconds, max_points, settings.CHART_RAW_RESOLUTION)
+    if not is_relay_stream(stream):
+        return window
+    resolution = settings.RELAY_AGGREGATION_WINDOW
+    return max(-(-(window or 0) // resolution), 1) * resolution
+
 class WebGrapher:
-    def __init__(self):
-        self.token = settings.TOKEN
+    """
+    Tiered chart reads: the recent part of a range (at most HOT_TIER_SECONDS, and only as far
+    back as the Redis stream reaches) is read from the stream with XRANGE and aggregated here,
+    and only the older part is queried from InfluxDB. With aggregation the tier boundary is
+    moved to a window edge, so no window is split between the two reads. Relay samples are
+    averaged over time, like the data service's relay windows, since their spacing adapts.
+    """
+
+    def __init__(self, query_api: QueryApiAsync, redis: Optional[Redis] = None):
         self.org = settings.ORG
         self.bucket = settings.BUCKET
-        self.url = settings.INFLUXDB_URL
-        self.client = None
-        self.query_api = None
-    
-    async def __aenter__(self):
-        await self.initialize_client()
-        return self
-    async def __aexit__(self, exc_type,exc,tb):
-        await self.client.close()
-        
-    async def initialize_client(self):
-        self.client = InfluxDBClientAsync(url=self.url, token=self.token, org=self.org)
-        self.query_api = QueryApiAsync(self.client)
+        self.query_api = query_api
+        self.redis = redis
         
-    def generate_query(self, page_name: str, timeframe: str) -> str:
-        if timeframe == '1h':
-            aggregation = None
-        elif timeframe == '3h':
-            aggregation = '1m'
-        elif timeframe == '6h':
-            aggregation = '2m'
-        elif timeframe == '12h':
-            aggregation = '4m'
-        elif timeframe == '1d':
-            aggregation = '8m'
-        elif timeframe == '2d':
-            aggregation = '16m'
-            
+    def generate_query(self, page_name: str, start_ms: int, stop_ms: int, window: Optional[int] = None) -> str:
+        aggregation = f"{window}s" if window else None
         base_query = f"""
         from(bucket: "{self.bucket}")
-            |> range(start: -{timeframe})
+            |> range(start: {rfc3339(start_ms)}, stop: {rfc3339(stop_ms)})
             |> filter(fn: (r) => r._measurement == "{page_name}")
         """
         if aggregation:
             base_query += f"""
             |> aggregateWindow(every: {aggregation}, fn: mean, createEmpty: false)
-            """        
+            """
+        # Let InfluxDB build the rows: one column per field, one sorted table for the measurement
+        base_query += """
+            |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+            |> drop(columns: ["_start", "_stop", "_measurement"])
+            |> group()
+            |> sort(columns: ["_time"])
+        """
         return base_query
-    
-    async def base_results(self, page_name: str, time_frame: str) -> List[Dict]:
-        try:
-            results = await self.query_api.query(self.generate_query(page_name, time_frame), org=self.org)
-            aggregated = {}
-            for table in results:
-                for record in table.records:
-                    ts = record.get_time()
-                    if ts not in aggregated:
-                        aggregated[ts] = {}
-                    field = record.get_field()
-                    value = record.get_value()
-                    aggregated[ts][field] = value
-            sorted_data = sorted(
-                [{"timestamp": ts, **fields} for ts, fields in aggregated.items()],
-                key=lambda x: x["timestamp"]
-            )
+
+    async def query_columns(self, query: str) -> Dict[str, List]:
+        """
+        Run a pivoted query through the client's public query_raw and parse its CSV into columns.
+
+        Returns:
+            Dict[str, List]: {"timestamp": [...], "<field>": [...], ...}, all the same length.
+        """
+        text = await self.query_api.query_raw(query, org=self.org, dialect=CSV_DIALECT)
+        columns = {"timestamp": []}
+        timestamps = columns["timestamp"]
+        header = None
+        # csv handles quoted tag values containing commas or line breaks
+        for cells in csv.reader(io.StringIO(text)):
+            if not cells:
+                header = None  # A blank line ends a table
+                continue
+            if header is None:
+                header = cells
+                if "error" in header:
+                    raise ValueError(f"InfluxDB query error: {text}")
+                time_index = header.index("_time")
+                fields = [(index, columns.setdefault(name, [None] * len(timestamps)))
+                          for index, name in enumerate(header) if name not in NON_FIELD_COLUMNS]
+                missing = [values for name, values in columns.items() if name != "timestamp" and name not in header]
+                continue
+            timestamps.append(cells[time_index])
+            for index, values in fields:
+                value = cells[index]
+                values.append(float(value) if value else None)
+            for values in missing:
+                values.append(None)
+        return columns
+
+    @staticmethod
+    def downsample(columns: Dict[str, List], max_points: int, field: Optional[str] = None) -> Dict[str, List]:
+        """
+        Reduce the columns to `max_points` rows with LTTB. The rows are chosen on one field (the
+        first one by default) and kept for every column, so all fields still share timestamps.
+        """
+        fields = [name for name in columns if name != "timestamp"]
+        field = field if field in fields else (fields[0] if fields else None)
+        if field is None or len(columns["timestamp"]) <= max_points:
+            return columns
+        rows = [i for i, value in enumerate(columns[field]) if value is not None]
+        x = [epoch_ms(columns["timestamp"][i]) for i in rows]
+        y = [columns[field][i] for i in rows]
+        kept = [rows[i] for i in lttb_indices(x, y, max_points)]
+        return {name: [values[i] for i in kept] for name, values in columns.items()}
+
+    async def hot_boundary(self, stream: str, now_ms: int) -> Optional[int]:
+        """Earliest time (epoch ms) the hot tier serves for a stream, or None if it has no entries."""
+        if self.redis is None:
+            return None
+        first = await self.redis.xrange(stream, count=1)
+        if not first:
+            return None
+        return max(decode(*first[0])[0], now_ms - settings.HOT_TIER_SECONDS * 1000)
+
+    async def stream_columns(self, stream: str, start_ms: int, stop_ms: int, window: Optional[int] = None) -> Dict[str, List]:
+        """
+        Columns of the stream entries in [start_ms, stop_ms), aggregated per `window` seconds.
+
+        Returns:
+            Dict[str, List]: Columns like `query_columns`.
+        """
+        entries = await self.redis.xrange(stream, min=str(start_ms), max=str(stop_ms - 1))
+        timestamps: List[int] = []
+        columns: Dict[str, List] = {}
+        for count, (message_id, fields) in enumerate(entries):
+            timestamp_ms, values = decode(message_id, fields)
+            timestamps.append(timestamp_ms)
+            for name, value in values.items():
+                columns.setdefault(name, [None] * count).append(value)
+            for column in columns.values():
+                if len(column) == count:
+                    column.append(None)
+        if window:
+            max_gap_ms = settings.RELAY_SAMPLE_MAX_GAP * 1000 if is_relay_stream(stream) else None
+            timestamps, columns = aggregate_windows(timestamps, columns, window * 1000, stop_ms, max_gap_ms)
+        return {"timestamp": [rfc3339(ts) for ts in timestamps], **columns}
+
+    async def read_columns(self, page_name: str, start_ms: int, stop_ms: int, window: Optional[int] = None) -> Dict[str, List]:
+        """Columns for [start_ms, stop_ms), read from the hot tier, InfluxDB or both and stitched together."""
+        boundary = await self.hot_boundary(page_name, stop_ms)
+        if boundary is not None and window:
+            window_ms = window * 1000
+            boundary = -(-boundary // window_ms) * window_ms
+        if boundary is None or boundary >= stop_ms:
+            return await self.query_columns(self.generate_query(page_name, start_ms, stop_ms, window))
+        if boundary <= start_ms:
+            return await self.stream_columns(page_name, start_ms, stop_ms, window)
+        cold, hot = await asyncio.gather(
+            self.query_columns(self.generate_query(page_name, start_ms, boundary, window)),
+            self.stream_columns(page_name, boundary, stop_ms, window),
+        )
+        return self.stitch(cold, hot)
+
+    @staticmethod
+    def stitch(older: Dict[str, List], newer: Dict[str, List]) -> Dict[str, List]:
+        """Concatenate two sets of columns; a field missing from one side is padded with None."""
+        older_rows, newer_rows = len(older["timestamp"]), len(newer["timestamp"])
+        return {
+            name: older.get(name, [None] * older_rows) + newer.get(name, [None] * newer_rows)
+            for name in {**older, **newer}
+        }
+
+    @staticmethod
+    def render(page_name: str, columns: Dict[str, List], columnar: bool) -> Dict:
+        timestamps = columns.pop("timestamp")
+        # The newest timestamp (epoch ms) is the `since` cursor for the next update
+        cursor = epoch_ms(timestamps[-1]) if timestamps else None
+        if columnar:
+            # Each name appears once and times are plain integers (epoch ms, UTC)
             return {
                 "measurement": page_name,
-                "data": sorted_data
+                "timestamps": [epoch_ms(ts) for ts in timestamps],
+                "fields": columns,
+                "cursor": cursor
             }
+        fields = list(columns.items())
+        return {
+            "measurement": page_name,
+            "data": [
+                {"timestamp": ts, **{field: values[i] for field, values in fields}}
+                for i, ts in enumerate(timestamps)
+            ],
+            "cursor": cursor
+        }
+
+    async def base_results(self, page_name: str, start_ms: int, stop_ms: int, window: Optional[int] = None,
+                           lttb_points: Optional[int] = None, lttb_field: Optional[str] = None,
+                           columnar: bool = False) -> Dict:
+        try:
+            columns = await self.read_columns(page_name, start_ms, stop_ms, window)
+            if lttb_points:
+                columns = self.downsample(columns, lttb_points, lttb_field)
+            return self.render(page_name, columns, columnar)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error fetching data: {e}")
 
 @router.get("/{page_name}/data/{time_frame}")
-async def get_graph_data(page_name: str, time_frame: str):
+async def get_graph_data(
+    request: Request,
+    page_name: str,
+    time_frame: str,
+    max_points: int = Query(settings.CHART_MAX_POINTS, ge=10, le=10_000),
+    downsample: Optional[str] = Query(None, pattern="^lttb$"),
+    field: Optional[str] = Query(None),
+    format: str = Query("rows", pattern="^(rows|columnar)$"),
+    since: Optional[int] = Query(None, ge=0),
+    query_api: QueryApiAsync = Depends(get_query_api),
+    redis: Redis = Depends(get_redis)
+):
+    """
+    Chart data for any Flux duration (e.g. "1h", "90m", "7d"). The aggregation window is chosen
+    so each field has at most `max_points` points. With `downsample=lttb` the data is aggregated
+    to LTTB_OVERSAMPLE times that many points and then reduced with LTTB, which keeps peaks and
+    dips that plain averaging flattens.
+
+    `format=columnar` returns {"measurement", "timestamps": [epoch ms], "fields": {field: [values]}}
+    serialized with orjson instead of one dict per row.
+
+    Every response carries a `cursor` (epoch ms of its newest point). Passing it back as `since`
+    returns only the points added after it, at the same aggregation, so a chart can append
+    instead of reloading the whole range. Aggregated responses only hold completed windows.
+    """
     stream_map = settings.STREAM_MAP
     stream_name = stream_map.get(page_name)
-    async with WebGrapher() as grapher:
-        data = await grapher.base_results(stream_name, time_frame)
-        return data
-            
+    range_seconds = parse_duration(time_frame)
+    if not range_seconds:
+        raise HTTPException(status_code=400, detail=f"Invalid time frame: {time_frame}")
+    lttb_points = max_points if downsample else None
+    query_points = max_points * settings.LTTB_OVERSAMPLE if downsample else max_points
+    window = chart_window(stream_name, range_seconds, query_points)
+    # A new aggregated point only appears once per window, so that is how long a result stays fresh
+    ttl = window or settings.CHART_RAW_TTL
+
+    columnar = format == "columnar"
+
+    def encode(data: Dict) -> bytes:
+        # Row values may not be JSON-native (e.g. datetimes), so rows go through jsonable_encoder
+        return orjson.dumps(data if columnar else jsonable_encoder(data))
+
+    grapher = WebGrapher(query_api, redis)
+    now_ms = int(time.time() * 1000)
+    if since is not None:
+        since = max(since, now_ms - int(range_seconds * 1000))
+        if not window:
+            data = await grapher.base_results(stream_name, since + 1, now_ms + 1, columnar=columnar)
+            return Response(content=encode(data), media_type="application/json", headers={"Cache-Control": "no-store"})
+        # Only completed windows, aligned like aggregateWindow, so every chart polling during the
+        # same window shares one cached query
+        window_ms = window * 1000
+        start_ms, stop_ms = since // window_ms * window_ms, now_ms // window_ms * window_ms
+
+        async def load() -> bytes:
+            if stop_ms <= start_ms:
+                return encode(WebGrapher.render(stream_name, {"timestamp": []}, columnar))
+            return encode(await grapher.base_results(stream_name, start_ms, stop_ms, window, columnar=columnar))
+
+        key = (stream_name, "since", window, start_ms, stop_ms, format)
+    else:
+        start_ms = now_ms - int(range_seconds * 1000)
+        # Aggregated ranges end at the last completed window, like `since` updates: a partial window
+        # would become the cursor and never be replaced by its completed value
+        stop_ms = now_ms // (window * 1000) * (window * 1000) if window else now_ms + 1
+
+        async def load() -> bytes:
+            return encode(await grapher.base_results(stream_name, start_ms, stop_ms, window, lttb_points, field, columnar))
+
+        key = (stream_name, time_frame, window, lttb_points, field if downsample else None, format)
+    body, etag = await chart_cache.get(key, ttl, load)
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={ttl}"}
+    if chart_cache.matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
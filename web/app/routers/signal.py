@@ -3,13 +3,14 @@
 #! -----REFACTORING NOTES-----
 #? This file seems good enough but may need some minor improvements
 
-from fastapi import APIRouter #type: ignore
-from redis.asyncio import Redis #type: ignore
-from core.config import settings
+from fastapi import APIRouter, Depends #type: ignore
 from core.logger import logger
+from core.stream_schema import decode_latest
+from core.latest import read_latest
+from core.clients import get_cache
+from core.tracking_cache import TrackingCache
 
 router = APIRouter()
-redis = Redis.from_url(settings.REDIS_URL)
 
 def evaluate_rsrp(value):
     if value > -80:
@@ -55,14 +56,15 @@ def results(rsrp_score, rsrq_score, sinr_score):
     else:
         return "Poor"
 
-# Function to pull the most recent data from redis from the cellular stream
-async def fetch_info(stream: str):
+# Function to pull the most recent data from redis from the cellular stream's latest-value hash
+async def fetch_info(cache: TrackingCache, stream: str):
     try:
-        response = await redis.xrevrange(stream, count=1)
-        if response:
-            _, data = response[0]
-            # Decode and round values, Skip timestamp
-            decoded_data = {k.decode(): round(float(v.decode()), 1) if k.decode() != "timestamp" else v.decode() for k, v in data.items()}
+        latest = await read_latest(cache, [stream])
+        entry = decode_latest(latest[stream])
+        if entry:
+            timestamp_ms, values = entry
+            decoded_data = {k: round(v, 1) if v is not None else None for k, v in values.items()}
+            decoded_data["timestamp"] = timestamp_ms
             return decoded_data
         else:
             await logger.warning(f"No data found in stream {stream}")
@@ -73,8 +75,8 @@ async def fetch_info(stream: str):
     
 # Evaluate the cellular data
 # Handle -9999 values as Errors
-async def evaluate_signal():
-    data = await fetch_info("cellular_data")
+async def evaluate_signal(cache: TrackingCache):
+    data = await fetch_info(cache, "cellular_data")
     if not data:
         return {"status": "ERROR: No Data"}
     
@@ -93,6 +95,6 @@ async def evaluate_signal():
     return {"RSRP": rsrp, "RSRQ": rsrq, "SINR": sinr, "Quality": quality}
 
 @router.get("/cellular")
-async def signal_quality():
-    results = await evaluate_signal()
+async def signal_quality(cache: TrackingCache = Depends(get_cache)):
+    results = await evaluate_signal(cache)
     return results
\ No newline at end of file
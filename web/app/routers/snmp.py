@@ -1,66 +1,63 @@
-
 #! -----REFACTORING NOTES-----
 #! -----DELETE THIS FILE-----
 #? This file is not needed anymore
 
-import aiosnmp
+import json
 import aiofiles
 from fastapi import FastAPI, APIRouter, Request
 from core.config import settings
 from core.logger import logger
+from core.tracking_cache import TrackingCache
 
 router = APIRouter()
 
-async def snmp_engine(host, oid, community=settings.COMMUNITY):
+DEVICE_DEFAULTS = {
+    "Router": {"model": "Unknown", "serial": "Unknown", "ssid": "Unknown", "firmware": "Unknown"},
+    "Camera": {"model": "Unknown", "serial": "Unknown"}
+}
+
+# Router and camera info is polled over SNMP by the data service and cached in Redis,
+# so page loads only ever pay for one MGET no matter whether the devices are reachable
+# (and none at all while the cached info is unchanged).
+async def cached_devices(cache: TrackingCache) -> dict:
+    keys = [settings.DEVICE_INFO_KEY.format(device) for device in ("router", "camera")]
     try:
-        async with aiosnmp.Snmp(host=host, community=community, port=161, timeout=5, max_repetitions=5) as snmp:
-            response = await snmp.get(oid)
-            for varbind in response:
-                if varbind.oid == oid:
-                    return varbind.value
+        raw = await cache.mget(keys)
     except Exception as e:
-        await logger.error(f"SNMP request failed: {e}")
-        return None
+        await logger.error(f"Failed to read device info cache: {e}")
+        raw = [None] * len(keys)
+    devices = {}
+    for name, value in zip(("Router", "Camera"), raw):
+        info = dict(DEVICE_DEFAULTS[name])
+        if value:
+            info.update({k: v for k, v in json.loads(value).items() if v is not None})
+        devices[name] = info
+    return devices
 
 async def load_device_info(app: FastAPI):
     # Initialize the device info dictionary
     app.state.device_info = {
         "RPi": {"serial": "Unknown", "system_name": "R&D Demo System"},
-        "Router": {"model": "Unknown", "serial": "Unknown", "ssid": "Unknown", "firmware": "Unknown"},
-        "Camera": {"model": "Unknown", "serial": "Unknown"}
+        **DEVICE_DEFAULTS,
     }
-    
+
     # Fetch the data from the Raspberry Pi
     serial = await rpi_serial()
     system_name = "R&D Demo System"
-    rpi_info = {"serial": serial, "system_name": system_name}
-    
-    # Fetch the SNMP data for the Router
-    router_info = {}
-    for name, oid in settings.ROUTER_OIDS.items():
-        result = await snmp_engine(settings.ROUTER_IP, oid)
-        result = result.decode('utf-8')
-        router_info[name] = result
-        
-    # Fetch the SNMP data for the Camera
-    camera_info = {}
-    for name, oid in settings.CAMERA_OIDS.items():
-        result = await snmp_engine(settings.CAMERA_IP, oid)
-        if name == "serial" and isinstance(result, bytes):
-            result = ':'.join(f'{byte:02X}' for byte in result)
-            result = result.replace(':','').upper()
-        if name == "model" and isinstance(result, bytes):
-            result = result.decode()
-            result_parts = result.split(';')
-            if len(result_parts) > 1:
-                result = result_parts[1].strip()
-        camera_info[name] = result
-        
-    app.state.device_info["RPi"] = rpi_info
-    app.state.device_info["Router"] = router_info
-    app.state.device_info["Camera"] = camera_info
-        
+    app.state.device_info["RPi"] = {"serial": serial, "system_name": system_name}
+    app.state.device_info.update(await cached_devices(app.state.clients.cache))
+
+async def get_device_info(app: FastAPI, name: str) -> dict:
+    # Refresh one device from the cache, keeping the startup RPi info as-is
+    if name == "RPi":
+        return app.state.device_info["RPi"]
+    devices = await cached_devices(app.state.clients.cache)
+    app.state.device_info.update(devices)
+    return devices[name]
+
 def format_uptime(uptime_data: int, is_ticks: bool) -> str:
+    if uptime_data is None:
+        return "Unknown"
     if is_ticks:
         ticks = int(uptime_data)
         seconds = ticks // 100
@@ -76,7 +73,7 @@ def format_uptime(uptime_data: int, is_ticks: bool) -> str:
         uptime.append(f"{hours}h")
     if minutes > 0:
         uptime.append(f"{minutes}m")
-    return " ".join(uptime) or "0s"    
+    return " ".join(uptime) or "0s"
 
 async def rpi_serial():
     try:
@@ -87,7 +84,7 @@ async def rpi_serial():
     except IOError as e:
         await logger.error(f"Failed to get RPi Serial Number: {e}")
         return None
-    
+
 def rpi_uptime():
     with open('/proc/uptime', 'r') as f:
         uptime_seconds = float(f.readline().split()[0])
@@ -95,25 +92,14 @@ def rpi_uptime():
         result = format_uptime(uptime_seconds, False)
         return result
 
-async def router_uptime():
-    oid = '.1.3.6.1.2.1.25.1.1.0'
-    result = await snmp_engine(settings.ROUTER_IP, oid)
-    return format_uptime(result, True)
-
-async def camera_uptime():
-    oid = '.1.3.6.1.2.1.1.3.0'
-    result = await snmp_engine(settings.CAMERA_IP, oid)
-    return format_uptime(result, True)
+def device_uptime(info: dict) -> str:
+    # Uptime is cached in seconds by the data service
+    return format_uptime(info.get("uptime"), False)
 
 @router.get('/snmp/info')
 async def snmp_info(request: Request):
-    await load_device_info(request.app)
+    devices = await cached_devices(request.app.state.clients.cache)
+    request.app.state.device_info.update(devices)
     data = request.app.state.device_info
-    router = await router_uptime()
-    camera = await camera_uptime()
-    rpi = rpi_uptime()
-    uptime = {"router": router, "camera": camera, "rpi": rpi}
+    uptime = {"router": device_uptime(devices["Router"]), "camera": device_uptime(devices["Camera"]), "rpi": rpi_uptime()}
     return {"device_info": data, "uptime": uptime}
-    
-    
-    
\ No newline at end of file
@@ -6,9 +6,11 @@ from fastapi import APIRouter, Depends, Request # type: ignore
 from fastapi.responses import HTMLResponse, RedirectResponse # type: ignore
 from core.security import get_current_user
 from fastapi.templating import Jinja2Templates # type: ignore
+from core.assets import asset_url
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset"] = asset_url
 
 # Home page route
 @router.get("/", response_class=HTMLResponse)
@@ -1,8 +1,9 @@
 document.addEventListener('DOMContentLoaded', function() {
     const apiEndpoint = '/api/alerts';
     let limit = 10;
-    let offset = 0;
+    let nextCursor = null; // Keyset cursor of the next page, from the last response
     let hasMore = true;
+    let searchParams = null; // Filters of the active search, null when browsing all alerts
     let currentSort = { column: null, direction: 'asc' };
 
     // Capture form submission event for advanced search
@@ -14,20 +15,24 @@ document.addEventListener('DOMContentLoaded', function() {
         let endDate = document.getElementById('endDate').value;
         const alertLevel = document.getElementById('alertLevel').value;
         const alertSource = document.getElementById('alertSource').value;
+        const alertText = document.getElementById('alertText').value.trim();
 
-        // Reset the offset
-        offset = 0;
+        // Start again from the first page
+        nextCursor = null;
 
         // Fetch alerts with new search params
-        fetchSearchAlerts(startDate, endDate, alertLevel, alertSource);
+        fetchSearchAlerts(startDate, endDate, alertLevel, alertSource, alertText);
     });
 
     // Fetch alerts from the backend (Initial load)
     async function fetchAlerts(loadMore = false) {
         try {
-            const params = new URLSearchParams({ limit, offset });
+            const params = new URLSearchParams(searchParams || {});
+            params.set('limit', limit);
+            if (loadMore && nextCursor) params.set('cursor', nextCursor);
 
-            const response = await fetch(`${apiEndpoint}?${params}`);
+            const endpoint = searchParams ? '/api/search_alerts' : apiEndpoint;
+            const response = await fetch(`${endpoint}?${params}`);
             const data = await response.json();
 
             if (data && Array.isArray(data.alerts) && data.alerts.length > 0) {
@@ -37,6 +42,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     renderTable(data.alerts);
                 }
                 hasMore = data.has_more;
+                nextCursor = data.next_cursor;
             } else if (!loadMore) {
                 showNoAlertsMessage();
                 hasMore = false;
@@ -49,18 +55,18 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // Fetch alerts from the backend with search params
-    async function fetchSearchAlerts(startDate = '', endDate = '', alertLevel = '', alertSource = ''){
+    async function fetchSearchAlerts(startDate = '', endDate = '', alertLevel = '', alertSource = '', alertText = ''){
         try {
-            const params = new URLSearchParams({
-                limit: limit,
-                offset: offset,
-            });
             // Conditionally add params
-            if (startDate) params.append('start', startDate);
-            if (endDate) params.append('end', endDate);
-            if (alertLevel) params.append('level', alertLevel);
-            if (alertSource) params.append('source', alertSource);
-            
+            searchParams = {};
+            if (startDate) searchParams.start = startDate;
+            if (endDate) searchParams.end = endDate;
+            if (alertLevel) searchParams.level = alertLevel;
+            if (alertSource) searchParams.source = alertSource;
+            if (alertText) searchParams.q = alertText;
+            const params = new URLSearchParams(searchParams);
+            params.set('limit', limit);
+
             const searchApiEndpoint = '/api/search_alerts';
             const response = await fetch(`${searchApiEndpoint}?${params}`);
             const data = await response.json();
@@ -68,6 +74,7 @@ document.addEventListener('DOMContentLoaded', function() {
             if (data && Array.isArray(data.alerts) && data.alerts.length > 0) {
                 renderTable(data.alerts);
                 hasMore = data.has_more;
+                nextCursor = data.next_cursor;
             } else {
                 showNoAlertsMessage();
                 hasMore = false;
@@ -124,18 +131,10 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    // Function to reset the table to the first 10 alerts
+    // Function to reset the table to the first page of alerts
     function resetTable(){
-        const tableBody = document.querySelector("table tbody");
-        const rows = tableBody.querySelectorAll('tr');
-        rows.forEach((row, index) => {
-            if (index >= 10){
-                row.remove();
-            }
-        });
-        offset = 10;
-        hasMore = true;
-        toggleLoadMoreOrResetButton();
+        nextCursor = null;
+        fetchAlerts();
     }
     function renderTable(alerts){
         const tableBody = document.querySelector("table tbody");
@@ -222,7 +221,6 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
     document.getElementById('loadMoreBtn').addEventListener('click', function() {
-        offset += limit;
         fetchAlerts(true);
     });
     document.getElementById('resetBtn').addEventListener('click', function() {
@@ -132,8 +132,9 @@ document.addEventListener('DOMContentLoaded', async function () {
 
     // Function to update gauges with new data
     function updateGauges(data) {
+        // Frames only carry the fields that changed
         Object.keys(gauges).forEach(key => {
-            if (gauges[key]) {
+            if (gauges[key] && key in data) {
                 gauges[key].series[0].points[0].update(data[key]);
             }
         });
@@ -27,6 +27,9 @@ document.addEventListener('DOMContentLoaded', async function () {
     
     const currentPageData = datasets[pageName] || datasets['system']; // Default to system data
     let chart = null;
+    let currentTimeFrame = '1h';
+    let cursor = null; // Epoch ms of the newest point on the chart, sent back as `since`
+    const REFRESH_INTERVAL_MS = 10000;
 
 
 
@@ -135,26 +138,79 @@ document.addEventListener('DOMContentLoaded', async function () {
         });
     }
 
-    // Helper function to clean timestamps
-    function cleanTimestamp(timestamp) {
-        return timestamp.replace(/(\.\d{3})\d+/, '$1');
+    // Timestamps arrive as UTC epoch ms; shift them the same way the ISO strings used to be
+    function toChartTime(epochMs) {
+        return epochMs - new Date(epochMs).getTimezoneOffset() * 60000;
     }
 
-    function checkTimestamp(utcTimestamp){
-        const date = new Date(utcTimestamp);
-        if (utcTimestamp.endsWith('Z') || utcTimestamp.includes('+00:00')) {
-            const localDate = new Date(date.getTime() - date.getTimezoneOffset() * 60000);
-            return localDate
-        } else {
-            return date
+    // Length of a timeframe such as '1h' or '1d12h' in ms
+    function durationMs(timeFrame) {
+        const units = { ms: 1, s: 1000, m: 60000, h: 3600000, d: 86400000, w: 604800000 };
+        let total = 0;
+        for (const [, value, unit] of timeFrame.matchAll(/(\d+)(ms|s|m|h|d|w)/g)) {
+            total += Number(value) * units[unit];
+        }
+        return total;
+    }
+
+    // Append only the points added since the last response and drop those that left the timeframe
+    async function refreshData() {
+        if (!chart || cursor === null) {
+            return;
+        }
+        const timeFrame = currentTimeFrame;
+        try {
+            const response = await fetch(`/${pageName}/data/${timeFrame}?format=columnar&since=${cursor}`);
+            const result = await response.json();
+            if (result.error || !result.timestamps || timeFrame !== currentTimeFrame) {
+                return;
+            }
+            if (result.cursor !== null && result.cursor !== undefined) {
+                cursor = result.cursor;
+            }
+            const times = result.timestamps.map(toChartTime);
+            const cutoff = toChartTime(Date.now() - durationMs(timeFrame));
+            let changed = times.length > 0;
+            currentPageData.forEach((field, index) => {
+                const series = chart.series[index];
+                const values = result.fields[field.fieldName] || [];
+                if (!series) {
+                    return;
+                }
+                for (let i = 0; i < times.length; i++) {
+                    if (values[i] !== null && values[i] !== undefined) {
+                        series.addPoint([times[i], values[i]], false, false, false);
+                    }
+                }
+                // series.data is cropped or left empty for large (boosted) series; xData holds every point
+                let stale = 0;
+                while (stale < series.xData.length && series.xData[stale] < cutoff) {
+                    stale++;
+                }
+                for (let i = 0; i < stale; i++) {
+                    series.removePoint(0, false, false);
+                }
+                changed = changed || stale > 0;
+            });
+            if (changed) {
+                chart.redraw();
+            }
+        } catch (error) {
+            console.error(error);
         }
     }
 
     // Fetch the data from the server
     async function fetchData(timeFrame) {
+        currentTimeFrame = timeFrame;
+        cursor = null;
         try {
-            const response = await fetch(`/${pageName}/data/${timeFrame}`);
+            const response = await fetch(`/${pageName}/data/${timeFrame}?format=columnar`);
             const result = await response.json();
+            if (timeFrame !== currentTimeFrame) {
+                return; // Another timeframe was picked while this one loaded
+            }
+            cursor = result.cursor ?? null;
             if (result.error){
                 if(chart) {
                     chart.setTitle({ text: 'Error Fetching Data' });
@@ -163,28 +219,16 @@ document.addEventListener('DOMContentLoaded', async function () {
                 }
                 return;
             }
-            const seriesData = currentPageData.map(field => ({
-                name: field.displayName,
-                data: []
-            }));
-            result.data.forEach(entry => {
-                const cleanedTimestamp = cleanTimestamp(entry.timestamp);
-                const timestamp = checkTimestamp(cleanedTimestamp).getTime();
-                if (isNaN(timestamp)) {
-                    console.warn(`Invalid timestamp after cleaning: ${cleanedTimestamp}`);
-                    return; // Skip invalid timestamps
-                }
-                currentPageData.forEach((field, index) => {
-                    const value = entry[field.fieldName.toLowerCase()];
-                    if (value !== undefined && value !== null) {
-                        const numericValue = parseFloat(value);
-                        if (isNaN(numericValue)) {
-                            console.warn(`Invalid value for ${field.displayName}: ${value}`);
-                            return; // Skip invalid values
-                        }
-                        seriesData[index].data.push([timestamp, numericValue]);
+            const times = result.timestamps.map(toChartTime);
+            const seriesData = currentPageData.map(field => {
+                const values = result.fields[field.fieldName] || [];
+                const data = [];
+                for (let i = 0; i < times.length; i++) {
+                    if (values[i] !== null && values[i] !== undefined) {
+                        data.push([times[i], values[i]]);
                     }
-                });
+                }
+                return { name: field.displayName, data: data };
             });
 
             // Calculate global yMin and yMax
@@ -229,4 +273,5 @@ document.addEventListener('DOMContentLoaded', async function () {
         });
     });
     fetchData('1h');
+    setInterval(refreshData, REFRESH_INTERVAL_MS);
 });